@@ -0,0 +1,197 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import List, Optional
+
+from . import models, schemas, crud, fieldsets, geo, search
+from .catalog_cache import CATALOG_TABLES, CatalogSnapshot, catalog_cache
+from .route_graph import route_graph
+from .crud import (
+    build_itinerary,
+    bump_table_versions_stmt,
+    table_versions_stmt,
+    itinerary_stmt,
+    itineraries_stmt,
+    itinerary_export_stmt,
+    itinerary_summaries_refresh_stmt,
+    recommended_itineraries_stmt,
+    locations_stmt,
+    hotels_stmt,
+    amenity_ids_stmt,
+    activities_stmt,
+)
+
+# Async counterparts of the operations in crud. They share crud's statements
+# and loader options; lazy loading is not available on an AsyncSession, so
+# every read that is serialized must eager-load what the schema walks, or
+# leave catalog rows to the catalog cache (with_catalog=False).
+
+# Table change counters
+async def get_table_versions(db: AsyncSession, table_names) -> dict:
+    versions = dict((await db.execute(table_versions_stmt(table_names))).all())
+    return {name: versions.get(name, 0) for name in table_names}
+
+# Catalog cache
+async def get_catalog(db: AsyncSession, versions: Optional[dict] = None) -> CatalogSnapshot:
+    return await catalog_cache.aget(db, versions or await get_table_versions(db, CATALOG_TABLES))
+
+# Itinerary CRUD operations
+async def create_itinerary(db: AsyncSession, itinerary: schemas.ItineraryCreate):
+    await validate_itinerary(db, itinerary)
+    await fill_transfer_durations(db, itinerary)
+    db_itinerary = build_itinerary(itinerary)
+    db.add(db_itinerary)
+    await db.flush()
+    await db.execute(itinerary_summaries_refresh_stmt(models.Itinerary.id == db_itinerary.id))
+    await db.execute(bump_table_versions_stmt("itineraries"))
+    await db.commit()
+    return await get_itinerary(db, db_itinerary.id)
+
+async def bulk_create_itineraries(db: AsyncSession, itineraries: List[schemas.ItineraryCreate]) -> List[int]:
+    return await db.run_sync(crud.bulk_create_itineraries, itineraries)
+
+async def validate_itinerary(db: AsyncSession, itinerary: schemas.ItineraryCreate, catalog: Optional[CatalogSnapshot] = None):
+    """Check references and day numbers against the cached catalog (raises crud.InvalidItineraryError)."""
+    errors = crud.itinerary_errors(itinerary, catalog or await get_catalog(db))
+    if errors:
+        raise crud.InvalidItineraryError(errors)
+
+async def fill_transfer_durations(db: AsyncSession, itinerary: schemas.ItineraryCreate):
+    """Fill in left-out transfer durations from the route graph (raises route_graph.UnknownRouteError)."""
+    if any(transfer.duration_hours is None for transfer in itinerary.transfers):
+        await db.run_sync(route_graph.fill_transfer_durations, itinerary.transfers)
+
+async def get_routes(db: AsyncSession, origin: str, destination: str):
+    await db.run_sync(route_graph.refresh)
+    return route_graph.routes(origin, destination)
+
+async def get_itinerary(
+    db: AsyncSession,
+    itinerary_id: int,
+    strategy: str = "selectin",
+    with_catalog: bool = True,
+    selection: Optional[fieldsets.Selection] = None,
+):
+    result = await db.scalars(
+        itinerary_stmt(itinerary_id, strategy, with_catalog, selection).execution_options(populate_existing=True)
+    )
+    return result.unique().first()
+
+async def get_itineraries(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None,
+    max_budget: Optional[float] = None,
+    min_rating: Optional[float] = None,
+    with_catalog: bool = True,
+    selection: Optional[fieldsets.Selection] = None,
+):
+    stmt = itineraries_stmt(skip, limit, after_id, max_budget, min_rating, with_catalog, selection)
+    return (await db.scalars(stmt)).all()
+
+async def iter_itinerary_export(db: AsyncSession, catalog: CatalogSnapshot, batch_size: int = 500):
+    result = await db.stream(itinerary_export_stmt().execution_options(yield_per=batch_size))
+    memo = {}
+    async for parents in result.partitions():
+        yield await db.run_sync(crud.itinerary_export_documents, parents, catalog, memo)
+
+async def get_recommended_itineraries(
+    db: AsyncSession,
+    nights: int,
+    region: Optional[str] = None,
+    strategy: str = "selectin",
+    max_budget: Optional[float] = None,
+    min_rating: Optional[float] = None,
+    with_catalog: bool = True,
+    selection: Optional[fieldsets.Selection] = None,
+):
+    stmt = recommended_itineraries_stmt(nights, region, strategy, max_budget, min_rating, with_catalog, selection)
+    return (await db.scalars(stmt)).unique().all()
+
+# Location CRUD operations
+async def create_location(db: AsyncSession, location: schemas.LocationCreate):
+    db_location = models.Location(**location.dict())
+    db.add(db_location)
+    await db.execute(bump_table_versions_stmt("locations"))
+    await db.commit()
+    catalog_cache.invalidate()
+    await db.refresh(db_location)
+    return db_location
+
+async def get_location(db: AsyncSession, location_id: int):
+    return await db.get(models.Location, location_id)
+
+async def get_locations(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    return (await db.scalars(locations_stmt(skip, limit, after_id))).all()
+
+# Hotel CRUD operations
+async def create_hotel(db: AsyncSession, hotel: schemas.HotelCreate):
+    db_hotel = models.Hotel(**hotel.dict())
+    db.add(db_hotel)
+    await db.flush()
+    await db.run_sync(crud.sync_hotel_amenities, [db_hotel.id])
+    await db.execute(bump_table_versions_stmt("hotels"))
+    await db.commit()
+    catalog_cache.invalidate()
+    await db.refresh(db_hotel, attribute_names=["location"])
+    return db_hotel
+
+async def get_hotel(db: AsyncSession, hotel_id: int):
+    return await db.get(models.Hotel, hotel_id, options=[joinedload(models.Hotel.location)])
+
+async def get_hotel_ids(
+    db: AsyncSession,
+    amenities: str,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None,
+    region: Optional[str] = None,
+) -> List[int]:
+    """Ids of a page of hotels offering every one of amenities (see crud.get_hotels)."""
+    names = crud.amenity_names(amenities)
+    amenity_ids = (await db.scalars(amenity_ids_stmt(names))).all() if names else None
+    if names and len(amenity_ids) < len(names):
+        return []
+    return (await db.scalars(hotels_stmt(skip, limit, after_id, amenity_ids, region, ids_only=True))).all()
+
+# Activity CRUD operations
+async def create_activity(db: AsyncSession, activity: schemas.ActivityCreate):
+    db_activity = models.Activity(**activity.dict())
+    db.add(db_activity)
+    await db.execute(bump_table_versions_stmt("activities"))
+    await db.commit()
+    catalog_cache.invalidate()
+    await db.refresh(db_activity, attribute_names=["location"])
+    return db_activity
+
+async def get_activity(db: AsyncSession, activity_id: int):
+    return await db.get(models.Activity, activity_id, options=[joinedload(models.Activity.location)])
+
+async def get_activities(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    return (await db.scalars(activities_stmt(skip, limit, after_id))).all()
+
+# Catalog search
+async def search_catalog(db: AsyncSession, query: str, kinds: Optional[List[str]] = None, limit: int = 20):
+    params = {"query": query, "limit": limit}
+    if kinds:
+        params["kinds"] = kinds
+    return (await db.execute(search.search_stmt(by_kind=bool(kinds)), params)).all()
+
+# Nearby search
+async def get_nearby(
+    db: AsyncSession,
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    kinds: Optional[List[str]] = None,
+    limit: int = 50,
+):
+    stmt = geo.nearby_stmt(by_kind=bool(kinds))
+    for pass_radius in geo.search_radii(radius_km):
+        params = geo.nearby_params(latitude, longitude, pass_radius, limit)
+        if kinds:
+            params["kinds"] = kinds
+        hits = (await db.execute(stmt, params)).all()
+        if len(hits) == limit:
+            break
+    return hits
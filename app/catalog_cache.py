@@ -0,0 +1,167 @@
+"""
+In-process read-through cache of the catalog (locations, hotels, activities).
+
+The catalog is small and read-mostly, so every worker keeps all of it in
+memory as a CatalogSnapshot: one compact record (a named tuple of the row's
+columns) per row. The list endpoints page through the snapshot and
+itineraries embed their hotels and activities from it, so neither queries
+the catalog tables. Encoded list pages are kept in the shared cache
+(app.shared_cache) under the snapshot's versions, so each is encoded once
+for all workers.
+
+A snapshot is valid for the table change counters (table_versions) it was
+loaded at. Readers pass the counters they read, which they need anyway for
+their ETags; a snapshot at other counters (a write from another worker, a
+catalog import) is reloaded in one pass over the three tables. The crud
+create_* writers also drop it after their commit, so the writing worker
+does not serve the old snapshot even for a moment.
+"""
+import asyncio
+import bisect
+import threading
+import weakref
+from collections import namedtuple
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import models, serializers
+from .shared_cache import shared_cache
+
+CATALOG_TABLES = ("locations", "hotels", "activities")
+
+def _record_type(model):
+    return namedtuple(f"{model.__name__}Record", [column.key for column in model.__table__.columns])
+
+# Records carry the model's column attributes, so app.serializers takes them
+# in place of ORM rows
+LocationRecord = _record_type(models.Location)
+HotelRecord = _record_type(models.Hotel)
+ActivityRecord = _record_type(models.Activity)
+
+class CatalogSnapshot:
+    """The whole catalog at one set of table versions."""
+
+    def __init__(self, versions: Dict[str, int], locations: List, hotels: List, activities: List):
+        self.versions = versions
+        self.locations: Dict[int, LocationRecord] = {row.id: LocationRecord._make(row) for row in locations}
+        self.hotels: Dict[int, HotelRecord] = {row.id: HotelRecord._make(row) for row in hotels}
+        self.activities: Dict[int, ActivityRecord] = {row.id: ActivityRecord._make(row) for row in activities}
+        self.regions = frozenset(record.region for record in self.locations.values())
+        # Locations are few and embedded in every hotel and activity: serialize them once
+        self._location_content = {
+            location_id: serializers.location(record) for location_id, record in self.locations.items()
+        }
+        # Sorted ids to page through, per kind and for hotels per region
+        self._ids: Dict[Tuple[str, Optional[str]], List[int]] = {
+            ("locations", None): sorted(self.locations),
+            ("hotels", None): sorted(self.hotels),
+            ("activities", None): sorted(self.activities),
+        }
+        for hotel_id in self._ids["hotels", None]:
+            region = self.locations[self.hotels[hotel_id].location_id].region
+            self._ids.setdefault(("hotels", region), []).append(hotel_id)
+
+    def location_content(self, record: LocationRecord) -> dict:
+        return self._location_content[record.id]
+
+    def hotel_content(self, record: HotelRecord) -> dict:
+        return serializers.hotel(record, self._location_content[record.location_id])
+
+    def activity_content(self, record: ActivityRecord) -> dict:
+        return serializers.activity(record, self._location_content[record.location_id])
+
+    async def page(
+        self,
+        kind: str,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        region: Optional[str] = None,
+    ) -> Tuple[list, bytes]:
+        """
+        The records of a list page of kind (ordered by id, after after_id or
+        else from offset skip, hotels optionally in region) and the page
+        encoded as a JSON array.
+        """
+        ids = self._ids.get((kind, region), [])
+        start = bisect.bisect_right(ids, after_id) if after_id is not None else skip
+        records_by_id, content = {
+            "locations": (self.locations, self.location_content),
+            "hotels": (self.hotels, self.hotel_content),
+            "activities": (self.activities, self.activity_content),
+        }[kind]
+        records = [records_by_id[record_id] for record_id in ids[start:start + limit]]
+
+        async def build():
+            return serializers.dumps([content(record) for record in records])
+
+        payload = await shared_cache.aget_or_build(
+            shared_cache.versioned_key("catalog-page", self.versions, kind, region, skip, limit, after_id), build
+        )
+        return records, payload
+
+def _load_rows(db: Session):
+    # Plain Core rows on the session's connection, without the ORM result layer
+    connection = db.connection()
+    return [
+        connection.execute(select(model.__table__).order_by(model.id)).all()
+        for model in (models.Location, models.Hotel, models.Activity)
+    ]
+
+class CatalogCache:
+    """
+    Process-wide catalog snapshot (see the module docstring). get() and
+    aget() return a snapshot at the given versions, loading it if needed.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[CatalogSnapshot] = None
+        # Guards the swap only: loads run without it, since through an
+        # AsyncSession's run_sync they yield to the event loop
+        self._lock = threading.Lock()
+        # Per event loop, so concurrent async requests load a missing snapshot once
+        self._async_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _current(self, versions: Mapping[str, int]) -> Optional[CatalogSnapshot]:
+        snapshot = self._snapshot
+        if snapshot is not None and all(snapshot.versions[name] == versions[name] for name in CATALOG_TABLES):
+            return snapshot
+        return None
+
+    def get(self, db: Session, versions: Mapping[str, int]) -> CatalogSnapshot:
+        """
+        The catalog at versions (the change counters of CATALOG_TABLES, read
+        in db's transaction), loaded through db unless already cached.
+        """
+        snapshot = self._current(versions)
+        if snapshot is not None:
+            return snapshot
+        snapshot = CatalogSnapshot({name: versions[name] for name in CATALOG_TABLES}, *_load_rows(db))
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    async def aget(self, db: AsyncSession, versions: Mapping[str, int]) -> CatalogSnapshot:
+        """
+        Async variant of get() that loads a missing snapshot on an AsyncSession.
+        """
+        snapshot = self._current(versions)
+        if snapshot is not None:
+            return snapshot
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            lock = self._async_locks.setdefault(loop, asyncio.Lock())
+        async with lock:
+            return await db.run_sync(self.get, versions)
+
+    def invalidate(self):
+        """Drop the snapshot (after a committed catalog write)."""
+        with self._lock:
+            self._snapshot = None
+
+catalog_cache = CatalogCache()
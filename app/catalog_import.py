@@ -0,0 +1,185 @@
+"""
+Streaming bulk import of catalog files (locations, hotels, activities).
+
+Rows are read one at a time from CSV or NDJSON, validated against the
+matching *Create schema and upserted in large batches on the catalog's
+natural keys, all in one transaction. Hotels and activities may reference
+their location by `location_id` or by `location` name, with `location_region`
+when locations of that name exist in several regions.
+
+    python -m app.catalog_import hotels hotels.csv [--batch-size 5000]
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from . import crud, models, schemas
+
+DEFAULT_BATCH_SIZE = 5000
+
+# kind -> (validation schema, model, natural key used for the upsert)
+CATALOG_IMPORTERS = {
+    "locations": (schemas.LocationCreate, models.Location, ("name", "region")),
+    "hotels": (schemas.HotelCreate, models.Hotel, ("location_id", "name")),
+    "activities": (schemas.ActivityCreate, models.Activity, ("location_id", "name")),
+}
+
+class UnknownLocationError(ValueError):
+    def __init__(self, message: str, field: str = "location", error_type: str = "unknown_location"):
+        super().__init__(message)
+        self.field = field
+        self.error_type = error_type
+
+def detect_format(filename: Optional[str]) -> str:
+    if filename and filename.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+def iter_records(lines: Iterable[str], fmt: str = "csv") -> Iterator[dict]:
+    """
+    Yield raw records from CSV (header row required) or NDJSON lines.
+    Empty CSV cells are treated as missing values.
+    """
+    if fmt == "ndjson":
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    elif fmt == "csv":
+        for record in csv.DictReader(lines):
+            yield {key: value for key, value in record.items() if value != ""}
+    else:
+        raise ValueError(f"Unsupported catalog format: {fmt}")
+
+def location_id_map(db: Session) -> Dict[str, Dict[str, int]]:
+    """Location name -> region -> id for resolving `location` references (names are unique per region)."""
+    location_ids: Dict[str, Dict[str, int]] = {}
+    for name, region, location_id in db.execute(
+        select(models.Location.name, models.Location.region, models.Location.id)
+    ):
+        location_ids.setdefault(name, {})[region] = location_id
+    return location_ids
+
+def _resolve_location(record: dict, location_ids: Dict[str, Dict[str, int]]) -> dict:
+    # Anything but an object (an NDJSON line such as `42`) is left for the
+    # schema to reject as that row's error
+    if not isinstance(record, dict) or "location_id" in record or "location" not in record:
+        return record
+    record = dict(record)
+    name = record.pop("location")
+    region = record.pop("location_region", None)
+    regions = location_ids.get(name, {})
+    if region is not None:
+        if region not in regions:
+            raise UnknownLocationError(f"Unknown location: {name} in {region}")
+        record["location_id"] = regions[region]
+    elif len(regions) == 1:
+        record["location_id"] = next(iter(regions.values()))
+    elif regions:
+        raise UnknownLocationError(
+            f"Ambiguous location: {name} exists in {', '.join(sorted(regions))}; give location_region",
+            "location_region",
+            "ambiguous_location",
+        )
+    else:
+        raise UnknownLocationError(f"Unknown location: {name}")
+    return record
+
+def _upsert(db: Session, model, natural_key, rows: List[dict]) -> List[int]:
+    """Upsert rows on the natural key and return the ids of the written rows."""
+    if not rows:
+        return []
+    stmt = sqlite_insert(model)
+    updated = {
+        column.name: stmt.excluded[column.name]
+        for column in model.__table__.columns
+        if column.name not in natural_key and not column.primary_key
+    }
+    stmt = stmt.on_conflict_do_update(index_elements=list(natural_key), set_=updated)
+    return db.scalars(stmt.returning(model.id), rows).all()
+
+def import_catalog(
+    db: Session,
+    kind: str,
+    lines: Iterable[str],
+    fmt: str = "csv",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> schemas.CatalogImportResult:
+    """
+    Validate and upsert a catalog file in batches inside a single transaction.
+
+    Invalid rows are skipped and reported by their 0-based position; everything
+    else is committed together at the end.
+    """
+    schema, model, natural_key = CATALOG_IMPORTERS[kind]
+    location_ids = location_id_map(db) if kind != "locations" else {}
+    # Foreign keys are enforced: reject rows with an unknown location_id up front
+    known_location_ids = {location_id for regions in location_ids.values() for location_id in regions.values()}
+    batch, errors, written_ids = [], [], []
+    processed = 0
+
+    for index, record in enumerate(iter_records(lines, fmt)):
+        processed += 1
+        try:
+            row = schema.model_validate(_resolve_location(record, location_ids)).model_dump()
+            if kind != "locations" and row["location_id"] not in known_location_ids:
+                raise UnknownLocationError(f"Unknown location_id: {row['location_id']}", "location_id")
+            batch.append(row)
+        except ValidationError as exc:
+            errors.append(schemas.BulkItemError(index=index, errors=exc.errors(include_url=False)))
+        except UnknownLocationError as exc:
+            errors.append(schemas.BulkItemError(index=index, errors=[{"type": exc.error_type, "loc": [exc.field], "msg": str(exc)}]))
+        if len(batch) >= batch_size:
+            written_ids.extend(_upsert(db, model, natural_key, batch))
+            batch = []
+    written_ids.extend(_upsert(db, model, natural_key, batch))
+    # Rows repeating a natural key update the same row (and return its id again)
+    written_ids = list(dict.fromkeys(written_ids))
+    upserted = len(written_ids)
+
+    # Prices (and hotel amenities) may have changed: refresh the summaries of
+    # itineraries booking these rows
+    if kind == "hotels":
+        crud.sync_hotel_amenities(db, written_ids)
+        crud.refresh_catalog_summaries(db, hotel_ids=written_ids)
+    elif kind == "activities":
+        crud.refresh_catalog_summaries(db, activity_ids=written_ids)
+    if upserted:
+        crud.bump_table_versions(db, kind)
+    db.commit()
+    return schemas.CatalogImportResult(kind=kind, processed=processed, upserted=upserted, errors=errors)
+
+def import_catalog_file(db: Session, kind: str, binary_file, filename: Optional[str] = None, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Import from a binary file object, streaming it line by line."""
+    lines = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    try:
+        return import_catalog(db, kind, lines, detect_format(filename), batch_size)
+    finally:
+        lines.detach()
+
+def main(argv: List[str]) -> int:
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Import a catalog file (CSV or NDJSON).")
+    parser.add_argument("kind", choices=sorted(CATALOG_IMPORTERS))
+    parser.add_argument("path")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv[1:])
+
+    with open(args.path, "rb") as binary_file, SessionLocal() as db:
+        result = import_catalog_file(db, args.kind, binary_file, args.path, args.batch_size)
+
+    print(f"{result.kind}: {result.processed} rows processed, {result.upserted} upserted, {len(result.errors)} rejected")
+    for error in result.errors[:20]:
+        print(f"  row {error.index}: {error.errors}")
+    return 1 if result.errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
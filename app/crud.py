@@ -1,117 +1,571 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List, Optional
+from sqlalchemy.orm import Session, contains_eager, joinedload, selectinload
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from typing import List, Optional, Tuple
 from datetime import datetime
 
-from . import models, schemas
+from . import fieldsets, models, schemas, serializers
+from .catalog_cache import CATALOG_TABLES, CatalogSnapshot, catalog_cache
+from .route_graph import route_graph
+
+# Loader strategies for itinerary collections. Many-to-one hops (hotel,
+# activity, location) are always joined onto the collection query, so the
+# whole graph is fetched in a fixed number of statements. Without
+# with_catalog they are not loaded at all; the itinerary is then serialized
+# with its hotels and activities from the catalog cache. A selection
+# (app.fieldsets) loads only the columns and relationships it names.
+ITINERARY_LOAD_STRATEGIES = {
+    "selectin": selectinload,
+    "joined": joinedload,
+}
+
+def itinerary_load_options(
+    strategy: str = "selectin", with_catalog: bool = True, selection: Optional[fieldsets.Selection] = None
+):
+    collection_loader = ITINERARY_LOAD_STRATEGIES[strategy]
+    if selection is not None:
+        return fieldsets.load_options(selection, collection_loader, with_catalog)
+    if not with_catalog:
+        return [
+            collection_loader(models.Itinerary.accommodations),
+            collection_loader(models.Itinerary.transfers),
+            collection_loader(models.Itinerary.itinerary_activities),
+        ]
+    return [
+        collection_loader(models.Itinerary.accommodations)
+        .joinedload(models.Accommodation.hotel)
+        .joinedload(models.Hotel.location),
+        collection_loader(models.Itinerary.transfers),
+        collection_loader(models.Itinerary.itinerary_activities)
+        .joinedload(models.ItineraryActivity.activity)
+        .joinedload(models.Activity.location),
+    ]
+
+# Table change counters
+def table_versions_stmt(table_names):
+    return select(models.TableVersion.table_name, models.TableVersion.version).where(
+        models.TableVersion.table_name.in_(table_names)
+    )
+
+def bump_table_versions_stmt(*table_names: str):
+    stmt = sqlite_insert(models.TableVersion).values(
+        [{"table_name": name, "version": 1} for name in table_names]
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[models.TableVersion.table_name],
+        set_={"version": models.TableVersion.version + 1},
+    )
+
+def get_table_versions(db: Session, table_names) -> dict:
+    versions = dict(db.execute(table_versions_stmt(table_names)).all())
+    return {name: versions.get(name, 0) for name in table_names}
+
+def bump_table_versions(db: Session, *table_names: str):
+    """Bump the change counters of the written tables inside the caller's transaction."""
+    db.execute(bump_table_versions_stmt(*table_names))
+
+# Catalog cache
+def get_catalog(db: Session, versions: Optional[dict] = None) -> CatalogSnapshot:
+    """The cached catalog, at versions if the caller already read the counters."""
+    return catalog_cache.get(db, versions or get_table_versions(db, CATALOG_TABLES))
+
+# Itinerary summaries
+SUMMARY_BATCH_SIZE = 5000
+
+def itinerary_summaries_refresh_stmt(condition=None):
+    """
+    INSERT OR REPLACE the summaries of the itineraries matching condition (all
+    of them when None), computed set-based from their child and catalog rows.
+    """
+    itinerary_id = models.Itinerary.id
+    hotel_nights = select(models.Accommodation).join(models.Accommodation.hotel).where(
+        models.Accommodation.itinerary_id == itinerary_id
+    )
+    booked_activities = select(models.ItineraryActivity).join(models.ItineraryActivity.activity).where(
+        models.ItineraryActivity.itinerary_id == itinerary_id
+    )
+    summary = select(
+        itinerary_id,
+        hotel_nights.with_only_columns(func.coalesce(func.sum(models.Hotel.price_per_night), 0)).scalar_subquery()
+        + booked_activities.with_only_columns(func.coalesce(func.sum(models.Activity.price), 0)).scalar_subquery(),
+        select(func.count()).where(models.ItineraryActivity.itinerary_id == itinerary_id).scalar_subquery(),
+        select(func.coalesce(func.sum(models.Transfer.duration_hours), 0))
+        .where(models.Transfer.itinerary_id == itinerary_id)
+        .scalar_subquery(),
+        booked_activities.with_only_columns(func.group_concat(models.Activity.type.distinct())).scalar_subquery(),
+        hotel_nights.with_only_columns(func.min(models.Hotel.rating)).scalar_subquery(),
+    )
+    if condition is not None:
+        summary = summary.where(condition)
+    return insert(models.ItinerarySummary).from_select(
+        ["itinerary_id", "total_price", "activity_count", "transfer_hours", "activity_types", "min_hotel_rating"],
+        summary,
+    ).prefix_with("OR REPLACE")
+
+def _id_batches(ids: List[int]):
+    for start in range(0, len(ids), SUMMARY_BATCH_SIZE):
+        yield ids[start:start + SUMMARY_BATCH_SIZE]
+
+def refresh_itinerary_summaries(db: Session, itinerary_ids: Optional[List[int]] = None):
+    """Recompute the given itineraries' summaries (all when None) in the caller's transaction."""
+    if itinerary_ids is None:
+        db.execute(itinerary_summaries_refresh_stmt())
+        return
+    for batch in _id_batches(itinerary_ids):
+        db.execute(itinerary_summaries_refresh_stmt(models.Itinerary.id.in_(batch)))
+
+def refresh_catalog_summaries(db: Session, hotel_ids: List[int] = (), activity_ids: List[int] = ()):
+    """Recompute the summaries of itineraries that book any of the given hotels or activities."""
+    for batch in _id_batches(list(hotel_ids)):
+        db.execute(itinerary_summaries_refresh_stmt(models.Itinerary.id.in_(
+            select(models.Accommodation.itinerary_id).where(models.Accommodation.hotel_id.in_(batch))
+        )))
+    for batch in _id_batches(list(activity_ids)):
+        db.execute(itinerary_summaries_refresh_stmt(models.Itinerary.id.in_(
+            select(models.ItineraryActivity.itinerary_id).where(models.ItineraryActivity.activity_id.in_(batch))
+        )))
+
+# Itinerary validation
+class InvalidItineraryError(ValueError):
+    """An itinerary payload referencing unknown catalog rows or days outside the trip."""
+
+    def __init__(self, errors: List[dict]):
+        self._errors = errors
+        super().__init__("; ".join(error["msg"] for error in errors))
+
+    def errors(self, loc: Tuple = ()) -> List[dict]:
+        """The errors in the shape of Pydantic error entries, located under loc."""
+        return [{**error, "loc": (*loc, *error["loc"])} for error in self._errors]
+
+def itinerary_errors(itinerary: schemas.ItineraryCreate, catalog: CatalogSnapshot) -> List[dict]:
+    """
+    Every unknown hotel_id and activity_id (checked against the catalog
+    snapshot's ids, without a query) and every day_number outside the trip:
+    nights are booked on days 1 to duration_nights, transfers and activities
+    may also fall on the departure day after the last night.
+    """
+    errors = []
+    last_night = itinerary.duration_nights
+    for field, items, last_day in (
+        ("accommodations", itinerary.accommodations, last_night),
+        ("transfers", itinerary.transfers, last_night + 1),
+        ("itinerary_activities", itinerary.itinerary_activities, last_night + 1),
+    ):
+        for index, item in enumerate(items):
+            if item.day_number > last_day:
+                errors.append({
+                    "type": "day_out_of_range",
+                    "loc": (field, index, "day_number"),
+                    "msg": f"day_number must be at most {last_day} for a {last_night}-night itinerary",
+                    "input": item.day_number,
+                })
+    for field, items, key, known in (
+        ("accommodations", itinerary.accommodations, "hotel_id", catalog.hotels),
+        ("itinerary_activities", itinerary.itinerary_activities, "activity_id", catalog.activities),
+    ):
+        for index, item in enumerate(items):
+            if getattr(item, key) not in known:
+                errors.append({
+                    "type": "unknown_reference",
+                    "loc": (field, index, key),
+                    "msg": f"No {key[:-3]} with id {getattr(item, key)}",
+                    "input": getattr(item, key),
+                })
+    return errors
+
+def validate_itinerary(db: Session, itinerary: schemas.ItineraryCreate):
+    """
+    Raises:
+        InvalidItineraryError: if itinerary_errors() finds anything
+    """
+    errors = itinerary_errors(itinerary, get_catalog(db))
+    if errors:
+        raise InvalidItineraryError(errors)
 
 # Itinerary CRUD operations
-def create_itinerary(db: Session, itinerary: schemas.ItineraryCreate):
-    # Create new itinerary
-    db_itinerary = models.Itinerary(
+def build_itinerary(itinerary: schemas.ItineraryCreate) -> models.Itinerary:
+    """Build an unsaved itinerary with its child rows attached through relationships."""
+    return models.Itinerary(
         name=itinerary.name,
         duration_nights=itinerary.duration_nights,
         region=itinerary.region,
         description=itinerary.description,
-        is_recommended=itinerary.is_recommended
+        is_recommended=itinerary.is_recommended,
+        accommodations=[
+            models.Accommodation(**accommodation.dict()) for accommodation in itinerary.accommodations
+        ],
+        transfers=[models.Transfer(**transfer.dict()) for transfer in itinerary.transfers],
+        itinerary_activities=[
+            models.ItineraryActivity(**activity.dict()) for activity in itinerary.itinerary_activities
+        ],
     )
+
+def create_itinerary(db: Session, itinerary: schemas.ItineraryCreate):
+    # Create new itinerary with its accommodations, transfers and activities,
+    # validated in the same transaction before anything is written
+    validate_itinerary(db, itinerary)
+    route_graph.fill_transfer_durations(db, itinerary.transfers)
+    db_itinerary = build_itinerary(itinerary)
     db.add(db_itinerary)
+    db.flush()
+    refresh_itinerary_summaries(db, [db_itinerary.id])
+    bump_table_versions(db, "itineraries")
     db.commit()
     db.refresh(db_itinerary)
-    
-    # Add accommodations
-    for accommodation in itinerary.accommodations:
-        db_accommodation = models.Accommodation(
-            itinerary_id=db_itinerary.id,
-            hotel_id=accommodation.hotel_id,
-            day_number=accommodation.day_number,
-            check_in_date=accommodation.check_in_date,
-            check_out_date=accommodation.check_out_date
+    return db_itinerary
+
+def bulk_create_itineraries(db: Session, itineraries: List[schemas.ItineraryCreate]) -> List[int]:
+    """
+    Insert itineraries and all their child rows with batched multi-row inserts.
+
+    Parents are inserted with a multi-row RETURNING statement so child rows can
+    be keyed to the new ids, then each child table gets one executemany.
+    Items must be validated (itinerary_errors) and their transfer durations
+    filled in (route_graph.fill_transfer_durations).
+    Nothing is committed; the caller owns the transaction.
+    """
+    if not itineraries:
+        return []
+
+    ids = db.scalars(
+        insert(models.Itinerary).returning(models.Itinerary.id, sort_by_parameter_order=True),
+        [
+            {
+                "name": itinerary.name,
+                "duration_nights": itinerary.duration_nights,
+                "region": itinerary.region,
+                "description": itinerary.description,
+                "is_recommended": itinerary.is_recommended,
+            }
+            for itinerary in itineraries
+        ],
+    ).all()
+
+    accommodations, transfers, activities = [], [], []
+    for itinerary_id, itinerary in zip(ids, itineraries):
+        accommodations.extend(
+            {**accommodation.model_dump(), "itinerary_id": itinerary_id} for accommodation in itinerary.accommodations
         )
-        db.add(db_accommodation)
-    
-    # Add transfers
-    for transfer in itinerary.transfers:
-        db_transfer = models.Transfer(
-            itinerary_id=db_itinerary.id,
-            day_number=transfer.day_number,
-            from_location=transfer.from_location,
-            to_location=transfer.to_location,
-            transfer_type=transfer.transfer_type,
-            duration_hours=transfer.duration_hours,
-            departure_time=transfer.departure_time
+        transfers.extend(
+            {**transfer.model_dump(), "itinerary_id": itinerary_id} for transfer in itinerary.transfers
         )
-        db.add(db_transfer)
-    
-    # Add activities
-    for activity in itinerary.itinerary_activities:
-        db_activity = models.ItineraryActivity(
-            itinerary_id=db_itinerary.id,
-            activity_id=activity.activity_id,
-            day_number=activity.day_number,
-            start_time=activity.start_time
+        activities.extend(
+            {**activity.model_dump(), "itinerary_id": itinerary_id} for activity in itinerary.itinerary_activities
         )
-        db.add(db_activity)
-    
-    db.commit()
-    db.refresh(db_itinerary)
-    return db_itinerary
 
-def get_itinerary(db: Session, itinerary_id: int):
-    return db.query(models.Itinerary).filter(models.Itinerary.id == itinerary_id).first()
+    # Child rows go through Core table inserts: they need no ORM bookkeeping
+    # and the parents they belong to were only just created.
+    for table, rows in (
+        (models.Accommodation.__table__, accommodations),
+        (models.Transfer.__table__, transfers),
+        (models.ItineraryActivity.__table__, activities),
+    ):
+        if rows:
+            db.execute(table.insert(), rows)
+
+    refresh_itinerary_summaries(db, ids)
+    bump_table_versions(db, "itineraries")
+    return ids
 
-def get_itineraries(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Itinerary).offset(skip).limit(limit).all()
+def paginate(stmt, id_column, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    """
+    Order by id and page either by keyset (rows after after_id) or, as a
+    deprecated fallback, by offset. Keyset pages cost the same at any depth.
+    """
+    if after_id is not None:
+        stmt = stmt.where(id_column > after_id)
+    else:
+        stmt = stmt.offset(skip)
+    return stmt.order_by(id_column).limit(limit)
+
+def itinerary_stmt(
+    itinerary_id: int,
+    strategy: str = "selectin",
+    with_catalog: bool = True,
+    selection: Optional[fieldsets.Selection] = None,
+):
+    return (
+        select(models.Itinerary)
+        .options(*itinerary_load_options(strategy, with_catalog, selection))
+        .where(models.Itinerary.id == itinerary_id)
+    )
+
+def filter_by_summary(stmt, max_budget: Optional[float] = None, min_rating: Optional[float] = None):
+    """
+    Restrict an itinerary query by total price and lowest hotel rating.
+    Itineraries booking no hotel and no activity have nothing priced yet (a
+    total of 0), so they fit no budget; without a hotel they have no rating.
+    """
+    if max_budget is not None:
+        stmt = stmt.where(
+            models.ItinerarySummary.total_price <= max_budget,
+            or_(models.ItinerarySummary.min_hotel_rating.is_not(None), models.ItinerarySummary.activity_count > 0),
+        )
+    if min_rating is not None:
+        stmt = stmt.where(models.ItinerarySummary.min_hotel_rating >= min_rating)
+    return stmt
 
-def get_recommended_itineraries(db: Session, nights: int, region: Optional[str] = None):
-    query = db.query(models.Itinerary).filter(
+def itineraries_stmt(
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None,
+    max_budget: Optional[float] = None,
+    min_rating: Optional[float] = None,
+    with_catalog: bool = True,
+    selection: Optional[fieldsets.Selection] = None,
+):
+    stmt = (
+        select(models.Itinerary)
+        .outerjoin(models.Itinerary.summary)
+        .options(contains_eager(models.Itinerary.summary))
+    )
+    if selection is not None:
+        stmt = stmt.options(*itinerary_load_options("selectin", with_catalog, selection))
+    stmt = filter_by_summary(stmt, max_budget, min_rating)
+    return paginate(stmt, models.Itinerary.id, skip, limit, after_id)
+
+def recommended_itineraries_stmt(
+    nights: int,
+    region: Optional[str] = None,
+    strategy: str = "selectin",
+    max_budget: Optional[float] = None,
+    min_rating: Optional[float] = None,
+    with_catalog: bool = True,
+    selection: Optional[fieldsets.Selection] = None,
+):
+    stmt = select(models.Itinerary).options(*itinerary_load_options(strategy, with_catalog, selection)).where(
         models.Itinerary.is_recommended == True,
         models.Itinerary.duration_nights == nights
     )
-    
+
     if region:
-        query = query.filter(models.Itinerary.region == region)
-    
-    return query.all()
+        stmt = stmt.where(models.Itinerary.region == region)
+
+    if max_budget is not None or min_rating is not None:
+        stmt = filter_by_summary(stmt.join(models.Itinerary.summary), max_budget, min_rating)
+
+    return stmt.order_by(models.Itinerary.id)
+
+def itinerary_export_stmt():
+    """
+    Every itinerary's own columns as plain Core rows, in id order. Meant to be
+    streamed with yield_per: each partition's children are then read with
+    itinerary_export_documents, so no ORM objects are built for the export.
+    """
+    return select(models.Itinerary.__table__).order_by(models.Itinerary.id)
+
+# Child tables of an exported itinerary, by the schemas.Itinerary attribute they fill
+EXPORT_CHILD_TABLES = {
+    "accommodations": models.Accommodation.__table__,
+    "transfers": models.Transfer.__table__,
+    "itinerary_activities": models.ItineraryActivity.__table__,
+}
+
+def itinerary_export_documents(
+    db: Session, parents, catalog: CatalogSnapshot, memo: Optional[dict] = None
+) -> List[dict]:
+    """
+    The export documents (serializers.itinerary) of a batch of itinerary rows:
+    one IN query per child table, with catalog rows embedded from catalog
+    (their dicts kept in memo, which can be shared across batches).
+    """
+    itinerary_ids = [parent.id for parent in parents]
+    children = {}
+    for name, table in EXPORT_CHILD_TABLES.items():
+        by_itinerary = children[name] = {itinerary_id: [] for itinerary_id in itinerary_ids}
+        for row in db.execute(
+            select(table).where(table.c.itinerary_id.in_(itinerary_ids)).order_by(table.c.itinerary_id, table.c.id)
+        ).all():
+            by_itinerary[row.itinerary_id].append(row)
+    memo = {} if memo is None else memo
+    return [
+        serializers.itinerary_document(
+            parent,
+            children["accommodations"][parent.id],
+            children["transfers"][parent.id],
+            children["itinerary_activities"][parent.id],
+            memo,
+            catalog,
+        )
+        for parent in parents
+    ]
+
+def get_itinerary(
+    db: Session,
+    itinerary_id: int,
+    strategy: str = "selectin",
+    with_catalog: bool = True,
+    selection: Optional[fieldsets.Selection] = None,
+):
+    return db.scalars(itinerary_stmt(itinerary_id, strategy, with_catalog, selection)).unique().first()
+
+def get_itineraries(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None,
+    max_budget: Optional[float] = None,
+    min_rating: Optional[float] = None,
+    with_catalog: bool = True,
+    selection: Optional[fieldsets.Selection] = None,
+):
+    return db.scalars(itineraries_stmt(skip, limit, after_id, max_budget, min_rating, with_catalog, selection)).all()
+
+def iter_itinerary_export(db: Session, catalog: CatalogSnapshot, batch_size: int = 500):
+    """Yield the export documents of every itinerary, batch_size at a time."""
+    result = db.execute(itinerary_export_stmt().execution_options(yield_per=batch_size))
+    memo = {}
+    for parents in result.partitions():
+        yield itinerary_export_documents(db, parents, catalog, memo)
+
+def get_recommended_itineraries(
+    db: Session,
+    nights: int,
+    region: Optional[str] = None,
+    strategy: str = "selectin",
+    max_budget: Optional[float] = None,
+    min_rating: Optional[float] = None,
+    with_catalog: bool = True,
+    selection: Optional[fieldsets.Selection] = None,
+):
+    stmt = recommended_itineraries_stmt(nights, region, strategy, max_budget, min_rating, with_catalog, selection)
+    return db.scalars(stmt).unique().all()
 
 # Location CRUD operations
 def create_location(db: Session, location: schemas.LocationCreate):
     db_location = models.Location(**location.dict())
     db.add(db_location)
+    bump_table_versions(db, "locations")
     db.commit()
+    catalog_cache.invalidate()
     db.refresh(db_location)
     return db_location
 
+def locations_stmt(skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    return paginate(select(models.Location), models.Location.id, skip, limit, after_id)
+
 def get_location(db: Session, location_id: int):
-    return db.query(models.Location).filter(models.Location.id == location_id).first()
+    return db.get(models.Location, location_id)
+
+def get_locations(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    return db.scalars(locations_stmt(skip, limit, after_id)).all()
 
-def get_locations(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Location).offset(skip).limit(limit).all()
+# Hotel amenities
+def amenity_names(amenities: Optional[str]) -> List[str]:
+    """Normalized, de-duplicated names from a comma-separated amenities value ("Pool, Free  WiFi")."""
+    names = (" ".join(part.split()).lower() for part in (amenities or "").split(","))
+    return list(dict.fromkeys(name for name in names if name))
+
+def sync_hotel_amenities(db: Session, hotel_ids: List[int]):
+    """
+    Rebuild the hotel_amenities rows of the given hotels from their amenities
+    text, adding unseen amenity names, in the caller's transaction. Works on a
+    Session or a Connection.
+    """
+    for batch in _id_batches(list(hotel_ids)):
+        names_by_hotel = {
+            hotel_id: amenity_names(amenities)
+            for hotel_id, amenities in db.execute(
+                select(models.Hotel.id, models.Hotel.amenities).where(models.Hotel.id.in_(batch))
+            )
+        }
+        names = {name for hotel_names in names_by_hotel.values() for name in hotel_names}
+        db.execute(delete(models.HotelAmenity).where(models.HotelAmenity.hotel_id.in_(batch)))
+        if not names:
+            continue
+        db.execute(
+            sqlite_insert(models.Amenity).on_conflict_do_nothing(index_elements=[models.Amenity.name]),
+            [{"name": name} for name in names],
+        )
+        amenity_ids = dict(db.execute(
+            select(models.Amenity.name, models.Amenity.id).where(models.Amenity.name.in_(names))
+        ).all())
+        db.execute(insert(models.HotelAmenity), [
+            {"amenity_id": amenity_ids[name], "hotel_id": hotel_id}
+            for hotel_id, hotel_names in names_by_hotel.items()
+            for name in hotel_names
+        ])
+
+def amenity_ids_stmt(names: List[str]):
+    return select(models.Amenity.id).where(models.Amenity.name.in_(names))
 
 # Hotel CRUD operations
 def create_hotel(db: Session, hotel: schemas.HotelCreate):
     db_hotel = models.Hotel(**hotel.dict())
     db.add(db_hotel)
+    db.flush()
+    sync_hotel_amenities(db, [db_hotel.id])
+    bump_table_versions(db, "hotels")
     db.commit()
+    catalog_cache.invalidate()
     db.refresh(db_hotel)
     return db_hotel
 
+def hotels_stmt(
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None,
+    amenity_ids: Optional[List[int]] = None,
+    region: Optional[str] = None,
+    ids_only: bool = False,
+):
+    """
+    Hotels page, optionally restricted to those offering every one of
+    amenity_ids and to a region. Each amenity is a semi-join probing the
+    (amenity_id, hotel_id) key while hotels are walked in id order, so a page
+    stops as soon as it is full instead of intersecting whole amenity sets.
+    With ids_only the page is just the hotel ids (to resolve from the catalog cache).
+    """
+    if ids_only:
+        stmt = select(models.Hotel.id)
+    else:
+        stmt = select(models.Hotel).options(joinedload(models.Hotel.location))
+    for amenity_id in amenity_ids or ():
+        stmt = stmt.where(
+            select(models.HotelAmenity)
+            .where(models.HotelAmenity.hotel_id == models.Hotel.id, models.HotelAmenity.amenity_id == amenity_id)
+            .exists()
+        )
+    if region:
+        stmt = stmt.where(models.Hotel.location_id.in_(
+            select(models.Location.id).where(models.Location.region == region)
+        ))
+    return paginate(stmt, models.Hotel.id, skip, limit, after_id)
+
 def get_hotel(db: Session, hotel_id: int):
-    return db.query(models.Hotel).filter(models.Hotel.id == hotel_id).first()
+    return db.get(models.Hotel, hotel_id, options=[joinedload(models.Hotel.location)])
 
-def get_hotels(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Hotel).offset(skip).limit(limit).all()
+def get_hotels(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None,
+    amenities: Optional[str] = None,
+    region: Optional[str] = None,
+):
+    """amenities is comma-separated; a hotel must offer all of them."""
+    names = amenity_names(amenities)
+    amenity_ids = db.scalars(amenity_ids_stmt(names)).all() if names else None
+    if names and len(amenity_ids) < len(names):
+        return []  # Some amenity no hotel offers
+    return db.scalars(hotels_stmt(skip, limit, after_id, amenity_ids, region)).all()
 
 # Activity CRUD operations
 def create_activity(db: Session, activity: schemas.ActivityCreate):
     db_activity = models.Activity(**activity.dict())
     db.add(db_activity)
+    bump_table_versions(db, "activities")
     db.commit()
+    catalog_cache.invalidate()
     db.refresh(db_activity)
     return db_activity
 
+def activities_stmt(skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    stmt = select(models.Activity).options(joinedload(models.Activity.location))
+    return paginate(stmt, models.Activity.id, skip, limit, after_id)
+
 def get_activity(db: Session, activity_id: int):
-    return db.query(models.Activity).filter(models.Activity.id == activity_id).first()
+    return db.get(models.Activity, activity_id, options=[joinedload(models.Activity.location)])
 
-def get_activities(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Activity).offset(skip).limit(limit).all()
\ No newline at end of file
+def get_activities(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    return db.scalars(activities_stmt(skip, limit, after_id)).all()
\ No newline at end of file
@@ -1,25 +1,174 @@
-from sqlalchemy import create_engine
+import os
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool, StaticPool
+
+from . import metrics
+
+load_dotenv()
+
+# SQLite database URL and engine profile, overridable from the environment / .env
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./travel_itinerary.db")
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "dev")
+
+# Alembic revision the application code expects (the head of migrations/versions)
+SCHEMA_REVISION = "0009"
+
+# Per-profile SQLite pragmas (applied on every new connection) and pool settings.
+# WAL lets readers proceed while a writer commits; synchronous=NORMAL is durable
+# across application crashes in WAL mode and avoids an fsync per commit.
+# foreign_keys is off by default in SQLite; every profile enforces them.
+ENGINE_PROFILES = {
+    "dev": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            "foreign_keys": "ON",
+        },
+        "pool": {"pool_size": 5, "max_overflow": 10},
+    },
+    "test": {
+        "pragmas": {
+            "journal_mode": "MEMORY",
+            "synchronous": "OFF",
+            "busy_timeout": 5000,
+            "foreign_keys": "ON",
+        },
+        # No pooling: every test gets a fresh connection (StaticPool for :memory:)
+        "pool": None,
+    },
+    "production": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),
+            "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+            # Negative values are KiB: 64 MiB of page cache per connection
+            "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+            "temp_store": "MEMORY",
+            "foreign_keys": "ON",
+        },
+        "pool": {
+            "pool_size": int(os.getenv("DATABASE_POOL_SIZE", "10")),
+            "max_overflow": int(os.getenv("DATABASE_MAX_OVERFLOW", "20")),
+            "pool_recycle": 3600,
+        },
+    },
+}
+
+def _is_memory_database(url: str) -> bool:
+    return url.endswith(":memory:") or url.rstrip("/").endswith("sqlite:")
+
+def _apply_pragmas(engine, pragmas: dict):
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def _instrument(engine):
+    # Per-request SQL statement count and time (see app.metrics)
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        metrics.record_statement(time.perf_counter() - context._metrics_started)
+
+def _pool_arguments(url: str, profile: dict, queue_pool) -> dict:
+    if _is_memory_database(url):
+        # One shared connection, otherwise each connection sees its own empty database
+        return {"poolclass": StaticPool}
+    if profile["pool"] is None:
+        return {"poolclass": NullPool}
+    return {"poolclass": queue_pool, **profile["pool"]}
+
+def create_db_engine(url: str = None, profile: str = None):
+    """
+    Create a synchronous engine configured for the given (or environment) profile.
+    """
+    url = url or SQLALCHEMY_DATABASE_URL
+    settings = ENGINE_PROFILES[profile or DATABASE_PROFILE]
+    db_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        **_pool_arguments(url, settings, QueuePool),
+    )
+    _apply_pragmas(db_engine, settings["pragmas"])
+    _instrument(db_engine)
+    return db_engine
 
-# SQLite database URL
-SQLALCHEMY_DATABASE_URL = "sqlite:///./travel_itinerary.db"
+def async_database_url(url: str) -> str:
+    """
+    Map a sqlite:// URL onto the aiosqlite driver.
+    """
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+def create_async_db_engine(url: str = None, profile: str = None):
+    """
+    Create an async (aiosqlite) engine configured for the given (or environment) profile.
+    """
+    url = async_database_url(url or SQLALCHEMY_DATABASE_URL)
+    settings = ENGINE_PROFILES[profile or DATABASE_PROFILE]
+    db_engine = create_async_engine(url, **_pool_arguments(url, settings, AsyncAdaptedQueuePool))
+    _apply_pragmas(db_engine.sync_engine, settings["pragmas"])
+    _instrument(db_engine.sync_engine)
+    return db_engine
 
 # Create SQLAlchemy engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = create_db_engine()
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine and session factory (aiosqlite) over the same database
+ASYNC_SQLALCHEMY_DATABASE_URL = async_database_url(SQLALCHEMY_DATABASE_URL)
+
+async_engine = create_async_db_engine()
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+async def get_schema_revision(db_engine) -> str:
+    """
+    Return the database's Alembic revision, or None if it has never been migrated.
+    """
+    try:
+        async with db_engine.connect() as connection:
+            result = await connection.execute(text("SELECT version_num FROM alembic_version"))
+            return result.scalar()
+    except OperationalError:
+        return None
+
 # Create Base class
 Base = declarative_base()
 
+# Count ORM rows hydrated per request (see app.metrics)
+@event.listens_for(Base, "load", propagate=True)
+def record_loaded_row(target, context):
+    metrics.record_row()
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency to get an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,63 @@
+import hashlib
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import async_crud
+
+# Tables whose rows are embedded in each resource's representation
+LOCATION_TABLES = ("locations",)
+HOTEL_TABLES = ("hotels", "locations")
+ACTIVITY_TABLES = ("activities", "locations")
+# Itinerary summaries embed hotel and activity prices
+ITINERARY_TABLES = ("itineraries", "hotels", "activities")
+ITINERARY_DETAIL_TABLES = ("itineraries", "hotels", "activities", "locations")
+SEARCH_TABLES = ("locations", "hotels", "activities")
+NEARBY_TABLES = ("locations", "hotels", "activities")
+# Transfers are only ever written with their itinerary
+ROUTE_TABLES = ("itineraries",)
+
+async def compute_etag(db: AsyncSession, request: Request, tables: Iterable[str]) -> str:
+    """
+    Build a strong ETag from the request URL and the change counters of the
+    tables the response is built from. Costs a single indexed lookup.
+    """
+    versions = await async_crud.get_table_versions(db, tuple(tables))
+    return etag_from_versions(request, versions)
+
+async def compute_etag_with_versions(
+    db: AsyncSession, request: Request, tables: Iterable[str], also: Iterable[str] = ()
+) -> Tuple[Dict[str, int], str]:
+    """
+    compute_etag() that also returns the counters it read, together with
+    those of the also tables (left out of the ETag), in the same lookup.
+    """
+    tables = tuple(tables)
+    versions = await async_crud.get_table_versions(db, tuple(dict.fromkeys(tables + tuple(also))))
+    return versions, etag_from_versions(request, {name: versions[name] for name in tables})
+
+def etag_from_versions(request: Request, versions: Dict[str, int]) -> str:
+    """compute_etag() from change counters the caller already read."""
+    key = "|".join(
+        [request.url.path, str(request.url.query)]
+        + [f"{name}:{version}" for name, version in sorted(versions.items())]
+    )
+    return '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
+def not_modified(request: Request, etag: str, exists: bool = True) -> Optional[Response]:
+    """
+    Return a 304 response if the request's If-None-Match matches etag, else None.
+
+    Tags are compared weakly, as RFC 9110 requires for If-None-Match (W/ is
+    ignored). `*` matches any current representation, so only when exists:
+    callers that learn whether the resource exists later pass exists=False,
+    then check again once it is found.
+    """
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return None
+    candidates = {candidate.strip().removeprefix("W/") for candidate in header.split(",")}
+    if (exists and "*" in candidates) or etag in candidates:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
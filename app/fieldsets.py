@@ -0,0 +1,190 @@
+"""
+Sparse fieldsets and include paths for itinerary reads.
+
+`include` lists the relationships to embed, as dotted paths from the
+itinerary: accommodations, accommodations.hotel, accommodations.hotel.location,
+transfers, itinerary_activities, itinerary_activities.activity and
+itinerary_activities.activity.location. A path embeds its parents too.
+
+`fields` lists the attributes to return, as dotted paths in the same way
+(name, accommodations.day_number, accommodations.hotel.name); a path ending
+in a relationship, or passing through one, embeds it. Every resource with at
+least one listed attribute returns only those (and its id); the others
+return all of theirs.
+
+Without either parameter an endpoint returns its usual shape. With either,
+the response holds exactly the selection: relationships outside it are
+neither loaded (crud.itinerary_load_options) nor serialized
+(serializers.selected).
+"""
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import load_only
+
+from . import models
+
+# Attributes (in response order) and relationships (name -> resource) of
+# each resource that can be selected from
+RESOURCES: Dict[str, Tuple[Tuple[str, ...], Dict[str, str]]] = {
+    "itinerary": (
+        ("id", "name", "duration_nights", "region", "description", "is_recommended", "created_at"),
+        {"accommodations": "accommodation", "transfers": "transfer", "itinerary_activities": "itinerary_activity"},
+    ),
+    # /itineraries/ rows also carry their summary
+    "itinerary_list_item": (
+        ("id", "name", "duration_nights", "region", "description", "is_recommended", "created_at", "summary"),
+        {"accommodations": "accommodation", "transfers": "transfer", "itinerary_activities": "itinerary_activity"},
+    ),
+    "accommodation": (("id", "hotel_id", "day_number", "check_in_date", "check_out_date"), {"hotel": "hotel"}),
+    "transfer": (
+        ("id", "day_number", "from_location", "to_location", "transfer_type", "duration_hours", "departure_time"),
+        {},
+    ),
+    "itinerary_activity": (("id", "activity_id", "day_number", "start_time"), {"activity": "activity"}),
+    "hotel": (
+        ("id", "name", "location_id", "rating", "price_per_night", "description", "amenities", "latitude", "longitude"),
+        {"location": "location"},
+    ),
+    "activity": (
+        ("id", "name", "location_id", "type", "duration_hours", "price", "description", "latitude", "longitude"),
+        {"location": "location"},
+    ),
+    "location": (("id", "name", "region", "description", "latitude", "longitude"), {}),
+}
+
+MODELS = {
+    "itinerary": models.Itinerary,
+    "itinerary_list_item": models.Itinerary,
+    "accommodation": models.Accommodation,
+    "transfer": models.Transfer,
+    "itinerary_activity": models.ItineraryActivity,
+    "hotel": models.Hotel,
+    "activity": models.Activity,
+    "location": models.Location,
+}
+
+# Column holding the id of each many-to-one relationship, loaded with the
+# row whenever the relationship is embedded (catalog rows are looked up by it)
+FOREIGN_KEYS = {"hotel": "hotel_id", "activity": "activity_id", "location": "location_id"}
+
+class InvalidSelectionError(ValueError):
+    """fields or include naming attributes or relationships that don't exist."""
+
+    def __init__(self, errors: List[dict]):
+        self._errors = errors
+        super().__init__("; ".join(error["msg"] for error in errors))
+
+    def errors(self, loc: Tuple = ()) -> List[dict]:
+        """The errors in the shape of Pydantic error entries, located under loc."""
+        return [{**error, "loc": (*loc, *error["loc"])} for error in self._errors]
+
+class Selection:
+    """The attributes and embedded relationships selected of one resource."""
+
+    __slots__ = ("resource", "fields", "include")
+
+    def __init__(self, resource: str, fields: Tuple[str, ...], include: Dict[str, "Selection"]):
+        self.resource = resource
+        self.fields = fields
+        self.include = include
+
+    def key(self) -> str:
+        """Canonical form, equal for equal selections (for cache keys)."""
+        nested = "".join(f"{name}({child.key()})" for name, child in sorted(self.include.items()))
+        return ",".join(self.fields) + (";" + nested if nested else "")
+
+    def columns(self) -> List:
+        """Column attributes of the resource's model that serializing the selection reads."""
+        model = MODELS[self.resource]
+        names = [name for name in self.fields if name in model.__table__.columns]
+        names += [FOREIGN_KEYS[name] for name in self.include if name in FOREIGN_KEYS]
+        return [getattr(model, name) for name in dict.fromkeys(names)]
+
+def _split(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+def parse_selection(fields: Optional[str], include: Optional[str], resource: str = "itinerary") -> Optional[Selection]:
+    """
+    The Selection of resource by comma-separated fields and include paths
+    (see the module docstring), or None when neither is given.
+
+    Raises:
+        InvalidSelectionError: a path names an unknown attribute or relationship
+    """
+    if fields is None and include is None:
+        return None
+    field_paths, include_paths = _split(fields), _split(include)
+
+    errors = []
+    # Per node: resource, listed attributes, embedded relationships
+    root = (resource, [], {})
+
+    def walk(path: str, parameter: str, attribute_allowed: bool):
+        node = root
+        names = path.split(".")
+        for depth, name in enumerate(names):
+            node_resource, listed, children = node
+            attributes, relationships = RESOURCES[node_resource]
+            if name in relationships:
+                node = children.setdefault(name, (relationships[name], [], {}))
+            elif attribute_allowed and depth == len(names) - 1 and name in attributes:
+                listed.append(name)
+            else:
+                errors.append({
+                    "type": "unknown_field",
+                    "loc": (parameter,),
+                    "msg": f"Unknown {'field' if attribute_allowed else 'relationship'} '{name}' of {node_resource}"
+                    + (f" in '{path}'" if len(names) > 1 else ""),
+                    "input": path,
+                })
+                return
+
+    for path in include_paths:
+        walk(path, "include", attribute_allowed=False)
+    for path in field_paths:
+        walk(path, "fields", attribute_allowed=True)
+    if errors:
+        raise InvalidSelectionError(errors)
+
+    def build(node) -> Selection:
+        node_resource, listed, children = node
+        attributes = RESOURCES[node_resource][0]
+        selected = tuple(name for name in attributes if name == "id" or name in listed) if listed else attributes
+        return Selection(node_resource, selected, {name: build(child) for name, child in children.items()})
+
+    return build(root)
+
+def load_options(selection: Selection, collection_loader, with_catalog: bool = True) -> list:
+    """
+    Loader options for an itinerary query that load what selection reads:
+    its columns and the collections it embeds (with collection_loader), and
+    their catalog rows unless those come from the catalog cache (with_catalog=False).
+    """
+    model = MODELS[selection.resource]
+    options = [load_only(*selection.columns())]
+    for name, child in selection.include.items():
+        options.append(_chain(collection_loader(getattr(model, name)), child, with_catalog))
+    return options
+
+def _chain(loader, selection: Selection, with_catalog: bool):
+    loader = loader.load_only(*selection.columns())
+    if with_catalog:
+        # Below the collections every resource has at most one relationship
+        for name, child in selection.include.items():
+            loader = _chain(loader.joinedload(getattr(MODELS[selection.resource], name)), child, with_catalog)
+    return loader
+
+# Keys kept on generated plans whatever the selection: they describe the plan
+GENERATED_KEYS = ("generated", "summary")
+
+def project(content, selection: Selection, keep: Tuple[str, ...] = ()):
+    """selection applied to an already built dict (or list of dicts), keeping keep."""
+    if isinstance(content, list):
+        return [project(item, selection, keep) for item in content]
+    if content is None:
+        return None
+    projected = {name: content[name] for name in selection.fields + keep if name in content}
+    for name, child in selection.include.items():
+        if name in content:
+            projected[name] = project(content[name], child)
+    return projected
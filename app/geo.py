@@ -0,0 +1,103 @@
+"""
+Nearby search over catalog coordinates (locations, hotels and activities).
+
+Every catalog row with a latitude and longitude has an entry in catalog_geo,
+an R*Tree table kept in sync by the triggers created in migration 0008. A
+nearby query asks the R*Tree for the rows inside the bounding box of the
+search circle, then computes the haversine distance of those candidates in
+the same statement, keeps the ones inside the radius and sorts by distance.
+
+Only the nearest :limit rows are wanted, so a search first runs with a small
+radius and widens it (search_radii) until a pass fills the page: every row
+within that pass's radius was a candidate, so its page is the true nearest
+:limit. Dense areas are answered from a small box instead of every row
+inside the requested radius.
+"""
+import math
+from typing import Iterator, Tuple
+
+from sqlalchemy import bindparam, text
+
+GEO_TABLE = "catalog_geo"
+GEO_KINDS = ("location", "hotel", "activity")
+
+# Mean Earth radius (IUGG)
+EARTH_RADIUS_KM = 6371.0088
+
+# Radius of the first pass of a nearby search and the factor it grows by
+FIRST_PASS_RADIUS_KM = 1.0
+RADIUS_GROWTH = 4.0
+
+def haversine_km(latitude1: float, longitude1: float, latitude2: float, longitude2: float) -> float:
+    """Great-circle distance in km (the same formula nearby_stmt evaluates in SQL)."""
+    half_dlat = math.radians(latitude2 - latitude1) / 2
+    half_dlon = math.radians(longitude2 - longitude1) / 2
+    a = math.sin(half_dlat) ** 2 + math.cos(math.radians(latitude1)) * math.cos(math.radians(latitude2)) * math.sin(half_dlon) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def search_radii(radius_km: float) -> Iterator[float]:
+    """Growing pass radii of a nearby search, ending with radius_km itself."""
+    pass_radius = FIRST_PASS_RADIUS_KM
+    while pass_radius < radius_km:
+        yield pass_radius
+        pass_radius *= RADIUS_GROWTH
+    yield radius_km
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    (south, north, west, east) in degrees enclosing every point within
+    radius_km of (latitude, longitude). Near the poles, or when the circle
+    crosses the antimeridian, the box spans every longitude.
+    """
+    angular_radius = radius_km / EARTH_RADIUS_KM
+    south = latitude - math.degrees(angular_radius)
+    north = latitude + math.degrees(angular_radius)
+    if south <= -90 or north >= 90:
+        return max(south, -90.0), min(north, 90.0), -180.0, 180.0
+    # Widest longitude offset of the circle, where its edge touches a meridian
+    longitude_offset = math.degrees(math.asin(math.sin(angular_radius) / math.cos(math.radians(latitude))))
+    west, east = longitude - longitude_offset, longitude + longitude_offset
+    if west < -180 or east > 180:
+        return south, north, -180.0, 180.0
+    return south, north, west, east
+
+def nearby_stmt(by_kind: bool = False):
+    """
+    Catalog rows within :radius_km of (:latitude, :longitude), nearest first,
+    at most :limit; restricted to :kinds when by_kind. The bounding box
+    parameters (:south, :north, :west, :east) come from bounding_box().
+    """
+    kind_filter = "AND kind IN :kinds" if by_kind else ""
+    stmt = text(f"""
+        SELECT kind, id, name, latitude, longitude, distance_km
+        FROM (
+            SELECT kind, entity_id AS id, name, latitude, longitude,
+                   2 * {EARTH_RADIUS_KM} * asin(sqrt(
+                       pow(sin(radians(latitude - :latitude) / 2), 2)
+                       + cos(radians(:latitude)) * cos(radians(latitude))
+                       * pow(sin(radians(longitude - :longitude) / 2), 2)
+                   )) AS distance_km
+            FROM {GEO_TABLE}
+            WHERE max_lat >= :south AND min_lat <= :north
+              AND max_lon >= :west AND min_lon <= :east {kind_filter}
+        )
+        WHERE distance_km <= :radius_km
+        ORDER BY distance_km
+        LIMIT :limit
+    """)
+    if by_kind:
+        stmt = stmt.bindparams(bindparam("kinds", expanding=True))
+    return stmt
+
+def nearby_params(latitude: float, longitude: float, radius_km: float, limit: int) -> dict:
+    south, north, west, east = bounding_box(latitude, longitude, radius_km)
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "radius_km": radius_km,
+        "limit": limit,
+        "south": south,
+        "north": north,
+        "west": west,
+        "east": east,
+    }
@@ -0,0 +1,522 @@
+"""
+Itinerary plans generated on the fly from the catalog.
+
+The MCP server falls back to these when no stored recommended itinerary
+matches a request. A plan books one hotel per night, fills each day with
+activities at that night's location within a daily hour budget, and adds
+transfers: from the region's airport on day 1, on every move between
+locations, and back to the airport the day after the last night (the shape
+the synthetic data generator uses). Transfers take the shortest known car
+route's duration (route_graph), else an estimate from the distance.
+
+Nights are planned with a beam search. Every partial plan is extended by
+staying put or by moving to one of the region's best locations, and only the
+BEAM_WIDTH best partial plans survive each night. A day's activities are a
+knapsack (most value within the day's half-hour slots, at most
+MAX_ACTIVITIES_PER_DAY), solved once per set of unbooked candidates and
+memoized, so partial plans that share a location's history share the work.
+
+A budget bounds the search by the cheapest hotels: regions whose cheapest
+nights exceed it are not loaded (cheapest_stay), and steps that can't be
+completed within it are dropped before their day is planned.
+"""
+import heapq
+import math
+from dataclasses import dataclass, field
+from datetime import time as time_of_day
+from itertools import islice
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, aliased
+
+from . import crud, geo, models, serializers
+from .route_graph import route_graph
+
+DAILY_HOURS = 8
+SLOTS_PER_HOUR = 2  # Days are planned in half hours
+DAY_SLOTS = DAILY_HOURS * SLOTS_PER_HOUR
+MAX_ACTIVITIES_PER_DAY = 3
+DAY_START_HOUR = 9
+
+MAX_NIGHTS_PER_LOCATION = 3  # Relaxed when a region has too few locations
+
+# Search breadth: unbooked activities a day is chosen from (best first),
+# hotels kept per location (best scores plus the cheapest), locations
+# considered each night, and partial plans kept after each night
+DAY_CANDIDATES = 12
+ACTIVITIES_PER_LOCATION = DAY_CANDIDATES + MAX_NIGHTS_PER_LOCATION * MAX_ACTIVITIES_PER_DAY
+HOTELS_PER_LOCATION = 2
+CANDIDATE_LOCATIONS = 6
+BEAM_WIDTH = 8
+PLANS_PER_REGION = 3
+
+# A hotel scores its rating and an activity 1 (its duration only uses up the
+# day, so a few short activities beat one long one). Both lose PRICE_WEIGHT
+# per multiple of the region's average price; every move to another location
+# costs MOVE_PENALTY.
+PRICE_WEIGHT = 0.5
+MOVE_PENALTY = 1.0
+
+# Transfers without a known car route
+AIRPORT_TRANSFER_HOURS = 1.0
+DEFAULT_TRANSFER_HOURS = 1.0  # Between locations without coordinates
+ROAD_SPEED_KMH = 40.0
+
+@dataclass(frozen=True)
+class HotelOption:
+    id: int
+    rating: float
+    price: float
+    score: float
+
+@dataclass(frozen=True)
+class ActivityOption:
+    id: int
+    type: models.ActivityType
+    slots: int
+    price: float
+    score: float
+
+@dataclass(eq=False)
+class LocationOption:
+    id: int
+    name: str
+    latitude: Optional[float]
+    longitude: Optional[float]
+    hotels: List[HotelOption] = field(default_factory=list)
+    activities: List[ActivityOption] = field(default_factory=list)  # Best score first
+
+class DayPlan(NamedTuple):
+    score: float
+    price: float
+    activities: Tuple[ActivityOption, ...]
+
+FREE_DAY = DayPlan(0.0, 0.0, ())
+
+class PartialPlan(NamedTuple):
+    score: float
+    price: float
+    stays: Tuple[Tuple[LocationOption, HotelOption], ...]  # One per night
+    days: Tuple[DayPlan, ...]
+    transfer_hours: Tuple[float, ...]  # Transfer at the start of each day, 0 if none
+
+def _hotel_options(db: Session, region: str, min_rating: Optional[float]):
+    """
+    Per location of region, the HOTELS_PER_LOCATION best scored hotels rated
+    at least min_rating, then the cheapest (which may repeat one of them).
+    """
+    def criteria(hotel):
+        in_region = hotel.location_id.in_(select(models.Location.id).where(models.Location.region == region))
+        return [in_region] if min_rating is None else [in_region, hotel.rating >= min_rating]
+
+    average_price = db.scalar(select(func.avg(models.Hotel.price_per_night)).where(*criteria(models.Hotel))) or 1
+    score = models.Hotel.rating - PRICE_WEIGHT * models.Hotel.price_per_night / average_price
+
+    # Each location's picks are a short range scan of the covering index,
+    # correlated to the location row
+    ranked = aliased(models.Hotel)
+    per_location = select(ranked.id).where(ranked.location_id == models.Location.id, *criteria(ranked)[1:])
+    best = per_location.order_by(
+        (ranked.rating - PRICE_WEIGHT * ranked.price_per_night / average_price).desc()
+    ).limit(HOTELS_PER_LOCATION)
+    cheapest = per_location.order_by(ranked.price_per_night).limit(1)
+
+    options = []
+    for picks in (best, cheapest):
+        options += db.execute(
+            select(models.Hotel.id, models.Hotel.location_id, models.Hotel.rating, models.Hotel.price_per_night, score)
+            .join_from(models.Location, models.Hotel, models.Hotel.id.in_(picks.correlate(models.Location)))
+            .where(models.Location.region == region)
+        ).all()
+    return options
+
+def _activity_options(db: Session, region: str):
+    """Per location of region, the ACTIVITIES_PER_LOCATION best scored activities that fit in a day."""
+    average_price = db.scalar(
+        select(func.avg(models.Activity.price)).where(
+            models.Activity.location_id.in_(select(models.Location.id).where(models.Location.region == region)),
+            models.Activity.duration_hours <= DAILY_HOURS,
+        )
+    ) or 1
+    score = 1 - PRICE_WEIGHT * models.Activity.price / average_price
+
+    # The score falls with price, so each location's best are the first
+    # entries of its covering index range
+    ranked = aliased(models.Activity)
+    best = (
+        select(ranked.id)
+        .where(ranked.location_id == models.Location.id, ranked.duration_hours <= DAILY_HOURS)
+        .order_by(ranked.price)
+        .limit(ACTIVITIES_PER_LOCATION)
+    )
+    return db.execute(
+        select(
+            models.Activity.id, models.Activity.location_id, models.Activity.type,
+            models.Activity.duration_hours, models.Activity.price, score,
+        )
+        .join_from(models.Location, models.Activity, models.Activity.id.in_(best.correlate(models.Location)))
+        .where(models.Location.region == region, score > 0)
+    ).all()
+
+def load_region(db: Session, region: str, min_rating: Optional[float] = None) -> List[LocationOption]:
+    """
+    The region's locations that have a hotel rated at least min_rating, with
+    their scored hotel and activity options. Scoring and the per-location cut
+    run in SQLite, so only the options come back.
+    """
+    locations = {
+        location_id: LocationOption(location_id, name, latitude, longitude)
+        for location_id, name, latitude, longitude in db.execute(
+            select(models.Location.id, models.Location.name, models.Location.latitude, models.Location.longitude)
+            .where(models.Location.region == region)
+        )
+    }
+    if not locations:
+        return []
+
+    for hotel_id, location_id, rating, price, score in _hotel_options(db, region, min_rating):
+        hotel = HotelOption(hotel_id, rating, price, score)
+        if hotel not in locations[location_id].hotels:
+            locations[location_id].hotels.append(hotel)
+    for activity_id, location_id, activity_type, hours, price, score in _activity_options(db, region):
+        slots = math.ceil(hours * SLOTS_PER_HOUR)
+        locations[location_id].activities.append(ActivityOption(activity_id, activity_type, slots, price, score))
+    for location in locations.values():
+        location.hotels.sort(key=lambda hotel: hotel.score, reverse=True)
+        location.activities.sort(key=lambda activity: activity.score, reverse=True)
+    return [location for location in locations.values() if location.hotels]
+
+def _cheapest_night(location: LocationOption) -> float:
+    return min(hotel.price for hotel in location.hotels)
+
+def _cheapest_stays(stays, nights: int) -> float:
+    """
+    Lowest cost of placing nights in stays, (price per night, most nights)
+    pairs, cheapest first. Infinite when the nights can't be placed at all.
+    """
+    cost = 0.0
+    for price, most in sorted(stays):
+        if nights <= 0:
+            break
+        cost += min(most, nights) * price
+        nights -= min(most, nights)
+    return cost if nights <= 0 else math.inf
+
+def _nights_per_location(nights: int, locations: int) -> int:
+    return max(MAX_NIGHTS_PER_LOCATION, math.ceil(nights / locations))
+
+def cheapest_stay(db: Session, region: str, nights: int, min_rating: Optional[float] = None) -> float:
+    """
+    Lowest hotel cost of nights in region at hotels rated at least
+    min_rating, infinite when no location has one: no plan of the region
+    costs less. One grouped range scan per location, so a budget no plan
+    can meet is turned down before the region is loaded.
+    """
+    criteria = [models.Location.region == region]
+    if min_rating is not None:
+        criteria.append(models.Hotel.rating >= min_rating)
+    prices = db.scalars(
+        select(func.min(models.Hotel.price_per_night))
+        .join_from(models.Location, models.Hotel)
+        .where(*criteria)
+        .group_by(models.Hotel.location_id)
+    ).all()
+    if not prices:
+        return math.inf
+    most = _nights_per_location(nights, len(prices))
+    return _cheapest_stays([(price, most) for price in prices], nights)
+
+class Planner:
+    """Beam search over a region's locations (see the module docstring)."""
+
+    def __init__(
+        self,
+        locations: List[LocationOption],
+        nights: int,
+        max_budget: Optional[float] = None,
+        airport: Optional[str] = None,
+    ):
+        self.nights = nights
+        self.max_budget = max_budget
+        self.airport = airport
+        self.nights_per_location = _nights_per_location(nights, len(locations))
+        self._days: Dict[Tuple[int, ...], List[List[DayPlan]]] = {}
+        self._day_choices: Dict[Tuple[int, int, frozenset], List[DayPlan]] = {}
+        self._travel: Dict[Tuple[int, int], float] = {}
+        # Only the locations with the best hotel and activities are worth
+        # visiting; on a budget, so are the ones with the cheapest nights
+        least_locations = math.ceil(nights / self.nights_per_location)
+        self.candidates = heapq.nlargest(
+            max(CANDIDATE_LOCATIONS, least_locations),
+            locations,
+            key=lambda location: location.hotels[0].score + sum(
+                activity.score for activity in location.activities[:MAX_ACTIVITIES_PER_DAY]
+            ),
+        )
+        if max_budget is not None:
+            for location in heapq.nsmallest(least_locations, locations, key=_cheapest_night):
+                if location not in self.candidates:
+                    self.candidates.append(location)
+        self._cheapest_nights = sorted((_cheapest_night(location), location.id) for location in self.candidates)
+
+    def days(self, location: LocationOption, slots: int, booked) -> List[DayPlan]:
+        """
+        The best activities at location within slots, skipping booked activity
+        ids: the best day with at most MAX_ACTIVITIES_PER_DAY, then (only
+        distinct ones) at most one less, down to the free day.
+        """
+        choice_key = (location.id, slots, frozenset(booked))
+        days = self._day_choices.get(choice_key)
+        if days is not None:
+            return days
+        candidates = tuple(islice((a for a in location.activities if a.id not in booked), DAY_CANDIDATES))
+        key = tuple(activity.id for activity in candidates)
+        plans = self._days.get(key)
+        if plans is None:
+            plans = self._days[key] = self._knapsack(candidates)
+        days = []
+        for by_count in reversed(plans):
+            if not days or by_count[slots] != days[-1]:
+                days.append(by_count[slots])
+        self._day_choices[choice_key] = days
+        return days
+
+    @staticmethod
+    def _knapsack(candidates: Tuple[ActivityOption, ...]) -> List[List[DayPlan]]:
+        """
+        best[count][slots]: best DayPlan of at most count activities within
+        slots, for every count and slot budget (0/1 knapsack with a count limit).
+        """
+        best = [[FREE_DAY] * (DAY_SLOTS + 1) for _ in range(MAX_ACTIVITIES_PER_DAY + 1)]
+        for activity in candidates:
+            for count in range(MAX_ACTIVITIES_PER_DAY, 0, -1):
+                fewer, row = best[count - 1], best[count]
+                for slots in range(DAY_SLOTS, activity.slots - 1, -1):
+                    base = fewer[slots - activity.slots]
+                    if base.score + activity.score > row[slots].score:
+                        row[slots] = DayPlan(base.score + activity.score, base.price + activity.price, base.activities + (activity,))
+        return best
+
+    def airport_hours(self, location: LocationOption) -> float:
+        """Transfer hours between the airport and location."""
+        hours = route_graph.duration(self.airport, location.name, models.TransferType.CAR) if self.airport else None
+        return hours if hours is not None else AIRPORT_TRANSFER_HOURS
+
+    def travel_hours(self, origin: LocationOption, destination: LocationOption) -> float:
+        key = (origin.id, destination.id)
+        hours = self._travel.get(key)
+        if hours is None:
+            hours = route_graph.duration(origin.name, destination.name, models.TransferType.CAR)
+            if hours is None and None in (origin.latitude, origin.longitude, destination.latitude, destination.longitude):
+                hours = DEFAULT_TRANSFER_HOURS
+            elif hours is None:
+                distance = geo.haversine_km(origin.latitude, origin.longitude, destination.latitude, destination.longitude)
+                hours = max(1, math.ceil(distance / ROAD_SPEED_KMH * SLOTS_PER_HOUR)) / SLOTS_PER_HOUR
+            self._travel[key] = hours
+        return hours
+
+    def plans(self, count: int = 1) -> List[PartialPlan]:
+        """Up to count complete plans, best first."""
+        if self.max_budget is None:
+            return self._search(count, None)
+        # Nothing to search when even the cheapest nights break the budget
+        cheapest = _cheapest_stays([(price, self.nights_per_location) for price, _ in self._cheapest_nights], self.nights)
+        if cheapest > self.max_budget:
+            return []
+        # A budget the best plans already meet changes nothing; otherwise
+        # search again, weighing cheaper days
+        plans = self._search(count, None)
+        if all(plan.price <= self.max_budget for plan in plans):
+            return plans
+        return self._search(count, self.max_budget)
+
+    def _search(self, count: int, max_budget: Optional[float]) -> List[PartialPlan]:
+        beam = [PartialPlan(0.0, 0.0, (), (), ())]
+        for night in range(self.nights):
+            extended = [step for plan in beam for step in self._extend(plan, self.nights - night - 1, max_budget)]
+            beam = heapq.nlargest(BEAM_WIDTH, extended, key=lambda plan: plan.score)
+        return beam[:count]
+
+    def _cheapest_rest(self, here: LocationOption, hotel: HotelOption, nights_here: int, visited, nights_left: int) -> float:
+        """
+        Lowest hotel cost of the nights left: the rest of the stay at here,
+        then unvisited candidates, cheapest first. Infinite when the nights
+        can't be placed at all.
+        """
+        stays = [(hotel.price, self.nights_per_location - nights_here)] + [
+            (price, self.nights_per_location) for price, location_id in self._cheapest_nights if location_id not in visited
+        ]
+        return _cheapest_stays(stays, nights_left)
+
+    def _extend(self, plan: PartialPlan, nights_left: int, max_budget: Optional[float]):
+        visited = {location.id for location, _ in plan.stays}
+        if not plan.stays:
+            moves = [
+                (location, hotel, self.airport_hours(location), 0.0)
+                for location in self.candidates
+                for hotel in location.hotels
+            ]
+        else:
+            here, hotel = plan.stays[-1]
+            nights_here = sum(1 for location, _ in plan.stays if location is here)
+            moves = [(here, hotel, 0.0, 0.0)] if nights_here < self.nights_per_location else []
+            moves += [
+                (location, option, self.travel_hours(here, location), MOVE_PENALTY)
+                for location in self.candidates
+                if location.id not in visited
+                for option in location.hotels
+            ]
+
+        for location, hotel, transfer_hours, penalty in moves:
+            # Drop steps the remaining nights can't follow (no capacity left, or
+            # over budget even at the cheapest hotels) before planning the day
+            nights_there = 1 + (sum(1 for stay, _ in plan.stays if stay is location) if penalty == 0 else 0)
+            rest = self._cheapest_rest(location, hotel, nights_there, visited | {location.id}, nights_left)
+            if math.isinf(rest) or max_budget is not None and plan.price + hotel.price + rest > max_budget:
+                continue
+            booked = {
+                activity.id
+                for (stay, _), day in zip(plan.stays, plan.days)
+                if stay is location
+                for activity in day.activities
+            }
+            slots = max(0, DAY_SLOTS - math.ceil(transfer_hours * SLOTS_PER_HOUR))
+            # On a budget, cheaper days with fewer activities may be what fits
+            days = self.days(location, slots, booked)
+            for day in days if max_budget is not None else days[:1]:
+                price = plan.price + hotel.price + day.price
+                if max_budget is not None and price + rest > max_budget:
+                    continue
+                yield PartialPlan(
+                    plan.score + hotel.score + day.score - penalty,
+                    price,
+                    plan.stays + ((location, hotel),),
+                    plan.days + (day,),
+                    plan.transfer_hours + (transfer_hours,),
+                )
+
+def _render(
+    plan: PartialPlan,
+    nights: int,
+    region: str,
+    rank: int,
+    departure_hours: float,
+    hotels: Dict[int, dict],
+    activities: Dict[int, dict],
+) -> dict:
+    """schemas.GeneratedItinerary for a complete plan."""
+    accommodations, transfers, itinerary_activities = [], [], []
+    previous = f"{region} Airport"
+    for day_number, ((location, hotel), day, transfer_hours) in enumerate(
+        zip(plan.stays, plan.days, plan.transfer_hours), start=1
+    ):
+        accommodations.append({
+            "hotel_id": hotel.id,
+            "day_number": day_number,
+            "check_in_date": None,
+            "check_out_date": None,
+            "hotel": hotels[hotel.id],
+        })
+        if transfer_hours:
+            transfers.append({
+                "day_number": day_number,
+                "from_location": previous,
+                "to_location": location.name,
+                "transfer_type": models.TransferType.CAR.value,
+                "duration_hours": transfer_hours,
+                "departure_time": None,
+            })
+            previous = location.name
+        slot = DAY_START_HOUR * SLOTS_PER_HOUR + math.ceil(transfer_hours * SLOTS_PER_HOUR)
+        for activity in day.activities:
+            itinerary_activities.append({
+                "activity_id": activity.id,
+                "day_number": day_number,
+                "start_time": time_of_day(slot // SLOTS_PER_HOUR, slot % SLOTS_PER_HOUR * 60 // SLOTS_PER_HOUR),
+                "activity": activities[activity.id],
+            })
+            slot += activity.slots
+    transfers.append({
+        "day_number": nights + 1,
+        "from_location": previous,
+        "to_location": f"{region} Airport",
+        "transfer_type": models.TransferType.CAR.value,
+        "duration_hours": departure_hours,
+        "departure_time": None,
+    })
+
+    booked = [activity for day in plan.days for activity in day.activities]
+    return {
+        "name": f"{nights}-Night {region} Plan {rank}",
+        "duration_nights": nights,
+        "region": region,
+        "description": f"Generated from the {region} catalog.",
+        "is_recommended": True,
+        "generated": True,
+        "summary": {
+            "total_price": round(plan.price, 2),
+            "activity_count": len(booked),
+            "transfer_hours": sum(transfer["duration_hours"] for transfer in transfers),
+            "activity_types": list(dict.fromkeys(activity.type.value for activity in booked)),
+            "min_hotel_rating": min(hotel.rating for _, hotel in plan.stays),
+        },
+        "accommodations": accommodations,
+        "transfers": transfers,
+        "itinerary_activities": itinerary_activities,
+    }
+
+def generate(
+    db: Session,
+    nights: int,
+    region: Optional[str] = None,
+    max_budget: Optional[float] = None,
+    min_rating: Optional[float] = None,
+) -> List[dict]:
+    """
+    Plans for nights in region (PLANS_PER_REGION of them), or the best plan
+    of every region when region is None, rendered as GeneratedItinerary dicts.
+    """
+    regions = [region] if region else db.scalars(
+        select(models.Location.region).distinct().order_by(models.Location.region)
+    ).all()
+    count = PLANS_PER_REGION if region else 1
+    if max_budget is not None:
+        regions = [name for name in regions if cheapest_stay(db, name, nights, min_rating) <= max_budget]
+    if not regions:
+        return []
+
+    route_graph.refresh(db)
+    planned: List[Tuple[str, Planner, List[PartialPlan]]] = []
+    for name in regions:
+        locations = load_region(db, name, min_rating)
+        if locations:
+            planner = Planner(locations, nights, max_budget, airport=f"{name} Airport")
+            planned.append((name, planner, planner.plans(count)))
+
+    # The plans book catalog rows in their full representation
+    catalog = crud.get_catalog(db)
+    hotels = {
+        hotel.id: catalog.hotel_content(catalog.hotels[hotel.id])
+        for _, _, plans in planned for plan in plans for _, hotel in plan.stays
+    }
+    activities = {
+        activity.id: catalog.activity_content(catalog.activities[activity.id])
+        for _, _, plans in planned for plan in plans for day in plan.days for activity in day.activities
+    }
+
+    return [
+        _render(plan, nights, name, rank, planner.airport_hours(plan.stays[-1][0]), hotels, activities)
+        for name, planner, plans in planned
+        for rank, plan in enumerate(plans, start=1)
+    ]
+
+def generate_payload(
+    db: Session,
+    nights: int,
+    region: Optional[str] = None,
+    max_budget: Optional[float] = None,
+    min_rating: Optional[float] = None,
+) -> bytes:
+    """JSON-encoded MCPResponse of generated plans."""
+    return serializers.dumps({"recommended_itineraries": generate(db, nights, region, max_budget, min_rating)})
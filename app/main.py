@@ -1,88 +1,570 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Query
+import time
+
+# Measured cold start: from the app module being imported to workers being ready
+BOOT_STARTED = time.perf_counter()
+
+import csv
+import json
+import logging
+from functools import partial
+
+from fastapi import FastAPI, Depends, File, HTTPException, Path, Request, UploadFile, status, Query
+from fastapi.responses import JSONResponse, ORJSONResponse, Response, StreamingResponse
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from pydantic import ValidationError
 from typing import List, Optional
 
-from . import models, schemas, crud
-from .database import engine, get_db
-from .mcp_server import MCPServer
-from .seed_data import seed_data
+from . import schemas, serializers, async_crud, catalog_import, fieldsets, geo, metrics, search
+from .catalog_cache import CATALOG_TABLES, CatalogSnapshot
+from .crud import InvalidItineraryError
+from .route_graph import UnknownRouteError
+from .database import SCHEMA_REVISION, AsyncSessionLocal, async_engine, get_async_db, get_db, get_schema_revision
+from .mcp_server import AsyncMCPServer, recommendation_index
+from .shared_cache import shared_cache
+from .etags import (
+    ACTIVITY_TABLES,
+    HOTEL_TABLES,
+    ITINERARY_DETAIL_TABLES,
+    ITINERARY_TABLES,
+    LOCATION_TABLES,
+    NEARBY_TABLES,
+    ROUTE_TABLES,
+    SEARCH_TABLES,
+    compute_etag,
+    compute_etag_with_versions,
+    not_modified,
+)
+from .pagination import decode_cursor, set_next_cursor
+
+logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Travel Itinerary API",
     description="API for managing travel itineraries in Thailand",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
-# Create database tables and seed data on startup
+# Per-route request and SQL metrics, served at /metrics
+app.router.route_class = metrics.InstrumentedRoute
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Loader strategy for the itinerary graph, per endpoint (see crud.ITINERARY_LOAD_STRATEGIES)
+ITINERARY_DETAIL_LOAD_STRATEGY = "selectin"
+MCP_LOAD_STRATEGY = "selectin"
+
+# Bulk ingestion: items validated per insert batch, and the NDJSON media type
+BULK_BATCH_SIZE = 1000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Itineraries fetched (and serialized) per round trip by the NDJSON export
+EXPORT_BATCH_SIZE = 500
+
+# Workers never create tables or seed data (see app.manage); they only check
+# that the database is at the schema revision this code expects, and load
+# the catalog cache.
 @app.on_event("startup")
-def startup_event():
-    models.Base.metadata.create_all(bind=engine)
-    seed_data()
+async def startup_event():
+    async with AsyncSessionLocal() as db:
+        await _check_schema(db)
+    app.state.cold_start_seconds = round(time.perf_counter() - BOOT_STARTED, 4)
+    if not app.state.schema_ready:
+        logger.warning(
+            "Database schema is at %s, expected %s; run `python -m app.manage migrate`",
+            app.state.schema_revision, SCHEMA_REVISION,
+        )
+    logger.info("Worker ready in %.3fs", app.state.cold_start_seconds)
+
+async def _check_schema(db: AsyncSession):
+    """Record whether the database is at SCHEMA_REVISION, and if so load the catalog cache."""
+    app.state.schema_revision = await get_schema_revision(async_engine)
+    app.state.schema_ready = app.state.schema_revision == SCHEMA_REVISION
+    if app.state.schema_ready:
+        await async_crud.get_catalog(db)
+
+# Close pooled connections (and their aiosqlite worker threads) on shutdown
+@app.on_event("shutdown")
+async def shutdown_event():
+    await async_engine.dispose()
+    shared_cache.close()
 
 # Root endpoint
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Welcome to the Travel Itinerary API"}
 
+# Health endpoints
+@app.get("/healthz")
+async def healthz():
+    """
+    Liveness probe: the process is up and serving requests.
+    """
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz(db: AsyncSession = Depends(get_async_db)):
+    """
+    Readiness probe: the database is reachable and at the expected schema revision.
+    """
+    try:
+        await db.execute(text("SELECT 1"))
+        if not app.state.schema_ready:
+            # The database may have been migrated since this worker started
+            await _check_schema(db)
+    except SQLAlchemyError:
+        return JSONResponse(
+            {"status": "unavailable", "reason": "database unreachable", **_readiness()}, status_code=503
+        )
+    if not app.state.schema_ready:
+        return JSONResponse(
+            {"status": "unavailable", "reason": "schema revision mismatch", **_readiness()}, status_code=503
+        )
+    return {"status": "ready", **_readiness()}
+
+def _readiness() -> dict:
+    return {
+        "schema_revision": app.state.schema_revision,
+        "expected_schema_revision": SCHEMA_REVISION,
+        "cold_start_seconds": app.state.cold_start_seconds,
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """
+    Request counts, latency histograms, SQL statements/time, hydrated rows and
+    serialization time per route, in Prometheus text format.
+    """
+    return Response(metrics.registry.render(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
+def _serialized(serializer, rows, response: Optional[Response] = None, status_code: int = 200) -> ORJSONResponse:
+    """
+    Serialize a row (or list of rows) with an app.serializers function, skipping
+    response_model validation, and carry over headers set on the injected response.
+    """
+    started = time.perf_counter()
+    content = [serializer(row) for row in rows] if isinstance(rows, list) else serializer(rows)
+    headers = dict(response.headers) if response is not None else None
+    serialized = ORJSONResponse(content, status_code=status_code, headers=headers)
+    metrics.record_serialization(time.perf_counter() - started)
+    return serialized
+
+async def _catalog_page(
+    catalog: CatalogSnapshot, kind: str, response: Response, skip: int, limit: int, cursor: Optional[str], **filters
+) -> Response:
+    """
+    A list page served from the catalog cache, encoded once per snapshot
+    (in the shared cache), with the headers set on the injected response.
+    """
+    started = time.perf_counter()
+    records, payload = await catalog.page(kind, skip=skip, limit=limit, after_id=decode_cursor(cursor), **filters)
+    set_next_cursor(response, records, limit)
+    page = Response(payload, media_type="application/json", headers=dict(response.headers))
+    metrics.record_serialization(time.perf_counter() - started)
+    return page
+
+def _selection(
+    fields: Optional[str], include: Optional[str], resource: str = "itinerary", loc: str = "query"
+) -> Optional[fieldsets.Selection]:
+    """The sparse fieldset of an itinerary read (see app.fieldsets); unknown names are a 422."""
+    try:
+        return fieldsets.parse_selection(fields, include, resource)
+    except fieldsets.InvalidSelectionError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors(loc=(loc,)))
+
 # Itinerary endpoints
 @app.post("/itineraries/", response_model=schemas.Itinerary, status_code=status.HTTP_201_CREATED)
-def create_itinerary(itinerary: schemas.ItineraryCreate, db: Session = Depends(get_db)):
+async def create_itinerary(itinerary: schemas.ItineraryCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Create a new travel itinerary with accommodations, transfers, and activities.
+    A transfer without `duration_hours` gets the shortest known route's duration.
+    Unknown hotel or activity ids and day numbers outside the trip are rejected
+    with a 422 listing each of them.
     """
-    return crud.create_itinerary(db=db, itinerary=itinerary)
+    try:
+        db_itinerary = await async_crud.create_itinerary(db=db, itinerary=itinerary)
+    except InvalidItineraryError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors(loc=("body",)))
+    except UnknownRouteError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors(loc=("body",)))
+    return _serialized(serializers.itinerary, db_itinerary, status_code=status.HTTP_201_CREATED)
+
+async def _iter_bulk_payload(request: Request):
+    """
+    Yield raw items from a JSON array body or, for NDJSON, line by line as the body streams in.
+    """
+    if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+        if buffer.strip():
+            yield json.loads(buffer)
+    else:
+        items = json.loads(await request.body())
+        if not isinstance(items, list):
+            raise HTTPException(status_code=422, detail="Expected a JSON array of itineraries")
+        for item in items:
+            yield item
+
+@app.post(
+    "/itineraries/bulk",
+    response_model=schemas.BulkItineraryResult,
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": {"$ref": "#/components/schemas/ItineraryCreate"}}},
+                NDJSON_MEDIA_TYPE: {"schema": {"$ref": "#/components/schemas/ItineraryCreate"}},
+            },
+            "required": True,
+        }
+    },
+)
+async def bulk_create_itineraries(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Create many itineraries in one transaction from a JSON array or an NDJSON stream.
+    Invalid items are reported by position and skipped; valid items are inserted in batches.
+    """
+    ids, errors, batch = [], [], []
+    index = 0
+    catalog = await async_crud.get_catalog(db)
+    try:
+        async for raw in _iter_bulk_payload(request):
+            try:
+                item = schemas.ItineraryCreate.model_validate(raw)
+                await async_crud.validate_itinerary(db, item, catalog)
+                await async_crud.fill_transfer_durations(db, item)
+                batch.append(item)
+            except ValidationError as exc:
+                errors.append(schemas.BulkItemError(index=index, errors=exc.errors(include_url=False)))
+            except InvalidItineraryError as exc:
+                errors.append(schemas.BulkItemError(index=index, errors=exc.errors()))
+            except UnknownRouteError as exc:
+                errors.append(schemas.BulkItemError(index=index, errors=exc.errors()))
+            index += 1
+            if len(batch) >= BULK_BATCH_SIZE:
+                ids.extend(await async_crud.bulk_create_itineraries(db, batch))
+                batch = []
+    except json.JSONDecodeError as exc:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Malformed JSON at item {index}: {exc.msg}")
+    ids.extend(await async_crud.bulk_create_itineraries(db, batch))
+    await db.commit()
+    return schemas.BulkItineraryResult(created=len(ids), ids=ids, errors=errors)
 
 @app.get("/itineraries/", response_model=List[schemas.ItineraryResponse])
-def read_itineraries(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_itineraries(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    skip: int = Query(0, ge=0, deprecated=True),
+    max_budget: Optional[float] = Query(None, ge=0),
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get all travel itineraries with their cost and duration summary, using cursor
+    pagination. Pass the X-Next-Cursor header of a response as `cursor` to fetch
+    the next page; `skip` is deprecated. `max_budget` keeps itineraries whose total
+    price is at most that amount (not those booking nothing yet), `min_rating`
+    those whose hotels are all rated at least that high. `fields` narrows the
+    attributes returned and `include` embeds accommodations, transfers and
+    activities (e.g. `include=accommodations.hotel`).
     """
-    Get all travel itineraries with pagination.
+    selection = _selection(fields, include, "itinerary_list_item")
+    embeds = selection is not None and bool(selection.include)
+    versions, etag = await compute_etag_with_versions(
+        db, request, ITINERARY_DETAIL_TABLES if embeds else ITINERARY_TABLES
+    )
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers["ETag"] = etag
+    itineraries = await async_crud.get_itineraries(
+        db, skip=skip, limit=limit, after_id=decode_cursor(cursor), max_budget=max_budget, min_rating=min_rating,
+        with_catalog=False, selection=selection,
+    )
+    set_next_cursor(response, itineraries, limit)
+    if selection is None:
+        return _serialized(serializers.itinerary_list_item, itineraries, response)
+    catalog = await async_crud.get_catalog(db, versions) if embeds else None
+    return _serialized(partial(serializers.selected, selection=selection, memo={}, catalog=catalog), itineraries, response)
+
+@app.get(
+    "/itineraries/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {"schema": {"$ref": "#/components/schemas/Itinerary"}}}}},
+)
+async def export_itineraries(db: AsyncSession = Depends(get_async_db)):
     """
-    itineraries = crud.get_itineraries(db, skip=skip, limit=limit)
-    return itineraries
+    Stream every itinerary with its accommodations, transfers and activities as NDJSON.
+    Itineraries are streamed from one cursor and written out a batch at a time,
+    with each batch's children read in one query per table, so memory use stays flat.
+    """
+    async def generate():
+        catalog = await async_crud.get_catalog(db)
+        async for documents in async_crud.iter_itinerary_export(db, catalog, batch_size=EXPORT_BATCH_SIZE):
+            yield serializers.dumps_lines(documents)
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
 
 @app.get("/itineraries/{itinerary_id}", response_model=schemas.ItineraryDetailResponse)
-def read_itinerary(itinerary_id: int, db: Session = Depends(get_db)):
+async def read_itinerary(
+    itinerary_id: int,
+    request: Request,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
     """
-    Get a specific travel itinerary by ID.
+    Get a specific travel itinerary by ID. `fields` (e.g. `name,accommodations.day_number,accommodations.hotel.name`)
+    and `include` (e.g. `accommodations,transfers`) return only the named attributes and relationships;
+    the others are neither queried nor serialized.
     """
-    db_itinerary = crud.get_itinerary(db, itinerary_id=itinerary_id)
-    if db_itinerary is None:
-        raise HTTPException(status_code=404, detail="Itinerary not found")
-    return db_itinerary
+    selection = _selection(fields, include)
+    versions, etag = await compute_etag_with_versions(db, request, ITINERARY_DETAIL_TABLES)
+    # If-None-Match: * is checked once the itinerary is found
+    unchanged = not_modified(request, etag, exists=False)
+    if unchanged is not None:
+        return unchanged
+
+    # Encoded once per version of the tables it embeds, for all workers
+    async def build() -> bytes:
+        db_itinerary = await async_crud.get_itinerary(
+            db, itinerary_id=itinerary_id, strategy=ITINERARY_DETAIL_LOAD_STRATEGY, with_catalog=False,
+            selection=selection,
+        )
+        if db_itinerary is None:
+            raise HTTPException(status_code=404, detail="Itinerary not found")
+        catalog = await async_crud.get_catalog(db, versions)
+        started = time.perf_counter()
+        if selection is None:
+            payload = serializers.dumps(serializers.itinerary(db_itinerary, catalog=catalog))
+        else:
+            payload = serializers.dumps(serializers.selected(db_itinerary, selection, {}, catalog))
+        metrics.record_serialization(time.perf_counter() - started)
+        return payload
+
+    payload = await shared_cache.aget_or_build(
+        shared_cache.versioned_key("itinerary", versions, itinerary_id, selection.key() if selection else None), build
+    )
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    return Response(payload, media_type="application/json", headers={"ETag": etag})
 
 # MCP Server endpoint
 @app.post("/mcp/recommended-itineraries/", response_model=schemas.MCPResponse)
-def get_recommended_itineraries(request: schemas.MCPRequest, db: Session = Depends(get_db)):
+async def get_recommended_itineraries(request: schemas.MCPRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Get recommended itineraries based on the specified number of nights and optionally
+    region, total budget (`max_budget`) and lowest acceptable hotel rating (`min_rating`).
+    When no recommended itinerary matches, plans generated from the catalog are returned
+    instead (marked `generated`), unless `generate` is false. `fields` and `include`
+    narrow the itineraries as on `GET /itineraries/{itinerary_id}`.
+    """
+    mcp_server = AsyncMCPServer(db, load_strategy=MCP_LOAD_STRATEGY)
+    try:
+        payload = await mcp_server.get_recommended_itinerary_payload(request)
+    except fieldsets.InvalidSelectionError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors(loc=("body",)))
+    return Response(content=payload, media_type="application/json")
+
+@app.get("/mcp/recommendation-index/stats")
+async def read_recommendation_index_stats():
+    """
+    Get hit/miss counters and epochs of the recommendation index, and its cache backend.
+    """
+    return await recommendation_index.cache.run(recommendation_index.stats)
+
+# Catalog import endpoint
+@app.post("/catalog/import/{kind}", response_model=schemas.CatalogImportResult)
+def import_catalog(
+    kind: str = Path(..., pattern="^(locations|hotels|activities)$"),
+    file: UploadFile = File(...),
+    batch_size: int = Query(catalog_import.DEFAULT_BATCH_SIZE, ge=1, le=100000),
+    db: Session = Depends(get_db),
+):
+    """
+    Upsert locations, hotels or activities from an uploaded CSV or NDJSON (.ndjson/.jsonl) file.
+    Hotels and activities may reference their location by `location_id` or `location` name.
+    """
+    # Plain def on the sync session: the import is CPU-bound and runs in the
+    # threadpool instead of blocking the event loop
+    try:
+        return catalog_import.import_catalog_file(db, kind, file.file, file.filename, batch_size)
+    except (ValueError, csv.Error) as exc:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Malformed catalog file: {exc}")
+
+# Search endpoint
+@app.get("/search", response_model=List[schemas.SearchHit])
+async def search_catalog(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Optional[List[str]] = Query(None, description="Restrict to location, hotel and/or activity"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Full-text search over location, hotel and activity names, descriptions and
+    details (region, amenities, activity type). Hits of every kind are ranked
+    together by bm25 (lower rank is better) and come with a highlighted snippet.
+    """
+    if kind and not set(kind) <= set(search.SEARCH_KINDS):
+        raise HTTPException(status_code=422, detail=f"kind must be one of {', '.join(search.SEARCH_KINDS)}")
+    query = search.fts_query(q)
+    if query is None:
+        return []
+    etag = await compute_etag(db, request, SEARCH_TABLES)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers["ETag"] = etag
+    hits = await async_crud.search_catalog(db, query, kinds=kind, limit=limit)
+    return _serialized(serializers.search_hit, hits, response)
+
+# Nearby endpoint
+@app.get("/nearby", response_model=List[schemas.NearbyHit])
+async def read_nearby(
+    request: Request,
+    response: Response,
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(10, gt=0, le=500, description="Search radius in km"),
+    kind: Optional[List[str]] = Query(None, description="Restrict to location, hotel and/or activity"),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Locations, hotels and activities within `radius` km of (`lat`, `lon`), nearest
+    first, with their great-circle (haversine) distance. Only catalog rows with
+    coordinates are found.
+    """
+    if kind and not set(kind) <= set(geo.GEO_KINDS):
+        raise HTTPException(status_code=422, detail=f"kind must be one of {', '.join(geo.GEO_KINDS)}")
+    etag = await compute_etag(db, request, NEARBY_TABLES)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers["ETag"] = etag
+    hits = await async_crud.get_nearby(db, lat, lon, radius, kinds=kind, limit=limit)
+    return _serialized(serializers.nearby_hit, hits, response)
+
+@app.get("/routes", response_model=List[schemas.Route])
+async def read_routes(
+    request: Request,
+    response: Response,
+    origin: str = Query(..., alias="from", description="Location name, as in transfers"),
+    destination: str = Query(..., alias="to", description="Location name, as in transfers"),
+    mode: Optional[schemas.TransferTypeEnum] = Query(None, description="Only routes of this transfer type"),
+    db: AsyncSession = Depends(get_async_db),
+):
     """
-    Get recommended itineraries based on the specified number of nights and optionally region.
+    The shortest known route between two locations for every transfer type (or only
+    `mode`), fastest first, with its total duration and the locations it passes.
+    Routes are found in the graph of all booked transfers, each usable both ways.
     """
-    mcp_server = MCPServer(db)
-    return mcp_server.get_recommended_itinerary_response(request)
+    etag = await compute_etag(db, request, ROUTE_TABLES)
+    # If-None-Match: * is checked once a route is found
+    unchanged = not_modified(request, etag, exists=False)
+    if unchanged is not None:
+        return unchanged
+    routes = await async_crud.get_routes(db, origin, destination)
+    if mode is not None:
+        routes = [route for route in routes if route.transfer_type.value == mode.value]
+    if not routes:
+        raise HTTPException(status_code=404, detail="No known route")
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers["ETag"] = etag
+    return _serialized(serializers.route, routes, response)
 
 # Location endpoints
 @app.get("/locations/", response_model=List[schemas.Location])
-def read_locations(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_locations(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    skip: int = Query(0, ge=0, deprecated=True),
+    db: AsyncSession = Depends(get_async_db),
+):
     """
-    Get all locations with pagination.
+    Get all locations with cursor pagination. Pass the X-Next-Cursor header
+    of a response as `cursor` to fetch the next page; `skip` is deprecated.
     """
-    locations = crud.get_locations(db, skip=skip, limit=limit)
-    return locations
+    versions, etag = await compute_etag_with_versions(db, request, LOCATION_TABLES, also=CATALOG_TABLES)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers["ETag"] = etag
+    catalog = await async_crud.get_catalog(db, versions)
+    return await _catalog_page(catalog, "locations", response, skip, limit, cursor)
 
 # Hotel endpoints
 @app.get("/hotels/", response_model=List[schemas.Hotel])
-def read_hotels(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_hotels(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    skip: int = Query(0, ge=0, deprecated=True),
+    amenities: Optional[str] = Query(None, max_length=500, description="Comma-separated amenities, e.g. pool,spa"),
+    region: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
     """
-    Get all hotels with pagination.
+    Get all hotels with cursor pagination. Pass the X-Next-Cursor header
+    of a response as `cursor` to fetch the next page; `skip` is deprecated.
+    `amenities` keeps hotels offering every listed amenity (case-insensitive),
+    `region` those in that region.
     """
-    hotels = crud.get_hotels(db, skip=skip, limit=limit)
-    return hotels
+    versions, etag = await compute_etag_with_versions(db, request, HOTEL_TABLES, also=CATALOG_TABLES)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers["ETag"] = etag
+    catalog = await async_crud.get_catalog(db, versions)
+    if not amenities:
+        return await _catalog_page(catalog, "hotels", response, skip, limit, cursor, region=region)
+    # Amenity filters are answered from hotel_amenities, the hotels themselves from the cache
+    hotel_ids = await async_crud.get_hotel_ids(
+        db, amenities, skip=skip, limit=limit, after_id=decode_cursor(cursor), region=region
+    )
+    hotels = [catalog.hotels[hotel_id] for hotel_id in hotel_ids]
+    set_next_cursor(response, hotels, limit)
+    return _serialized(catalog.hotel_content, hotels, response)
 
 # Activity endpoints
 @app.get("/activities/", response_model=List[schemas.Activity])
-def read_activities(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_activities(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    skip: int = Query(0, ge=0, deprecated=True),
+    db: AsyncSession = Depends(get_async_db),
+):
     """
-    Get all activities with pagination.
+    Get all activities with cursor pagination. Pass the X-Next-Cursor header
+    of a response as `cursor` to fetch the next page; `skip` is deprecated.
     """
-    activities = crud.get_activities(db, skip=skip, limit=limit)
-    return activities
\ No newline at end of file
+    versions, etag = await compute_etag_with_versions(db, request, ACTIVITY_TABLES, also=CATALOG_TABLES)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers["ETag"] = etag
+    catalog = await async_crud.get_catalog(db, versions)
+    return await _catalog_page(catalog, "activities", response, skip, limit, cursor)
\ No newline at end of file
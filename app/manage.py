@@ -0,0 +1,57 @@
+"""
+One-time database management commands, run once per deploy rather than in
+every worker:
+
+    python -m app.manage migrate   # apply Alembic migrations up to head
+    python -m app.manage seed      # insert the Phuket/Krabi seed data if empty
+    python -m app.manage init      # migrate, then seed
+"""
+import argparse
+import os
+import sys
+from typing import List
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+
+from .database import SCHEMA_REVISION, engine
+from .seed_data import seed_data
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+# Revision describing the schema that create_all used to build at startup
+LEGACY_SCHEMA_REVISION = "0001"
+
+def alembic_config() -> Config:
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    return config
+
+def migrate():
+    config = alembic_config()
+    head = ScriptDirectory.from_config(config).get_current_head()
+    if head != SCHEMA_REVISION:
+        raise SystemExit(f"database.SCHEMA_REVISION is {SCHEMA_REVISION} but the migration head is {head}")
+
+    tables = set(inspect(engine).get_table_names())
+    if "alembic_version" not in tables and "itineraries" in tables:
+        # Database created by the old create_all-on-startup path
+        print(f"Stamping unversioned database at {LEGACY_SCHEMA_REVISION}")
+        command.stamp(config, LEGACY_SCHEMA_REVISION)
+    command.upgrade(config, "head")
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Database management commands.")
+    parser.add_argument("command", choices=["migrate", "seed", "init"])
+    args = parser.parse_args(argv[1:])
+
+    if args.command in ("migrate", "init"):
+        migrate()
+    if args.command in ("seed", "init"):
+        seed_data()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
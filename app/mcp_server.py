@@ -1,7 +1,554 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+import threading
+import uuid
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
 
-from . import models, schemas, crud
+import orjson
+
+from . import models, schemas, serializers, crud, async_crud, fieldsets, itinerary_generator
+from .catalog_cache import CatalogSnapshot
+from .shared_cache import SharedCache, shared_cache
+
+IndexKey = Tuple[int, Optional[str]]
+# (nights, region, max_budget, min_rating) of a generated response
+GeneratedKey = Tuple[int, Optional[str], Optional[float], Optional[float]]
+
+EMPTY_RESPONSE = serializers.dumps(serializers.mcp_response([]))
+
+# Session.info key under which pending writes are collected until commit
+PENDING_WRITES_KEY = "recommendation_index_writes"
+
+# Shared cache channel on which workers announce committed writes, and the
+# counters whose value is part of every entry's key (bumped to drop them all)
+INVALIDATION_CHANNEL = "recommendation-index"
+EPOCH_COUNTER = "mcp-epoch"
+GENERATED_EPOCH_COUNTER = "mcp-generated-epoch"
+
+# Distinct sparse fieldsets (app.fieldsets) indexed per worker; responses for
+# further ones are built on every request
+MAX_INDEXED_SELECTIONS = 32
+
+# Generated responses are built and kept for the request's filters rounded
+# to the stricter side (see generated_request_key), so that a few entries
+# answer every filter value; distinct filters kept per worker beyond
+# MAX_GENERATED_FILTERS are generated on every request
+BUDGET_SIGNIFICANT_DIGITS = 2
+RATING_STEP = Decimal("0.1")
+MAX_GENERATED_FILTERS = 64
+
+# Catalog versions a worker drops entries under when invalidating: the ones
+# it last built entries at (older entries are no longer looked up)
+MAX_TRACKED_CATALOGS = 4
+
+def generated_request_key(request: schemas.MCPRequest) -> GeneratedKey:
+    """
+    (nights, region, max_budget, min_rating) to generate request's plans
+    for: the budget rounded down to BUDGET_SIGNIFICANT_DIGITS and the rating
+    up to a RATING_STEP, so the plans still meet the request's filters.
+    """
+    max_budget, min_rating = request.max_budget, request.min_rating
+    if max_budget:
+        budget = Decimal(repr(max_budget))
+        step = Decimal(1).scaleb(budget.adjusted() - BUDGET_SIGNIFICANT_DIGITS + 1)
+        max_budget = float(budget.quantize(step, rounding=ROUND_FLOOR))
+    if min_rating is not None:
+        min_rating = float(Decimal(repr(min_rating)).quantize(RATING_STEP, rounding=ROUND_CEILING))
+    return request.nights, request.region, max_budget, min_rating
+
+class RecommendationIndex:
+    """
+    Index of serialized MCP responses keyed by (nights, region), kept in the
+    shared cache (app.shared_cache) so that every worker serves the entries
+    any of them built.
+
+    Entries are built on first request, by one worker at a time per key,
+    and dropped when a committed write touches a recommended itinerary they
+    contain; the next request for an affected key rebuilds only that key.
+    The writing worker drops the keys it can name and publishes the write,
+    so that the workers that built entries containing the written
+    itineraries drop those too. Writes that affect every entry bump an
+    epoch counter that is part of the keys instead; the orphaned entries
+    expire (CACHE_TTL).
+
+    Responses with a sparse fieldset (app.fieldsets) are separate entries of
+    the same key, built from only the columns and rows they contain. Keys
+    also hold the catalog table versions, as entries embed catalog rows;
+    regions the catalog doesn't know are answered without being indexed.
+
+    Responses generated from the catalog (for requests no recommended
+    itinerary matches) are kept as well, keyed by the request with its
+    filters rounded (generated_request_key), and dropped whenever a committed write adds, changes or removes catalog rows.
+    """
+
+    def __init__(self, cache: SharedCache = shared_cache):
+        self.cache = cache
+        self._origin = uuid.uuid4().hex
+        self._keys_by_itinerary: Dict[int, Set[IndexKey]] = {}
+        # Canonical forms of the fieldsets indexed (None: the full response)
+        self._selections: Set[Optional[str]] = {None}
+        # (max_budget, min_rating) pairs of the generated responses kept
+        self._generated_filters: Set[Tuple[Optional[float], Optional[float]]] = {(None, None)}
+        self._epochs: Optional[Tuple[int, int]] = None
+        # Catalog table versions entries were last built at, oldest first (see _entry_key)
+        self._catalogs: Dict[Tuple[Tuple[str, int], ...], Mapping[str, int]] = {}
+        self._generation = 0
+        self._catalog_generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self,
+        db: Session,
+        nights: int,
+        region: Optional[str] = None,
+        load_strategy: str = "selectin",
+        selection: Optional[fieldsets.Selection] = None,
+    ) -> bytes:
+        """
+        Get the serialized MCP response for (nights, region), building it on a miss.
+
+        Args:
+            db: Session used to build the entry on a miss
+            nights: Number of nights for the itinerary
+            region: Optional region filter
+            load_strategy: Loader strategy used when building the entry
+            selection: Optional sparse fieldset of the itineraries
+
+        Returns:
+            JSON-encoded MCPResponse
+        """
+        catalog = crud.get_catalog(db)
+        key = self._index_key((nights, region), selection, catalog)
+        payload = self._lookup(key)
+        if payload is not None:
+            return payload
+
+        generation = self._generation
+
+        def build():
+            itineraries = crud.get_recommended_itineraries(
+                db, nights, region, strategy=load_strategy, with_catalog=False, selection=selection
+            )
+            return self._serialize((nights, region), itineraries, catalog, selection)
+
+        if key is None:
+            return build()
+        return self.cache.get_or_build(key, build, store_if=lambda: generation == self._generation)
+
+    async def aget(
+        self,
+        db: AsyncSession,
+        nights: int,
+        region: Optional[str] = None,
+        load_strategy: str = "selectin",
+        selection: Optional[fieldsets.Selection] = None,
+    ) -> bytes:
+        """
+        Async variant of get() that builds missing entries on an AsyncSession.
+        """
+        await self.cache.settle()
+        await self.cache.run(self._current_epochs)
+        catalog = await async_crud.get_catalog(db)
+        key = self._index_key((nights, region), selection, catalog)
+        payload = await self._alookup(key)
+        if payload is not None:
+            return payload
+
+        generation = self._generation
+
+        async def build():
+            itineraries = await async_crud.get_recommended_itineraries(
+                db, nights, region, strategy=load_strategy, with_catalog=False, selection=selection
+            )
+            return self._serialize((nights, region), itineraries, catalog, selection)
+
+        if key is None:
+            return await build()
+        return await self.cache.aget_or_build(key, build, store_if=lambda: generation == self._generation)
+
+    def get_generated(self, db: Session, request: schemas.MCPRequest) -> bytes:
+        """
+        Get the serialized MCP response of itineraries generated from the
+        catalog for request, generating it on a miss.
+
+        Args:
+            db: Session used to generate the entry on a miss
+            request: MCP request with nights and optional region and filters
+
+        Returns:
+            JSON-encoded MCPResponse of GeneratedItinerary objects
+        """
+        request_key = generated_request_key(request)
+        key = self._generated_key(request_key, crud.get_catalog(db))
+        payload = self._lookup(key)
+        if payload is not None:
+            return payload
+
+        generation = self._catalog_generation
+
+        def build():
+            return itinerary_generator.generate_payload(db, *request_key)
+
+        if key is None:
+            return build()
+        return self.cache.get_or_build(key, build, store_if=lambda: generation == self._catalog_generation)
+
+    async def aget_generated(self, db: AsyncSession, request: schemas.MCPRequest) -> bytes:
+        """
+        Async variant of get_generated() that generates missing entries on an AsyncSession.
+        """
+        await self.cache.settle()
+        await self.cache.run(self._current_epochs)
+        request_key = generated_request_key(request)
+        key = self._generated_key(request_key, await async_crud.get_catalog(db))
+        payload = await self._alookup(key)
+        if payload is not None:
+            return payload
+
+        generation = self._catalog_generation
+
+        async def build():
+            return await db.run_sync(itinerary_generator.generate_payload, *request_key)
+
+        if key is None:
+            return await build()
+        return await self.cache.aget_or_build(key, build, store_if=lambda: generation == self._catalog_generation)
+
+    def _current_epochs(self) -> Tuple[int, int]:
+        # Read once per worker, then kept current by the published writes
+        if self._epochs is None:
+            with self._lock:
+                if self._epochs is None:
+                    self.cache.subscribe(INVALIDATION_CHANNEL, self._receive)
+                    self._epochs = self._read_epochs()
+        return self._epochs
+
+    def _read_epochs(self) -> Tuple[int, int]:
+        return self.cache.counter(EPOCH_COUNTER), self.cache.counter(GENERATED_EPOCH_COUNTER)
+
+    def _indexed(self, selection_key: Optional[str]) -> bool:
+        """Whether entries of the fieldset selection_key are kept, registering it for invalidation."""
+        if selection_key in self._selections:
+            return True
+        with self._lock:
+            if len(self._selections) > MAX_INDEXED_SELECTIONS:
+                return False
+            self._selections.add(selection_key)
+        return True
+
+    def _index_key(
+        self, key: IndexKey, selection: Optional[fieldsets.Selection], catalog: CatalogSnapshot
+    ) -> Optional[str]:
+        """Key of the entry of key under selection at catalog's versions, or None if not indexed."""
+        # Regions outside the catalog can't be planned for: answered without
+        # indexing them, so requests can't grow the key space at will
+        if key[1] is not None and key[1] not in catalog.regions:
+            return None
+        selection_key = selection.key() if selection is not None else None
+        if not self._indexed(selection_key):
+            return None
+        return self._entry_key(key, catalog.versions, selection_key)
+
+    def _entry_key(
+        self,
+        key: IndexKey,
+        catalog_versions: Mapping[str, int],
+        selection_key: Optional[str] = None,
+        epoch: Optional[int] = None,
+    ) -> str:
+        # Entries embed catalog rows: keyed by the catalog's versions, so
+        # catalog writes the session hooks don't see (Core, other processes)
+        # move readers to new entries too
+        return self.cache.versioned_key(
+            "mcp", catalog_versions, self._current_epochs()[0] if epoch is None else epoch, *key, selection_key
+        )
+
+    def _entry_keys(self, keys: Iterable[IndexKey], catalogs: Iterable[Mapping[str, int]], epoch: int) -> List[str]:
+        """Keys of the entries of keys, at each of catalogs' versions and under every indexed fieldset."""
+        selections = list(self._selections)
+        return [
+            self._entry_key(key, catalog_versions, selection_key, epoch)
+            for catalog_versions in catalogs
+            for key in keys
+            for selection_key in selections
+        ]
+
+    def _generated_key(self, key: GeneratedKey, catalog: CatalogSnapshot) -> Optional[str]:
+        if key[1] is not None and key[1] not in catalog.regions:
+            return None
+        filters = key[2:]
+        if filters not in self._generated_filters:
+            with self._lock:
+                if len(self._generated_filters) > MAX_GENERATED_FILTERS:
+                    return None
+                self._generated_filters.add(filters)
+        return self.cache.versioned_key("mcp-generated", catalog.versions, self._current_epochs()[1], *key)
+
+    def _lookup(self, key: Optional[str]) -> Optional[bytes]:
+        return self._count(self.cache.get(key) if key is not None else None)
+
+    async def _alookup(self, key: Optional[str]) -> Optional[bytes]:
+        return self._count(await self.cache.aget(key) if key is not None else None)
+
+    def _count(self, payload: Optional[bytes]) -> Optional[bytes]:
+        if payload is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return payload
+
+    def _serialize(
+        self,
+        key: IndexKey,
+        itineraries: List[models.Itinerary],
+        catalog: CatalogSnapshot,
+        selection: Optional[fieldsets.Selection] = None,
+    ) -> bytes:
+        payload = serializers.dumps(serializers.mcp_response(itineraries, catalog, selection))
+        self._track(key, [itinerary.id for itinerary in itineraries], catalog.versions)
+        return payload
+
+    def _track(self, key: IndexKey, itinerary_ids: Iterable[int], catalog_versions: Mapping[str, int]):
+        """Record that the entries of key at catalog_versions embed itinerary_ids."""
+        with self._lock:
+            versions = tuple(sorted(catalog_versions.items()))
+            self._catalogs.pop(versions, None)
+            self._catalogs[versions] = catalog_versions
+            while len(self._catalogs) > MAX_TRACKED_CATALOGS:
+                del self._catalogs[next(iter(self._catalogs))]
+            for itinerary_id in itinerary_ids:
+                self._keys_by_itinerary.setdefault(itinerary_id, set()).add(key)
+
+    def _stale_keys(self, keys: Iterable[IndexKey], itinerary_ids: Iterable[int]) -> Set[IndexKey]:
+        stale = set()
+        for nights, region in keys:
+            stale.add((nights, region))
+            stale.add((nights, None))
+        for itinerary_id in itinerary_ids:
+            stale.update(self._keys_by_itinerary.get(itinerary_id, ()))
+        return stale
+
+    def invalidate(self, keys: Set[IndexKey] = frozenset(), itinerary_ids: Set[int] = frozenset()):
+        """
+        Drop the entries affected by a write, in every worker.
+
+        Args:
+            keys: (nights, region) pairs of written itineraries
+            itinerary_ids: Itineraries whose children were written
+        """
+        epoch = self._current_epochs()[0]
+        with self._lock:
+            self._generation += 1
+            stale = self._stale_keys(keys, itinerary_ids)
+            catalogs = list(self._catalogs.values())
+        self.cache.delete(*self._entry_keys(stale, catalogs, epoch))
+        self._publish(keys=[list(key) for key in stale], itinerary_ids=sorted(itinerary_ids))
+
+    def drop_generated(self):
+        """Drop the generated responses, in every worker (after a catalog write)."""
+        epochs = self._current_epochs()
+        generated_epoch = self.cache.incr(GENERATED_EPOCH_COUNTER)
+        with self._lock:
+            self._catalog_generation += 1
+            if generated_epoch is not None:
+                self._epochs = epochs = (self._epochs[0], generated_epoch)
+        self._publish(epochs=epochs)
+
+    def clear(self):
+        """Drop every entry, in every worker."""
+        epochs = self._current_epochs()
+        bumped = self.cache.incr(EPOCH_COUNTER), self.cache.incr(GENERATED_EPOCH_COUNTER)
+        with self._lock:
+            self._generation += 1
+            self._catalog_generation += 1
+            self._keys_by_itinerary.clear()
+            if None not in bumped:
+                self._epochs = epochs = bumped
+        self._publish(epochs=epochs)
+
+    def expire(self, catalog: bool = False):
+        """
+        Keep builds running now from storing their entries (what they read
+        may predate a write just committed), ahead of invalidating.
+        """
+        with self._lock:
+            self._generation += 1
+            if catalog:
+                self._catalog_generation += 1
+
+    def _publish(self, **write):
+        self.cache.publish(INVALIDATION_CHANNEL, orjson.dumps({"origin": self._origin, **write}))
+
+    def _receive(self, message: Optional[bytes]):
+        """Apply a write published by another worker (None: writes may have been missed)."""
+        if message is None:
+            epochs = self._read_epochs()
+            with self._lock:
+                self._generation += 1
+                self._catalog_generation += 1
+                self._epochs = epochs
+            return
+        write = orjson.loads(message)
+        if write["origin"] == self._origin:
+            return
+        with self._lock:
+            if "epochs" in write:
+                epochs = self._epochs or (0, 0)
+                if write["epochs"][0] > epochs[0]:
+                    self._generation += 1
+                    self._keys_by_itinerary.clear()
+                if write["epochs"][1] > epochs[1]:
+                    self._catalog_generation += 1
+                self._epochs = (max(epochs[0], write["epochs"][0]), max(epochs[1], write["epochs"][1]))
+                return
+            self._generation += 1
+            # The writer dropped the keys it named under its own fieldsets
+            stale = self._stale_keys((), write["itinerary_ids"]) | {tuple(key) for key in write["keys"]}
+            epoch = self._epochs[0] if self._epochs is not None else 0
+            catalogs = list(self._catalogs.values())
+        self.cache.delete(*self._entry_keys(stale, catalogs, epoch))
+
+    def stats(self) -> dict:
+        epochs = self._current_epochs()
+        return {
+            "backend": self.cache.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "epoch": epochs[0],
+            "generated_epoch": epochs[1],
+            "tracked_itineraries": len(self._keys_by_itinerary),
+        }
+
+recommendation_index = RecommendationIndex()
+
+def _pending_writes(session: Session) -> dict:
+    return session.info.setdefault(
+        PENDING_WRITES_KEY, {"keys": set(), "itinerary_ids": set(), "all": False, "catalog": False}
+    )
+
+def _itinerary_keys(target: models.Itinerary) -> Set[IndexKey]:
+    """Current and pre-update (nights, region) of a recommended itinerary."""
+    state = inspect(target)
+    keys = set()
+    was_recommended = target.is_recommended or any(state.attrs.is_recommended.history.deleted)
+    if not was_recommended:
+        return keys
+    nights = [target.duration_nights] + list(state.attrs.duration_nights.history.deleted)
+    regions = [target.region] + list(state.attrs.region.history.deleted)
+    for n in nights:
+        for r in regions:
+            keys.add((n, r))
+    return keys
+
+@event.listens_for(models.Itinerary, "after_insert")
+@event.listens_for(models.Itinerary, "after_update")
+@event.listens_for(models.Itinerary, "after_delete")
+def _track_itinerary_write(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        pending = _pending_writes(session)
+        pending["keys"].update(_itinerary_keys(target))
+        pending["itinerary_ids"].add(target.id)
+
+@event.listens_for(models.Accommodation, "after_insert")
+@event.listens_for(models.Accommodation, "after_update")
+@event.listens_for(models.Accommodation, "after_delete")
+@event.listens_for(models.Transfer, "after_insert")
+@event.listens_for(models.Transfer, "after_update")
+@event.listens_for(models.Transfer, "after_delete")
+@event.listens_for(models.ItineraryActivity, "after_insert")
+@event.listens_for(models.ItineraryActivity, "after_update")
+@event.listens_for(models.ItineraryActivity, "after_delete")
+def _track_child_write(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        _pending_writes(session)["itinerary_ids"].add(target.itinerary_id)
+
+@event.listens_for(models.Location, "after_update")
+@event.listens_for(models.Hotel, "after_update")
+@event.listens_for(models.Activity, "after_update")
+def _track_catalog_write(mapper, connection, target):
+    # Catalog rows are embedded in every payload that references them
+    session = object_session(target)
+    if session is not None:
+        _pending_writes(session)["all"] = True
+
+@event.listens_for(models.Location, "after_insert")
+@event.listens_for(models.Location, "after_delete")
+@event.listens_for(models.Hotel, "after_insert")
+@event.listens_for(models.Hotel, "after_delete")
+@event.listens_for(models.Activity, "after_insert")
+@event.listens_for(models.Activity, "after_delete")
+def _track_catalog_change(mapper, connection, target):
+    # New or removed rows aren't embedded in any indexed payload, but may
+    # change what the generator would plan
+    session = object_session(target)
+    if session is not None:
+        _pending_writes(session)["catalog"] = True
+
+_ITINERARY_ENTITIES = (models.Itinerary, models.Accommodation, models.Transfer, models.ItineraryActivity)
+_CATALOG_ENTITIES = (models.Location, models.Hotel, models.Activity)
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_write(orm_execute_state):
+    # Bulk statements bypass the unit of work and its mapper events
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    entity = mapper.class_
+    if entity not in _ITINERARY_ENTITIES and entity not in _CATALOG_ENTITIES:
+        return
+    params = orm_execute_state.parameters
+    rows = params if isinstance(params, list) else [params] if params else []
+    pending = _pending_writes(orm_execute_state.session)
+    if orm_execute_state.is_insert and rows and entity is models.Itinerary:
+        for row in rows:
+            if row.get("is_recommended"):
+                pending["keys"].add((row["duration_nights"], row["region"]))
+    elif orm_execute_state.is_insert and rows and entity in _ITINERARY_ENTITIES[1:]:
+        for row in rows:
+            pending["itinerary_ids"].add(row["itinerary_id"])
+    else:
+        # Updates, deletes and catalog upserts (which may rewrite rows embedded
+        # in indexed payloads) can't be narrowed down to keys
+        pending["all"] = True
+
+@event.listens_for(Session, "after_commit")
+def _publish_writes(session):
+    pending = session.info.pop(PENDING_WRITES_KEY, None)
+    if pending is None:
+        return
+    # The commit of an AsyncSession runs this on the event loop: the cache
+    # calls are deferred there, once builds in flight can't store stale entries
+    recommendation_index.expire(catalog=pending["all"] or pending["catalog"])
+    recommendation_index.cache.defer(_apply_writes, pending)
+
+def _apply_writes(pending: dict):
+    if pending["all"]:
+        recommendation_index.clear()
+    else:
+        recommendation_index.invalidate(pending["keys"], pending["itinerary_ids"])
+        if pending["catalog"]:
+            recommendation_index.drop_generated()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_writes(session):
+    session.info.pop(PENDING_WRITES_KEY, None)
+
+def project_generated(payload: bytes, selection: Optional[fieldsets.Selection]) -> bytes:
+    """A generated MCP response narrowed to selection; plans keep their generated flag and summary."""
+    if selection is None:
+        return payload
+    plans = orjson.loads(payload)["recommended_itineraries"]
+    return serializers.dumps(
+        {"recommended_itineraries": fieldsets.project(plans, selection, keep=fieldsets.GENERATED_KEYS)}
+    )
 
 class MCPServer:
     """
@@ -9,21 +556,33 @@ class MCPServer:
     based on the specified duration and optionally region.
     """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, load_strategy: str = "selectin", index: Optional[RecommendationIndex] = None):
         self.db = db
+        self.load_strategy = load_strategy
+        self.index = index if index is not None else recommendation_index
     
-    def get_recommended_itineraries(self, nights: int, region: Optional[str] = None) -> List[models.Itinerary]:
+    def get_recommended_itineraries(
+        self,
+        nights: int,
+        region: Optional[str] = None,
+        max_budget: Optional[float] = None,
+        min_rating: Optional[float] = None,
+    ) -> List[models.Itinerary]:
         """
         Get recommended itineraries based on the specified number of nights and optionally region.
         
         Args:
             nights: Number of nights for the itinerary
             region: Optional region filter (e.g., "Phuket", "Krabi")
+            max_budget: Optional upper bound on the itinerary's total price
+            min_rating: Optional lower bound on every booked hotel's rating
             
         Returns:
             List of recommended itineraries
         """
-        return crud.get_recommended_itineraries(self.db, nights, region)
+        return crud.get_recommended_itineraries(
+            self.db, nights, region, strategy=self.load_strategy, max_budget=max_budget, min_rating=min_rating
+        )
     
     def get_recommended_itinerary_response(self, request: schemas.MCPRequest) -> schemas.MCPResponse:
         """
@@ -35,5 +594,117 @@ class MCPServer:
         Returns:
             MCP response with recommended itineraries
         """
-        itineraries = self.get_recommended_itineraries(request.nights, request.region)
-        return schemas.MCPResponse(recommended_itineraries=itineraries)
\ No newline at end of file
+        return schemas.MCPResponse.model_validate_json(self.get_recommended_itinerary_payload(request))
+
+    def get_recommended_itinerary_payload(self, request: schemas.MCPRequest) -> bytes:
+        """
+        Get the serialized MCP response, from the recommendation index unless
+        budget or rating filters are given (those are answered from the
+        itinerary summaries and not indexed). When nothing matches, plans are
+        generated from the catalog unless request.generate is false.
+        request.fields and request.include narrow the itineraries returned
+        (see app.fieldsets).
+
+        Args:
+            request: MCP request with nights and optional region and filters
+
+        Returns:
+            JSON-encoded MCP response with recommended itineraries
+
+        Raises:
+            fieldsets.InvalidSelectionError: fields or include name unknown attributes
+        """
+        selection = fieldsets.parse_selection(request.fields, request.include)
+        if request.max_budget is None and request.min_rating is None:
+            payload = self.index.get(
+                self.db, request.nights, request.region, load_strategy=self.load_strategy, selection=selection
+            )
+        else:
+            itineraries = crud.get_recommended_itineraries(
+                self.db, request.nights, request.region, strategy=self.load_strategy,
+                max_budget=request.max_budget, min_rating=request.min_rating, with_catalog=False, selection=selection,
+            )
+            payload = serializers.dumps(serializers.mcp_response(itineraries, crud.get_catalog(self.db), selection))
+        if payload == EMPTY_RESPONSE and request.generate:
+            return project_generated(self.index.get_generated(self.db, request), selection)
+        return payload
+
+class AsyncMCPServer:
+    """
+    Async variant of MCPServer backed by an AsyncSession.
+    """
+
+    def __init__(self, db: AsyncSession, load_strategy: str = "selectin", index: Optional[RecommendationIndex] = None):
+        self.db = db
+        self.load_strategy = load_strategy
+        self.index = index if index is not None else recommendation_index
+
+    async def get_recommended_itineraries(
+        self,
+        nights: int,
+        region: Optional[str] = None,
+        max_budget: Optional[float] = None,
+        min_rating: Optional[float] = None,
+    ) -> List[models.Itinerary]:
+        """
+        Get recommended itineraries based on the specified number of nights and optionally region.
+
+        Args:
+            nights: Number of nights for the itinerary
+            region: Optional region filter (e.g., "Phuket", "Krabi")
+            max_budget: Optional upper bound on the itinerary's total price
+            min_rating: Optional lower bound on every booked hotel's rating
+
+        Returns:
+            List of recommended itineraries
+        """
+        return await async_crud.get_recommended_itineraries(
+            self.db, nights, region, strategy=self.load_strategy, max_budget=max_budget, min_rating=min_rating
+        )
+
+    async def get_recommended_itinerary_response(self, request: schemas.MCPRequest) -> schemas.MCPResponse:
+        """
+        Get recommended itineraries based on the MCP request parameters.
+
+        Args:
+            request: MCP request with nights and optional region
+
+        Returns:
+            MCP response with recommended itineraries
+        """
+        return schemas.MCPResponse.model_validate_json(await self.get_recommended_itinerary_payload(request))
+
+    async def get_recommended_itinerary_payload(self, request: schemas.MCPRequest) -> bytes:
+        """
+        Get the serialized MCP response, from the recommendation index unless
+        budget or rating filters are given (those are answered from the
+        itinerary summaries and not indexed). When nothing matches, plans are
+        generated from the catalog unless request.generate is false.
+        request.fields and request.include narrow the itineraries returned
+        (see app.fieldsets).
+
+        Args:
+            request: MCP request with nights and optional region and filters
+
+        Returns:
+            JSON-encoded MCP response with recommended itineraries
+
+        Raises:
+            fieldsets.InvalidSelectionError: fields or include name unknown attributes
+        """
+        selection = fieldsets.parse_selection(request.fields, request.include)
+        if request.max_budget is None and request.min_rating is None:
+            payload = await self.index.aget(
+                self.db, request.nights, request.region, load_strategy=self.load_strategy, selection=selection
+            )
+        else:
+            itineraries = await async_crud.get_recommended_itineraries(
+                self.db, request.nights, request.region, strategy=self.load_strategy,
+                max_budget=request.max_budget, min_rating=request.min_rating, with_catalog=False, selection=selection,
+            )
+            payload = serializers.dumps(
+                serializers.mcp_response(itineraries, await async_crud.get_catalog(self.db), selection)
+            )
+        if payload == EMPTY_RESPONSE and request.generate:
+            return project_generated(await self.index.aget_generated(self.db, request), selection)
+        return payload
@@ -0,0 +1,205 @@
+"""
+In-process request and SQL metrics, exposed in Prometheus text format.
+
+The middleware opens a RequestMetrics for every HTTP request in a context
+variable; the engine hooks in database.py add SQL statements, SQL time and
+hydrated ORM rows to it, and InstrumentedRoute records the route template
+and when the endpoint returned. Serialization time is the time from there
+until the response starts, plus whatever endpoints that serialize their own
+response report through record_serialization(). Totals are aggregated per
+(method, route).
+"""
+import bisect
+import functools
+import inspect
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNMATCHED_ROUTE = "unmatched"
+
+@dataclass
+class RequestMetrics:
+    started: float = field(default_factory=time.perf_counter)
+    route: str = UNMATCHED_ROUTE
+    endpoint_finished: Optional[float] = None
+    response_started: Optional[float] = None
+    sql_statements: int = 0
+    sql_seconds: float = 0.0
+    rows: int = 0
+    serialization_seconds: float = 0.0
+
+@dataclass
+class RouteStats:
+    requests_by_status: Dict[int, int] = field(default_factory=dict)
+    latency_buckets: List[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+    latency_seconds: float = 0.0
+    sql_statements: int = 0
+    sql_seconds: float = 0.0
+    rows: int = 0
+    serialization_seconds: float = 0.0
+
+current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request", default=None)
+
+class MetricsRegistry:
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], RouteStats] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, status: int, request: RequestMetrics, finished: float):
+        latency = finished - request.started
+        serialization = request.serialization_seconds
+        if request.endpoint_finished is not None:
+            serialization += (request.response_started or finished) - request.endpoint_finished
+        with self._lock:
+            stats = self._routes.get((method, request.route))
+            if stats is None:
+                stats = self._routes[(method, request.route)] = RouteStats()
+            stats.requests_by_status[status] = stats.requests_by_status.get(status, 0) + 1
+            # Non-cumulative counts here; render() accumulates them per bucket
+            bucket = bisect.bisect_left(LATENCY_BUCKETS, latency)
+            if bucket < len(LATENCY_BUCKETS):
+                stats.latency_buckets[bucket] += 1
+            stats.latency_seconds += latency
+            stats.sql_statements += request.sql_statements
+            stats.sql_seconds += request.sql_seconds
+            stats.rows += request.rows
+            stats.serialization_seconds += serialization
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                "# HELP http_requests_total Requests handled, by route template and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route), stats in routes:
+                for status, count in sorted(stats.requests_by_status.items()):
+                    lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+            lines += [
+                "# HELP http_request_duration_seconds Request latency until the response completes.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), stats in routes:
+                labels = f'method="{method}",route="{route}"'
+                total = sum(stats.requests_by_status.values())
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, stats.latency_buckets):
+                    cumulative += count
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {total}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {stats.latency_seconds:.6f}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {total}")
+
+            for name, attribute, description in (
+                ("http_request_sql_statements_total", "sql_statements", "SQL statements executed while handling requests."),
+                ("http_request_sql_seconds_total", "sql_seconds", "Time spent executing SQL while handling requests."),
+                ("http_request_rows_hydrated_total", "rows", "ORM rows loaded while handling requests."),
+                ("http_request_serialization_seconds_total", "serialization_seconds", "Time spent serializing responses."),
+            ):
+                lines += [f"# HELP {name} {description}", f"# TYPE {name} counter"]
+                for (method, route), stats in routes:
+                    value = getattr(stats, attribute)
+                    value = f"{value:.6f}" if isinstance(value, float) else value
+                    lines.append(f'{name}{{method="{method}",route="{route}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+# Hooks called from the engine and session events in database.py
+def record_statement(seconds: float):
+    request = current_request.get()
+    if request is not None:
+        request.sql_statements += 1
+        request.sql_seconds += seconds
+
+def record_row():
+    request = current_request.get()
+    if request is not None:
+        request.rows += 1
+
+# Called by endpoints that serialize their own response
+def record_serialization(seconds: float):
+    request = current_request.get()
+    if request is not None:
+        request.serialization_seconds += seconds
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task hop) timing each request.
+    """
+    def __init__(self, app, metrics: MetricsRegistry = registry):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestMetrics()
+        token = current_request.set(request)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                request.response_started = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            self.metrics.observe(scope["method"], status, request, time.perf_counter())
+
+def _timed_endpoint(endpoint):
+    def finish():
+        request = current_request.get()
+        if request is not None:
+            request.endpoint_finished = time.perf_counter()
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                finish()
+    else:
+        @functools.wraps(endpoint)
+        def timed(*args, **kwargs):
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                finish()
+    return timed
+
+class InstrumentedRoute(APIRoute):
+    """
+    APIRoute that labels the request metrics with its path template and marks
+    when the endpoint returned (the rest of the handler is serialization).
+    """
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    async def handle(self, scope, receive, send):
+        request = current_request.get()
+        if request is not None:
+            request.route = self.path_format
+        await super().handle(scope, receive, send)
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, Text, Date, Time, Enum
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String, Float, Text, Date, Time, Enum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy.ext.declarative import declarative_base
@@ -7,7 +7,7 @@ import enum
 
 from .database import Base
 
-class ActivityType(enum.Enum):
+class ActivityType(str, enum.Enum):
     SIGHTSEEING = "sightseeing"
     ADVENTURE = "adventure"
     RELAXATION = "relaxation"
@@ -16,7 +16,7 @@ class ActivityType(enum.Enum):
     SHOPPING = "shopping"
     OTHER = "other"
 
-class TransferType(enum.Enum):
+class TransferType(str, enum.Enum):
     CAR = "car"
     BUS = "bus"
     FERRY = "ferry"
@@ -25,6 +25,16 @@ class TransferType(enum.Enum):
     WALKING = "walking"
     OTHER = "other"
 
+class TableVersion(Base):
+    """Change counter per table, bumped by every crud write (used for ETags)."""
+    __tablename__ = "table_versions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<TableVersion {self.table_name} v{self.version}>"
+
 class Location(Base):
     __tablename__ = "locations"
 
@@ -32,6 +42,14 @@ class Location(Base):
     name = Column(String, nullable=False)
     region = Column(String, nullable=False)
     description = Column(Text)
+    latitude = Column(Float)  # WGS84 degrees, indexed in catalog_geo
+    longitude = Column(Float)
+
+    __table_args__ = (
+        # Natural key used by the catalog import upserts
+        Index("ux_locations_name_region", "name", "region", unique=True),
+        Index("ix_locations_region", "region"),
+    )
     
     # Relationships
     hotels = relationship("Hotel", back_populates="location")
@@ -45,11 +63,19 @@ class Hotel(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    location_id = Column(Integer, ForeignKey("locations.id"), nullable=False)
+    location_id = Column(Integer, ForeignKey("locations.id"), nullable=False, index=True)
     rating = Column(Float, nullable=False)
     price_per_night = Column(Float, nullable=False)
     description = Column(Text)
-    amenities = Column(Text)  # Comma-separated list of amenities
+    amenities = Column(Text)  # Comma-separated list of amenities, indexed in hotel_amenities
+    latitude = Column(Float)  # WGS84 degrees, indexed in catalog_geo
+    longitude = Column(Float)
+
+    __table_args__ = (
+        Index("ux_hotels_location_id_name", "location_id", "name", unique=True),
+        # Covers the itinerary generator's per-location hotel ranking
+        Index("ix_hotels_location_id_rating_price", "location_id", "rating", "price_per_night"),
+    )
     
     # Relationships
     location = relationship("Location", back_populates="hotels")
@@ -58,16 +84,50 @@ class Hotel(Base):
     def __repr__(self):
         return f"<Hotel {self.name} ({self.rating}★)>"
 
+class Amenity(Base):
+    """Normalized amenity name (lowercase, single-spaced) shared by every hotel offering it."""
+    __tablename__ = "amenities"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+
+    __table_args__ = (
+        Index("ux_amenities_name", "name", unique=True),
+    )
+
+    def __repr__(self):
+        return f"<Amenity {self.name}>"
+
+class HotelAmenity(Base):
+    """Hotel <-> amenity index, rebuilt by crud from Hotel.amenities whenever a hotel is written."""
+    __tablename__ = "hotel_amenities"
+
+    # Amenity first: each amenity's hotels are one ordered index range, so
+    # "pool and spa" is an intersection of two range scans
+    amenity_id = Column(Integer, ForeignKey("amenities.id"), primary_key=True)
+    hotel_id = Column(Integer, ForeignKey("hotels.id"), primary_key=True, index=True)
+
+    def __repr__(self):
+        return f"<HotelAmenity {self.hotel_id}:{self.amenity_id}>"
+
 class Activity(Base):
     __tablename__ = "activities"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    location_id = Column(Integer, ForeignKey("locations.id"), nullable=False)
+    location_id = Column(Integer, ForeignKey("locations.id"), nullable=False, index=True)
     type = Column(Enum(ActivityType), nullable=False)
     duration_hours = Column(Float, nullable=False)
     price = Column(Float, nullable=False)
     description = Column(Text)
+    latitude = Column(Float)  # WGS84 degrees, indexed in catalog_geo
+    longitude = Column(Float)
+
+    __table_args__ = (
+        Index("ux_activities_location_id_name", "location_id", "name", unique=True),
+        # Covers the itinerary generator's per-location activity ranking
+        Index("ix_activities_location_id_price_duration", "location_id", "price", "duration_hours", "type"),
+    )
     
     # Relationships
     location = relationship("Location", back_populates="activities")
@@ -86,21 +146,50 @@ class Itinerary(Base):
     description = Column(Text)
     is_recommended = Column(Boolean, default=False)
     created_at = Column(TIMESTAMP, server_default=func.now())
+
+    __table_args__ = (
+        # Serves the MCP filter on (is_recommended, duration_nights[, region])
+        Index("ix_itineraries_recommended_nights_region", "is_recommended", "duration_nights", "region"),
+    )
     
     # Relationships
     accommodations = relationship("Accommodation", back_populates="itinerary", cascade="all, delete-orphan")
     transfers = relationship("Transfer", back_populates="itinerary", cascade="all, delete-orphan")
     itinerary_activities = relationship("ItineraryActivity", back_populates="itinerary", cascade="all, delete-orphan")
+    summary = relationship("ItinerarySummary", back_populates="itinerary", uselist=False, cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Itinerary {self.name} ({self.duration_nights} nights)>"
 
+class ItinerarySummary(Base):
+    """Denormalized totals per itinerary, refreshed by crud whenever its rows or catalog prices change."""
+    __tablename__ = "itinerary_summaries"
+
+    itinerary_id = Column(Integer, ForeignKey("itineraries.id"), primary_key=True)
+    total_price = Column(Float, nullable=False, default=0)  # Hotel nights plus activities
+    activity_count = Column(Integer, nullable=False, default=0)
+    transfer_hours = Column(Float, nullable=False, default=0)
+    activity_types = Column(Text)  # Comma-separated list of distinct ActivityType names
+    min_hotel_rating = Column(Float)  # Lowest rated hotel on the trip, NULL without accommodations
+
+    __table_args__ = (
+        # Serve the max_budget / min_rating filters
+        Index("ix_itinerary_summaries_total_price", "total_price"),
+        Index("ix_itinerary_summaries_min_hotel_rating", "min_hotel_rating"),
+    )
+
+    # Relationships
+    itinerary = relationship("Itinerary", back_populates="summary")
+
+    def __repr__(self):
+        return f"<ItinerarySummary {self.itinerary_id} ({self.total_price})>"
+
 class Accommodation(Base):
     __tablename__ = "accommodations"
 
     id = Column(Integer, primary_key=True, index=True)
-    itinerary_id = Column(Integer, ForeignKey("itineraries.id"), nullable=False)
-    hotel_id = Column(Integer, ForeignKey("hotels.id"), nullable=False)
+    itinerary_id = Column(Integer, ForeignKey("itineraries.id"), nullable=False, index=True)
+    hotel_id = Column(Integer, ForeignKey("hotels.id"), nullable=False, index=True)
     day_number = Column(Integer, nullable=False)  # Day 1, Day 2, etc.
     check_in_date = Column(Date, nullable=True)   # Optional for recommended itineraries
     check_out_date = Column(Date, nullable=True)  # Optional for recommended itineraries
@@ -116,7 +205,7 @@ class Transfer(Base):
     __tablename__ = "transfers"
 
     id = Column(Integer, primary_key=True, index=True)
-    itinerary_id = Column(Integer, ForeignKey("itineraries.id"), nullable=False)
+    itinerary_id = Column(Integer, ForeignKey("itineraries.id"), nullable=False, index=True)
     day_number = Column(Integer, nullable=False)
     from_location = Column(String, nullable=False)
     to_location = Column(String, nullable=False)
@@ -134,8 +223,8 @@ class ItineraryActivity(Base):
     __tablename__ = "itinerary_activities"
 
     id = Column(Integer, primary_key=True, index=True)
-    itinerary_id = Column(Integer, ForeignKey("itineraries.id"), nullable=False)
-    activity_id = Column(Integer, ForeignKey("activities.id"), nullable=False)
+    itinerary_id = Column(Integer, ForeignKey("itineraries.id"), nullable=False, index=True)
+    activity_id = Column(Integer, ForeignKey("activities.id"), nullable=False, index=True)
     day_number = Column(Integer, nullable=False)
     start_time = Column(Time, nullable=True)  # Optional for recommended itineraries
     
@@ -0,0 +1,43 @@
+import base64
+import json
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, Response
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Encode the position after the last row of a page as an opaque cursor.
+
+    The payload is a small JSON object so other sort keys (e.g. created_at)
+    can be added later without breaking cursors already handed out.
+    """
+    payload = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """
+    Decode a cursor produced by encode_cursor into the id to continue after.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    if cursor is None:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(after_id, int) or isinstance(after_id, bool):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return after_id
+
+def set_next_cursor(response: Response, rows: Sequence, limit: int):
+    """
+    Advertise the next page when this one is full.
+    """
+    if rows and len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].id)
@@ -0,0 +1,283 @@
+"""
+Transfer route graph with precomputed shortest durations.
+
+Every transfer ever booked is a link between two location names (the free
+strings of Transfer.from_location and to_location, e.g. "Krabi Airport" and
+"Ao Nang"), in one graph per TransferType. A link works both ways and takes
+the fastest duration any transfer recorded for it. For each type the
+shortest durations between all connected pairs, and the first hop of each
+shortest path, are precomputed, so lookups never touch the transfers table.
+
+The graph is built on first use from one aggregate over transfers and
+kept at the "itineraries" table version (transfers are only ever written
+with their itinerary, see etags.ROUTE_TABLES), so writes of any session or
+process are seen. While the version is unchanged a refresh is one indexed
+lookup. Otherwise it only reads the transfers inserted since (ids above the
+last one seen) and relaxes the all-pairs table through each new or faster
+link, which costs O(V²) per link instead of a rebuild. Updating or deleting
+a transfer can lengthen paths: when the transfers seen before no longer
+count and add up the same, the graph is rebuilt instead.
+"""
+import heapq
+import math
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Integer, cast, func, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Change counter of the transfers (etags.ROUTE_TABLES)
+VERSION_TABLE = "itineraries"
+
+# (count, total duration in whole seconds) of the transfers up to an id;
+# integers, so a sum kept up incrementally matches the one SQLite computes
+Fingerprint = Tuple[int, int]
+
+class Route(NamedTuple):
+    transfer_type: models.TransferType
+    duration_hours: float
+    path: List[str]  # Location names from origin to destination
+
+class UnknownRouteError(ValueError):
+    """Transfers without duration_hours between locations no known route of their type connects."""
+
+    def __init__(self, transfers: List[Tuple[int, object]]):
+        self.transfers = transfers  # (index, TransferCreate) pairs
+        super().__init__("; ".join(self._message(transfer) for _, transfer in transfers))
+
+    @staticmethod
+    def _message(transfer) -> str:
+        return (
+            f"No known {transfer.transfer_type.value} route from {transfer.from_location!r} "
+            f"to {transfer.to_location!r}; duration_hours is required"
+        )
+
+    def errors(self, loc: Tuple = ()) -> List[dict]:
+        """The errors in the shape of Pydantic error entries, located under loc."""
+        return [
+            {
+                "type": "unknown_route",
+                "loc": (*loc, "transfers", index, "duration_hours"),
+                "msg": self._message(transfer),
+                "input": None,
+            }
+            for index, transfer in self.transfers
+        ]
+
+class ModeRoutes:
+    """Links and all-pairs shortest durations of one transfer type."""
+
+    def __init__(self):
+        self.links: Dict[str, Dict[str, float]] = {}
+        # durations[origin][destination] and first_hops[origin][destination]
+        # for every connected pair; durations[origin][origin] is 0
+        self.durations: Dict[str, Dict[str, float]] = {}
+        self.first_hops: Dict[str, Dict[str, str]] = {}
+
+    def build(self, links: Iterable[Tuple[str, str, float]]):
+        """Compute every shortest path from scratch: one Dijkstra per location."""
+        for origin, destination, hours in links:
+            for a, b in ((origin, destination), (destination, origin)):
+                neighbours = self.links.setdefault(a, {})
+                neighbours[b] = min(hours, neighbours.get(b, math.inf))
+        for origin in self.links:
+            self.durations[origin], self.first_hops[origin] = self._shortest_from(origin)
+
+    def _shortest_from(self, origin: str) -> Tuple[Dict[str, float], Dict[str, str]]:
+        durations = {origin: 0.0}
+        first_hops: Dict[str, str] = {}
+        settled = set()
+        heap = [(0.0, origin, None)]
+        while heap:
+            hours, location, first_hop = heapq.heappop(heap)
+            if location in settled:
+                continue
+            settled.add(location)
+            if first_hop is not None:
+                first_hops[location] = first_hop
+            for neighbour, link_hours in self.links[location].items():
+                total = hours + link_hours
+                if total < durations.get(neighbour, math.inf):
+                    durations[neighbour] = total
+                    heapq.heappush(heap, (total, neighbour, first_hop if first_hop is not None else neighbour))
+        return durations, first_hops
+
+    def add_link(self, origin: str, destination: str, hours: float):
+        """Add a link (or a faster duration for one) and relax every pair through it."""
+        if origin == destination or hours >= self.links.get(origin, {}).get(destination, math.inf):
+            return
+        for a, b in ((origin, destination), (destination, origin)):
+            self.links.setdefault(a, {})[b] = hours
+            self.durations.setdefault(a, {a: 0.0})
+            self.first_hops.setdefault(a, {})
+        # A shortest path crosses the new link at most once, in one direction
+        for a, b in ((origin, destination), (destination, origin)):
+            onward = list(self.durations[b].items())
+            for source, durations in self.durations.items():
+                to_a = durations.get(a)
+                if to_a is None:
+                    continue
+                first_hops = self.first_hops[source]
+                first_hop = b if source == a else first_hops[a]
+                for target, from_b in onward:
+                    total = to_a + hours + from_b
+                    if target != source and total < durations.get(target, math.inf):
+                        durations[target] = total
+                        first_hops[target] = first_hop
+
+    def route(self, origin: str, destination: str, transfer_type: models.TransferType) -> Optional[Route]:
+        hours = self.durations.get(origin, {}).get(destination)
+        if hours is None:
+            return None
+        path = [origin]
+        while path[-1] != destination:
+            path.append(self.first_hops[path[-1]][destination])
+        return Route(transfer_type, hours, path)
+
+class RouteGraph:
+    """
+    Process-wide route graph over all transfers (see the module docstring).
+    Call refresh() with a Session before lookups to take in new transfers.
+    """
+
+    def __init__(self):
+        self._modes: Dict[models.TransferType, ModeRoutes] = {}
+        self._version: Optional[int] = None  # VERSION_TABLE's version the graph is at
+        self._last_id: Optional[int] = None  # None: rebuild on the next refresh
+        self._fingerprint: Fingerprint = (0, 0)  # Of the transfers up to _last_id
+        # Bumped by invalidate(), so a refresh that read before it doesn't install its state
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def refresh(self, db: Session):
+        """Bring the graph up to date with the transfers table (one indexed lookup if it is)."""
+        # Read before the transfers, so the graph never claims a newer version than it holds
+        version = db.scalar(
+            select(models.TableVersion.version).where(models.TableVersion.table_name == VERSION_TABLE)
+        ) or 0
+        if version == self._version and self._last_id is not None:
+            return
+        last_id = db.scalar(select(func.max(models.Transfer.id))) or 0
+        # The transfers are read without holding the lock: through an
+        # AsyncSession's run_sync each query yields to the event loop, where
+        # other requests may be refreshing too. The lock only guards the swap.
+        for _ in range(3):
+            seen, fingerprint, generation = self._last_id, self._fingerprint, self._generation
+            if seen is None or last_id < seen or self._read_fingerprint(db, seen) != fingerprint:
+                # Transfers seen before were updated or deleted
+                modes = self._build(db, last_id)
+                fingerprint = self._read_fingerprint(db, last_id)
+                with self._lock:
+                    if generation == self._generation:
+                        self._modes, self._last_id, self._fingerprint = modes, last_id, fingerprint
+                        self._version = version
+                        return
+            else:
+                links = db.execute(
+                    select(
+                        models.Transfer.from_location,
+                        models.Transfer.to_location,
+                        models.Transfer.transfer_type,
+                        models.Transfer.duration_hours,
+                    ).where(models.Transfer.id > seen, models.Transfer.id <= last_id)
+                ).all()
+                with self._lock:
+                    if generation == self._generation and self._last_id == seen:
+                        for origin, destination, transfer_type, hours in links:
+                            self._modes.setdefault(transfer_type, ModeRoutes()).add_link(origin, destination, hours)
+                        self._last_id = last_id
+                        self._fingerprint = (
+                            fingerprint[0] + len(links),
+                            fingerprint[1] + sum(int(link[3] * 3600) for link in links),
+                        )
+                        self._version = version
+                        return
+            # Another refresh or an invalidation got in between: start over from its state
+
+    @staticmethod
+    def _read_fingerprint(db: Session, last_id: int) -> Fingerprint:
+        count, seconds = db.execute(
+            select(func.count(), func.sum(cast(models.Transfer.duration_hours * 3600, Integer)))
+            .where(models.Transfer.id <= last_id)
+        ).one()
+        return count, seconds or 0
+
+    @staticmethod
+    def _build(db: Session, last_id: int) -> Dict[models.TransferType, ModeRoutes]:
+        links: Dict[models.TransferType, list] = {}
+        for origin, destination, transfer_type, hours in db.execute(
+            select(
+                models.Transfer.from_location,
+                models.Transfer.to_location,
+                models.Transfer.transfer_type,
+                func.min(models.Transfer.duration_hours),
+            )
+            .where(models.Transfer.id <= last_id)
+            .group_by(models.Transfer.from_location, models.Transfer.to_location, models.Transfer.transfer_type)
+        ):
+            links.setdefault(transfer_type, []).append((origin, destination, hours))
+        modes = {}
+        for transfer_type, mode_links in links.items():
+            modes[transfer_type] = ModeRoutes()
+            modes[transfer_type].build(mode_links)
+        return modes
+
+    def invalidate(self):
+        """Rebuild from scratch on the next refresh."""
+        with self._lock:
+            self._generation += 1
+            self._version = self._last_id = None
+
+    def route(self, origin: str, destination: str, transfer_type: models.TransferType) -> Optional[Route]:
+        """The shortest known route of transfer_type, or None."""
+        mode = self._modes.get(transfer_type)
+        return mode.route(origin, destination, transfer_type) if mode is not None else None
+
+    def routes(self, origin: str, destination: str) -> List[Route]:
+        """The shortest known route of every transfer type, fastest first."""
+        routes = [mode.route(origin, destination, transfer_type) for transfer_type, mode in self._modes.items()]
+        return sorted((route for route in routes if route is not None), key=lambda route: route.duration_hours)
+
+    def duration(self, origin: str, destination: str, transfer_type: models.TransferType) -> Optional[float]:
+        mode = self._modes.get(transfer_type)
+        return mode.durations.get(origin, {}).get(destination) if mode is not None else None
+
+    def fill_transfer_durations(self, db: Session, transfers: List):
+        """
+        Fill in the duration_hours left out of TransferCreate items with the
+        shortest known route of their type.
+
+        Raises:
+            UnknownRouteError: listing every transfer no known route connects
+                (none of the durations are filled in then)
+        """
+        missing = [(index, transfer) for index, transfer in enumerate(transfers) if transfer.duration_hours is None]
+        if not missing:
+            return
+        self.refresh(db)
+        durations = [
+            self.duration(transfer.from_location, transfer.to_location, models.TransferType(transfer.transfer_type.value))
+            for _, transfer in missing
+        ]
+        unknown = [item for item, hours in zip(missing, durations) if hours is None]
+        if unknown:
+            raise UnknownRouteError(unknown)
+        for (_, transfer), hours in zip(missing, durations):
+            transfer.duration_hours = hours
+
+    def stats(self) -> dict:
+        return {
+            "last_transfer_id": self._last_id,
+            "modes": {
+                transfer_type.value: {
+                    "locations": len(mode.links),
+                    "links": sum(len(neighbours) for neighbours in mode.links.values()) // 2,
+                    "pairs": sum(len(durations) - 1 for durations in mode.durations.values()),
+                }
+                for transfer_type, mode in self._modes.items()
+            },
+        }
+
+route_graph = RouteGraph()
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional, Union
-from datetime import date, time
+from datetime import date, datetime, time
 from enum import Enum
 
 # Enum Schemas
@@ -27,6 +27,8 @@ class LocationBase(BaseModel):
     name: str
     region: str
     description: Optional[str] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 class LocationCreate(LocationBase):
     pass
@@ -45,6 +47,8 @@ class HotelBase(BaseModel):
     price_per_night: float = Field(..., ge=0)
     description: Optional[str] = None
     amenities: Optional[str] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 class HotelCreate(HotelBase):
     pass
@@ -64,6 +68,8 @@ class ActivityBase(BaseModel):
     duration_hours: float = Field(..., gt=0)
     price: float = Field(..., ge=0)
     description: Optional[str] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 class ActivityCreate(ActivityBase):
     pass
@@ -102,7 +108,8 @@ class TransferBase(BaseModel):
     departure_time: Optional[time] = None
 
 class TransferCreate(TransferBase):
-    pass
+    # Filled in from the shortest known route of transfer_type when left out
+    duration_hours: Optional[float] = Field(None, gt=0)
 
 class Transfer(TransferBase):
     id: int
@@ -141,7 +148,7 @@ class ItineraryCreate(ItineraryBase):
 
 class Itinerary(ItineraryBase):
     id: int
-    created_at: str
+    created_at: datetime
     accommodations: List[Accommodation]
     transfers: List[Transfer]
     itinerary_activities: List[ItineraryActivity]
@@ -150,6 +157,13 @@ class Itinerary(ItineraryBase):
         orm_mode = True
 
 # Response Models
+class ItinerarySummary(BaseModel):
+    total_price: float
+    activity_count: int
+    transfer_hours: float
+    activity_types: List[ActivityTypeEnum]
+    min_hotel_rating: Optional[float] = None
+
 class ItineraryResponse(BaseModel):
     id: int
     name: str
@@ -157,7 +171,8 @@ class ItineraryResponse(BaseModel):
     region: str
     description: Optional[str] = None
     is_recommended: bool
-    created_at: str
+    created_at: datetime
+    summary: Optional[ItinerarySummary] = None
     
     class Config:
         orm_mode = True
@@ -165,10 +180,69 @@ class ItineraryResponse(BaseModel):
 class ItineraryDetailResponse(Itinerary):
     pass
 
+# Bulk ingestion
+class BulkItemError(BaseModel):
+    index: int
+    errors: List[dict]
+
+class BulkItineraryResult(BaseModel):
+    created: int
+    ids: List[int]
+    errors: List[BulkItemError]
+
+class CatalogImportResult(BaseModel):
+    kind: str
+    processed: int
+    upserted: int
+    errors: List[BulkItemError]
+
+# Catalog search
+class SearchHit(BaseModel):
+    kind: str
+    id: int
+    name: str
+    snippet: str
+    rank: float
+
+class NearbyHit(BaseModel):
+    kind: str
+    id: int
+    name: str
+    latitude: float
+    longitude: float
+    distance_km: float
+
+# Itineraries generated from the catalog (not stored, so without ids)
+class GeneratedAccommodation(AccommodationBase):
+    hotel: Hotel
+
+class GeneratedItineraryActivity(ItineraryActivityBase):
+    activity: Activity
+
+class GeneratedItinerary(ItineraryBase):
+    generated: bool = True
+    summary: ItinerarySummary
+    accommodations: List[GeneratedAccommodation]
+    transfers: List[TransferBase]
+    itinerary_activities: List[GeneratedItineraryActivity]
+
+# Transfer routes
+class Route(BaseModel):
+    transfer_type: TransferTypeEnum
+    duration_hours: float
+    path: List[str]
+
 # MCP Request/Response
 class MCPRequest(BaseModel):
     nights: int = Field(..., ge=1, le=14)
-    region: Optional[str] = None
+    region: Optional[str] = Field(None, max_length=100)
+    max_budget: Optional[float] = Field(None, ge=0)
+    min_rating: Optional[float] = Field(None, ge=0, le=5)
+    # Generate plans from the catalog when no recommended itinerary matches
+    generate: bool = True
+    # Sparse fieldsets and include paths of the returned itineraries (app.fieldsets)
+    fields: Optional[str] = None
+    include: Optional[str] = None
 
 class MCPResponse(BaseModel):
-    recommended_itineraries: List[Itinerary]
\ No newline at end of file
+    recommended_itineraries: List[Union[Itinerary, GeneratedItinerary]]
\ No newline at end of file
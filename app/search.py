@@ -0,0 +1,52 @@
+"""
+Full-text search over the catalog (locations, hotels and activities).
+
+All three tables are indexed in a single FTS5 table, catalog_search, kept in
+sync by the triggers created in migration 0006: name, description and a
+details column (region, amenities or activity type). A single MATCH query
+therefore ranks hits of every kind together with bm25.
+"""
+import re
+from typing import Optional
+
+from sqlalchemy import bindparam, text
+
+SEARCH_TABLE = "catalog_search"
+SEARCH_KINDS = ("location", "hotel", "activity")
+
+# bm25 column weights: name, description, details
+NAME_WEIGHT, DESCRIPTION_WEIGHT, DETAILS_WEIGHT = 10.0, 1.0, 2.0
+
+SNIPPET_START, SNIPPET_END = "<mark>", "</mark>"
+SNIPPET_TOKENS = 12
+
+def fts_query(q: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query: every word must match, the last one as
+    a prefix (so partially typed words match). Words are quoted, so FTS5
+    operators and punctuation in user input can't produce syntax errors.
+    Returns None if q has no words.
+    """
+    words = re.findall(r"\w+", q)
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+def search_stmt(by_kind: bool = False):
+    """
+    Ranked catalog hits for :query (an fts_query), best first (lowest bm25
+    rank), at most :limit; restricted to :kinds when by_kind.
+    """
+    kind_filter = "AND kind IN :kinds" if by_kind else ""
+    stmt = text(f"""
+        SELECT kind, entity_id AS id, name,
+               snippet({SEARCH_TABLE}, -1, '{SNIPPET_START}', '{SNIPPET_END}', '…', {SNIPPET_TOKENS}) AS snippet,
+               bm25({SEARCH_TABLE}, {NAME_WEIGHT}, {DESCRIPTION_WEIGHT}, {DETAILS_WEIGHT}) AS rank
+        FROM {SEARCH_TABLE}
+        WHERE {SEARCH_TABLE} MATCH :query {kind_filter}
+        ORDER BY rank
+        LIMIT :limit
+    """)
+    if by_kind:
+        stmt = stmt.bindparams(bindparam("kinds", expanding=True))
+    return stmt
@@ -1,14 +1,18 @@
 from sqlalchemy.orm import Session
-from . import models, database
+from . import crud, models, database
 from sqlalchemy import create_engine
 from .database import SessionLocal
 
-def seed_data():
-    # Create the database tables
-    models.Base.metadata.create_all(bind=database.engine)
-    
-    # Create a new session
-    db = SessionLocal()
+def place_at_location(rows, locations):
+    # Seed hotels and activities have no coordinates of their own; place them
+    # at their location's so they show up in nearby searches
+    coordinates = {location.id: (location.latitude, location.longitude) for location in locations}
+    for row in rows:
+        row.latitude, row.longitude = coordinates[row.location_id]
+
+def seed_data(session_factory=SessionLocal):
+    # The schema is managed by migrations (python -m app.manage migrate)
+    db = session_factory()
     
     try:
         # Check if data already exists
@@ -22,64 +26,87 @@ def seed_data():
         phuket = models.Location(
             name="Phuket",
             region="Phuket",
-            description="Phuket is Thailand's largest island and a popular beach destination known for its clear waters, white sand beaches, and vibrant nightlife."
+            description="Phuket is Thailand's largest island and a popular beach destination known for its clear waters, white sand beaches, and vibrant nightlife.",
+            latitude=7.8804,
+            longitude=98.3923
         )
         
         patong = models.Location(
             name="Patong",
             region="Phuket",
-            description="Patong is Phuket's most famous beach resort town with a vibrant nightlife scene and a 3-kilometer stretch of beach."
+            description="Patong is Phuket's most famous beach resort town with a vibrant nightlife scene and a 3-kilometer stretch of beach.",
+            latitude=7.8961,
+            longitude=98.2966
         )
         
         karon = models.Location(
             name="Karon",
             region="Phuket",
-            description="Karon Beach is the second largest of Phuket's tourist beaches, featuring a long stretch of white sand beach."
+            description="Karon Beach is the second largest of Phuket's tourist beaches, featuring a long stretch of white sand beach.",
+            latitude=7.8467,
+            longitude=98.2941
         )
         
         kata = models.Location(
             name="Kata",
             region="Phuket",
-            description="Kata is a scenic bay with a palm-lined beach and clear waters, popular for surfing during the monsoon season."
+            description="Kata is a scenic bay with a palm-lined beach and clear waters, popular for surfing during the monsoon season.",
+            latitude=7.8206,
+            longitude=98.2985
         )
         
         old_town = models.Location(
             name="Phuket Old Town",
             region="Phuket",
-            description="Phuket Old Town is known for its charming historic district filled with colorful Sino-Portuguese buildings, cafes, and shops."
+            description="Phuket Old Town is known for its charming historic district filled with colorful Sino-Portuguese buildings, cafes, and shops.",
+            latitude=7.8846,
+            longitude=98.3875
         )
         
         phi_phi = models.Location(
             name="Phi Phi Islands",
             region="Phuket",
-            description="The Phi Phi Islands are an island group between Phuket and Krabi known for stunning beaches and limestone cliffs."
+            description="The Phi Phi Islands are an island group between Phuket and Krabi known for stunning beaches and limestone cliffs.",
+            latitude=7.7407,
+            longitude=98.7784
         )
         
         krabi_town = models.Location(
             name="Krabi Town",
             region="Krabi",
-            description="Krabi Town is the capital of Krabi Province and a gateway to the region's national parks and islands."
+            description="Krabi Town is the capital of Krabi Province and a gateway to the region's national parks and islands.",
+            latitude=8.0863,
+            longitude=98.9063
         )
         
         ao_nang = models.Location(
             name="Ao Nang",
             region="Krabi",
-            description="Ao Nang is a resort town in Thailand's Krabi Province with stunning limestone cliffs and access to offshore islands."
+            description="Ao Nang is a resort town in Thailand's Krabi Province with stunning limestone cliffs and access to offshore islands.",
+            latitude=8.0325,
+            longitude=98.8236
         )
         
         railay = models.Location(
             name="Railay Beach",
             region="Krabi",
-            description="Railay Beach is a small peninsula between Krabi and Ao Nang, accessible only by boat and known for rock climbing."
+            description="Railay Beach is a small peninsula between Krabi and Ao Nang, accessible only by boat and known for rock climbing.",
+            latitude=8.011,
+            longitude=98.8376
         )
         
         koh_lanta = models.Location(
             name="Koh Lanta",
             region="Krabi",
-            description="Koh Lanta is a laid-back island district in Krabi known for long beaches and a relaxed atmosphere."
+            description="Koh Lanta is a laid-back island district in Krabi known for long beaches and a relaxed atmosphere.",
+            latitude=7.6245,
+            longitude=99.079
         )
         
-        db.add_all([phuket, patong, karon, kata, old_town, phi_phi, krabi_town, ao_nang, railay, koh_lanta])
+        all_locations = [phuket, patong, karon, kata, old_town, phi_phi, krabi_town, ao_nang, railay, koh_lanta]
+        db.add_all(all_locations)
+        # Workers may have cached the empty catalog: move them to the seeded one
+        crud.bump_table_versions(db, "locations")
         db.commit()
         
         # Create hotels
@@ -284,7 +311,11 @@ def seed_data():
         ]
         
         all_hotels = phuket_hotels + patong_hotels + karon_hotels + kata_hotels + old_town_hotels + phi_phi_hotels + krabi_town_hotels + ao_nang_hotels + railay_hotels + koh_lanta_hotels
+        place_at_location(all_hotels, all_locations)
         db.add_all(all_hotels)
+        db.flush()
+        crud.sync_hotel_amenities(db, [hotel.id for hotel in all_hotels])
+        crud.bump_table_versions(db, "hotels")
         db.commit()
         
         # Create activities
@@ -417,7 +448,9 @@ def seed_data():
         ]
         
         all_activities = phuket_activities + patong_activities + phi_phi_activities + ao_nang_activities + railay_activities + koh_lanta_activities
+        place_at_location(all_activities, all_locations)
         db.add_all(all_activities)
+        crud.bump_table_versions(db, "activities")
         db.commit()
         
         # Create recommended itineraries
@@ -494,6 +527,7 @@ def seed_data():
         )
         
         db.add_all([phuket_2night, phuket_3night, phuket_5night, phuket_7night, krabi_2night, krabi_4night, krabi_6night, krabi_8night])
+        crud.bump_table_versions(db, "itineraries")
         db.commit()
         
         # Add accommodations, transfers, and activities to itineraries
@@ -618,6 +652,9 @@ def seed_data():
         # Add more data for the other itineraries as well...
         # For brevity, we'll only add details for the 2-night itineraries in this example
         
+        db.flush()
+        crud.refresh_itinerary_summaries(db)
+        crud.bump_table_versions(db, "itineraries")
         db.commit()
         print("Database seeded successfully!")
         
@@ -0,0 +1,228 @@
+"""
+Response serializers that build plain dicts straight from loaded ORM objects.
+
+Rows coming back from the database are already valid, so the hot read paths
+skip the from_attributes Pydantic round trip and hand these dicts to orjson
+(ORJSONResponse), which encodes dates, times and enums natively. The output
+matches the corresponding schemas (schemas.Location, schemas.Itinerary,
+schemas.MCPResponse, ...), which remain the documented response models.
+"""
+from typing import Dict, Iterable, List, Optional
+
+import orjson
+
+from . import models
+
+# Within one response the same hotel or activity is embedded many times; the
+# session's identity map gives each row a single object, so its dict can be
+# built once per call and shared (orjson encodes shared dicts fine).
+Memo = Optional[Dict[int, dict]]
+
+# Itineraries can instead embed their hotels and activities from a
+# catalog_cache.CatalogSnapshot, by id; their catalog rows then need not be
+# loaded at all (crud.itinerary_load_options(with_catalog=False)).
+Catalog = Optional["CatalogSnapshot"]
+
+# Sparse fieldsets: an app.fieldsets.Selection names the attributes and
+# relationships to serialize (selected()), and only those are read. Catalog
+# rows then come from the catalog snapshot, when given, by foreign key.
+Selection = Optional["Selection"]
+
+def _memoized(serializer, row, memo: Memo) -> dict:
+    if memo is None:
+        return serializer(row)
+    content = memo.get(id(row))
+    if content is None:
+        content = memo[id(row)] = serializer(row)
+    return content
+
+def location(row: models.Location) -> dict:
+    return {
+        "name": row.name,
+        "region": row.region,
+        "description": row.description,
+        "latitude": row.latitude,
+        "longitude": row.longitude,
+        "id": row.id,
+    }
+
+def hotel(row: models.Hotel, location_content: Optional[dict] = None) -> dict:
+    return {
+        "name": row.name,
+        "location_id": row.location_id,
+        "rating": row.rating,
+        "price_per_night": row.price_per_night,
+        "description": row.description,
+        "amenities": row.amenities,
+        "latitude": row.latitude,
+        "longitude": row.longitude,
+        "id": row.id,
+        "location": location(row.location) if location_content is None else location_content,
+    }
+
+def activity(row: models.Activity, location_content: Optional[dict] = None) -> dict:
+    return {
+        "name": row.name,
+        "location_id": row.location_id,
+        "type": row.type.value,
+        "duration_hours": row.duration_hours,
+        "price": row.price,
+        "description": row.description,
+        "latitude": row.latitude,
+        "longitude": row.longitude,
+        "id": row.id,
+        "location": location(row.location) if location_content is None else location_content,
+    }
+
+def accommodation(row: models.Accommodation, memo: Memo = None, catalog: Catalog = None) -> dict:
+    return {
+        "hotel_id": row.hotel_id,
+        "day_number": row.day_number,
+        "check_in_date": row.check_in_date,
+        "check_out_date": row.check_out_date,
+        "id": row.id,
+        "hotel": _memoized(hotel, row.hotel, memo) if catalog is None
+        else _memoized(catalog.hotel_content, catalog.hotels[row.hotel_id], memo),
+    }
+
+def transfer(row: models.Transfer) -> dict:
+    return {
+        "day_number": row.day_number,
+        "from_location": row.from_location,
+        "to_location": row.to_location,
+        "transfer_type": row.transfer_type.value,
+        "duration_hours": row.duration_hours,
+        "departure_time": row.departure_time,
+        "id": row.id,
+    }
+
+def itinerary_activity(row: models.ItineraryActivity, memo: Memo = None, catalog: Catalog = None) -> dict:
+    return {
+        "activity_id": row.activity_id,
+        "day_number": row.day_number,
+        "start_time": row.start_time,
+        "id": row.id,
+        "activity": _memoized(activity, row.activity, memo) if catalog is None
+        else _memoized(catalog.activity_content, catalog.activities[row.activity_id], memo),
+    }
+
+def summary(row: models.ItinerarySummary) -> dict:
+    return {
+        "total_price": row.total_price,
+        "activity_count": row.activity_count,
+        "transfer_hours": row.transfer_hours,
+        "activity_types": [
+            models.ActivityType[name].value for name in row.activity_types.split(",")
+        ] if row.activity_types else [],
+        "min_hotel_rating": row.min_hotel_rating,
+    }
+
+def itinerary_list_item(row: models.Itinerary) -> dict:
+    """schemas.ItineraryResponse: the itinerary with its summary but without its children."""
+    return {
+        "id": row.id,
+        "name": row.name,
+        "duration_nights": row.duration_nights,
+        "region": row.region,
+        "description": row.description,
+        "is_recommended": row.is_recommended,
+        "created_at": row.created_at,
+        "summary": summary(row.summary) if row.summary is not None else None,
+    }
+
+def itinerary(row: models.Itinerary, memo: Memo = None, catalog: Catalog = None) -> dict:
+    """schemas.Itinerary / ItineraryDetailResponse: the fully loaded itinerary graph."""
+    return itinerary_document(row, row.accommodations, row.transfers, row.itinerary_activities, memo, catalog)
+
+def itinerary_document(
+    row,
+    accommodations: Iterable,
+    transfers: Iterable,
+    itinerary_activities: Iterable,
+    memo: Memo = None,
+    catalog: Catalog = None,
+) -> dict:
+    """itinerary() from the itinerary's row and child rows given apart (e.g. Core rows)."""
+    return {
+        "name": row.name,
+        "duration_nights": row.duration_nights,
+        "region": row.region,
+        "description": row.description,
+        "is_recommended": row.is_recommended,
+        "id": row.id,
+        "created_at": row.created_at,
+        "accommodations": [accommodation(child, memo, catalog) for child in accommodations],
+        "transfers": [transfer(child) for child in transfers],
+        "itinerary_activities": [itinerary_activity(child, memo, catalog) for child in itinerary_activities],
+    }
+
+def itineraries(rows: Iterable[models.Itinerary], catalog: Catalog = None) -> List[dict]:
+    memo: Dict[int, dict] = {}
+    return [itinerary(row, memo, catalog) for row in rows]
+
+def mcp_response(rows: Iterable[models.Itinerary], catalog: Catalog = None, selection: Selection = None) -> dict:
+    if selection is not None:
+        return {"recommended_itineraries": selected_list(rows, selection, catalog)}
+    return {"recommended_itineraries": itineraries(rows, catalog)}
+
+_CATALOG_RELATIONSHIPS = {
+    "hotel": ("hotels", "hotel_id"),
+    "activity": ("activities", "activity_id"),
+    "location": ("locations", "location_id"),
+}
+
+def _related(row, name: str, catalog: Catalog):
+    if catalog is not None and name in _CATALOG_RELATIONSHIPS:
+        records, foreign_key = _CATALOG_RELATIONSHIPS[name]
+        return getattr(catalog, records)[getattr(row, foreign_key)]
+    return getattr(row, name)
+
+def selected(row, selection: Selection, memo: Optional[Dict[tuple, dict]] = None, catalog: Catalog = None) -> dict:
+    """The attributes and embedded relationships of row that selection names."""
+    content = {name: getattr(row, name) for name in selection.fields}
+    if "summary" in content:
+        content["summary"] = summary(row.summary) if row.summary is not None else None
+    for name, child in selection.include.items():
+        related = _related(row, name, catalog)
+        if isinstance(related, list):
+            content[name] = [selected(item, child, memo, catalog) for item in related]
+        elif related is None or memo is None:
+            content[name] = related if related is None else selected(related, child, memo, catalog)
+        else:
+            # Shared catalog rows: once per row and selection
+            key = (id(related), id(child))
+            cached = memo.get(key)
+            if cached is None:
+                cached = memo[key] = selected(related, child, memo, catalog)
+            content[name] = cached
+    return content
+
+def selected_list(rows: Iterable, selection: Selection, catalog: Catalog = None) -> List[dict]:
+    memo: Dict[tuple, dict] = {}
+    return [selected(row, selection, memo, catalog) for row in rows]
+
+def search_hit(row) -> dict:
+    """schemas.SearchHit from a search.search_stmt row."""
+    return {"kind": row.kind, "id": row.id, "name": row.name, "snippet": row.snippet, "rank": row.rank}
+
+def nearby_hit(row) -> dict:
+    """schemas.NearbyHit from a geo.nearby_stmt row."""
+    return {
+        "kind": row.kind,
+        "id": row.id,
+        "name": row.name,
+        "latitude": row.latitude,
+        "longitude": row.longitude,
+        "distance_km": row.distance_km,
+    }
+
+def route(row) -> dict:
+    """schemas.Route from a route_graph.Route."""
+    return {"transfer_type": row.transfer_type.value, "duration_hours": row.duration_hours, "path": row.path}
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content)
+
+def dumps_lines(rows: List[dict]) -> bytes:
+    """NDJSON: one encoded document per line."""
+    return b"".join(orjson.dumps(row) + b"\n" for row in rows)
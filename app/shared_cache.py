@@ -0,0 +1,552 @@
+"""
+Response cache shared by the workers, over a pluggable backend.
+
+CACHE_URL selects the backend:
+
+- memory:// (the default) keeps entries in the worker, bounded by
+  CACHE_MEMORY_MAX_BYTES; publish() reaches that worker's own subscribers.
+- redis://[:password@]host[:port][/db] keeps them on a Redis-protocol server
+  (Redis, Valkey, KeyDB, ...) shared by every worker, spoken to over RESP on
+  a plain socket; publish() reaches the subscribers of every worker.
+
+Entries are encoded responses under namespaced keys. Keys built with
+versioned_key() include the table change counters (table_versions) the
+entry was built at, so a write to those tables, by any worker, moves
+readers to new keys without any invalidation; the old entries expire after
+their TTL (CACHE_TTL seconds). Entries that are invalidated instead (the
+recommendation index) announce committed writes over publish() /
+subscribe().
+
+get_or_build() builds a missing entry at most once at a time per key: the
+first caller takes a short-lived lock entry and builds, concurrent callers
+(in any worker) wait for its result instead of building the same entry.
+
+Coroutines go through aget(), aget_or_build() and run(), which make the
+calls of a blocking backend (redis://) on worker threads, so the event loop
+never waits on the cache server; defer() does the same for the writes of
+synchronous hooks that may run on the loop (an AsyncSession's after_commit).
+
+The cache is an optimization only: backend failures are logged and treated
+as misses, so requests are still answered while the backend is down.
+"""
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+CACHE_URL = os.getenv("CACHE_URL", "memory://")
+# Seconds an entry lives unless set() is given another ttl
+CACHE_TTL = float(os.getenv("CACHE_TTL", "600"))
+# Prepended to every key, so several deployments can share a server
+CACHE_PREFIX = os.getenv("CACHE_PREFIX", "travel-itinerary")
+# Encoded bytes the memory backend keeps; the least recently set entries go first
+CACHE_MEMORY_MAX_BYTES = int(os.getenv("CACHE_MEMORY_MAX_BYTES", str(256 * 1024 * 1024)))
+# Seconds a Redis-protocol server has to accept a connection or answer a
+# command, and after a failure, how long it is skipped (calls miss at once)
+CACHE_TIMEOUT = float(os.getenv("CACHE_TIMEOUT", "0.5"))
+RETRY_AFTER = 1.0
+
+# Stampede protection: how long a builder's lock lasts at most, and how long
+# and how often other callers check for its result before building themselves
+LOCK_TTL = 30.0
+LOCK_WAIT = 10.0
+LOCK_POLL = 0.01
+
+class CacheError(Exception):
+    """The cache backend is unreachable or replied with an error."""
+
+class CacheBackend:
+    """
+    Key/value store of bytes with expiry (ttl in seconds), counters and
+    pub/sub, implemented by MemoryBackend and RedisBackend.
+    """
+
+    name = "base"
+    # Whether calls wait on I/O; SharedCache makes those off the event loop
+    blocking = False
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float):
+        raise NotImplementedError
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """set() unless key exists; whether it was set."""
+        raise NotImplementedError
+
+    def delete(self, *keys: str):
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        """Increment the counter at key (from 0, never expiring) and return it."""
+        raise NotImplementedError
+
+    def publish(self, channel: str, message: bytes):
+        raise NotImplementedError
+
+    def subscribe(self, channel: str, callback: Callable[[Optional[bytes]], None]):
+        """
+        Call callback with every message published on channel from now on,
+        and with None when messages may have been missed (a reconnect).
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class MemoryBackend(CacheBackend):
+    """Backend in the worker's own memory."""
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int = CACHE_MEMORY_MAX_BYTES):
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._size = 0
+        self._max_bytes = max_bytes
+        self._counters: Dict[str, int] = {}
+        self._subscribers: Dict[str, List[Callable]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            self._pop(key)
+            return None
+        return entry[0]
+
+    def _pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[0])
+
+    def _set(self, key: str, value: bytes, ttl: float):
+        self._pop(key)
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._size += len(value)
+        while self._size > self._max_bytes and len(self._entries) > 1:
+            self._pop(next(iter(self._entries)))
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key in self._counters:
+                return str(self._counters[key]).encode()
+            return self._live(key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._set(key, value, ttl)
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._set(key, value, ttl)
+            return True
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._pop(key)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = self._counters[key] = self._counters.get(key, 0) + 1
+            return value
+
+    def publish(self, channel: str, message: bytes):
+        for callback in list(self._subscribers.get(channel, ())):
+            callback(message)
+
+    def subscribe(self, channel: str, callback: Callable[[Optional[bytes]], None]):
+        self._subscribers.setdefault(channel, []).append(callback)
+
+def _encode_command(args) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+def _read_reply(stream):
+    line = stream.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("connection closed by the cache server")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body
+    if kind == b"-":
+        raise CacheError(body.decode(errors="replace"))
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        if len(data) < length + 2:
+            raise ConnectionError("connection closed by the cache server")
+        return data[:-2]
+    if kind == b"*":
+        length = int(body)
+        return None if length < 0 else [_read_reply(stream) for _ in range(length)]
+    raise CacheError(f"Unexpected reply from the cache server: {line!r}")
+
+class RedisBackend(CacheBackend):
+    """
+    Backend on a Redis-protocol server. Commands share one connection (under
+    a lock, reconnecting once if the server closed it); after a failure the
+    server is not tried again for RETRY_AFTER seconds, so an unreachable one
+    costs one timeout rather than one per call. Subscriptions share another
+    connection, read by a daemon thread that resubscribes every channel
+    after reconnecting with backoff.
+    """
+
+    name = "redis"
+    blocking = True
+
+    def __init__(self, url: str, timeout: float = CACHE_TIMEOUT):
+        parts = urlsplit(url)
+        self._address = (parts.hostname or "localhost", parts.port or 6379)
+        self._password = unquote(parts.password) if parts.password else None
+        self._db = int(parts.path.lstrip("/") or 0)
+        self._timeout = timeout
+        self._connection = None
+        self._down_until = 0.0
+        self._closed = False
+        self._lock = threading.Lock()
+        # Channel -> callbacks, and the subscriber connection (None while reconnecting)
+        self._channels: Dict[str, List[Callable[[Optional[bytes]], None]]] = {}
+        self._subscriber = None
+        self._subscriber_lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection(self._address, timeout=self._timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = (sock, sock.makefile("rb"))
+        if self._password:
+            self._call(connection, "AUTH", self._password)
+        if self._db:
+            self._call(connection, "SELECT", self._db)
+        return connection
+
+    @staticmethod
+    def _call(connection, *args):
+        sock, stream = connection
+        sock.sendall(_encode_command(args))
+        return _read_reply(stream)
+
+    def _disconnect(self):
+        if self._connection is not None:
+            self._connection[0].close()
+            self._connection = None
+
+    def _error(self, exc: Exception) -> CacheError:
+        return CacheError(f"Cache server {self._address[0]}:{self._address[1]}: {exc}")
+
+    def execute(self, *args):
+        """Send one command and return its reply (raises CacheError)."""
+        with self._lock:
+            if time.monotonic() < self._down_until:
+                raise self._error("unavailable, retrying later")
+            for attempt in range(2):
+                reused = self._connection is not None
+                try:
+                    if not reused:
+                        self._connection = self._connect()
+                    return self._call(self._connection, *args)
+                except OSError as exc:
+                    self._disconnect()
+                    # Only a kept connection the server has since closed is
+                    # worth a second try; timeouts and refusals are not
+                    if attempt or not reused or isinstance(exc, socket.timeout):
+                        self._down_until = time.monotonic() + RETRY_AFTER
+                        raise self._error(exc) from exc
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.execute("GET", key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.execute("SET", key, value, "PX", max(1, int(ttl * 1000)))
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return self.execute("SET", key, value, "NX", "PX", max(1, int(ttl * 1000))) is not None
+
+    def delete(self, *keys: str):
+        if keys:
+            self.execute("DEL", *keys)
+
+    def incr(self, key: str) -> int:
+        return self.execute("INCR", key)
+
+    def publish(self, channel: str, message: bytes):
+        self.execute("PUBLISH", channel, message)
+
+    def subscribe(self, channel: str, callback: Callable[[Optional[bytes]], None]):
+        with self._subscriber_lock:
+            start = not self._channels
+            callbacks = self._channels.setdefault(channel, [])
+            callbacks.append(callback)
+            if len(callbacks) == 1 and self._subscriber is not None:
+                try:
+                    self._subscriber[0].sendall(_encode_command(("SUBSCRIBE", channel)))
+                except OSError:
+                    # The listener reconnects and subscribes every channel
+                    pass
+        if start:
+            threading.Thread(target=self._listen, name="cache-subscriber", daemon=True).start()
+
+    def _listen(self):
+        delay, connected_before = 0.1, False
+        while not self._closed:
+            try:
+                connection = self._connect()
+                connection[0].settimeout(None)
+                with self._subscriber_lock:
+                    channels = list(self._channels)
+                    connection[0].sendall(_encode_command(("SUBSCRIBE", *channels)))
+                    self._subscriber = connection
+                if connected_before:
+                    for channel in channels:
+                        self._notify(channel, None)
+                delay, connected_before = 0.1, True
+                while True:
+                    kind, channel, message = _read_reply(connection[1])
+                    if kind == b"message":
+                        self._notify(channel.decode(), message)
+            except (OSError, CacheError) as exc:
+                self._drop_subscriber()
+                if self._closed:
+                    return
+                logger.warning("Cache subscription lost (%s); reconnecting", exc)
+                time.sleep(delay)
+                delay = min(delay * 2, 5.0)
+            except Exception:
+                self._drop_subscriber()
+                logger.exception("Cache subscriber failed; resubscribing")
+
+    def _notify(self, channel: str, message: bytes):
+        for callback in list(self._channels.get(channel, ())):
+            try:
+                callback(message)
+            except Exception:
+                logger.exception("Cache subscriber callback for %s failed", channel)
+
+    def _drop_subscriber(self):
+        with self._subscriber_lock:
+            if self._subscriber is not None:
+                self._subscriber[0].close()
+                self._subscriber = None
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            self._disconnect()
+        with self._subscriber_lock:
+            if self._subscriber is not None:
+                try:
+                    self._subscriber[0].shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        self._drop_subscriber()
+
+def create_backend(url: str = CACHE_URL) -> CacheBackend:
+    scheme = urlsplit(url).scheme
+    if scheme == "memory":
+        return MemoryBackend()
+    if scheme == "redis":
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported CACHE_URL scheme {scheme!r}; use memory:// or redis://")
+
+class SharedCache:
+    """
+    Namespaced, versioned entries on a CacheBackend (see the module
+    docstring). Backend failures are logged and read as misses.
+    """
+
+    def __init__(self, backend: CacheBackend, prefix: str = CACHE_PREFIX, ttl: float = CACHE_TTL):
+        self.backend = backend
+        self.prefix = prefix
+        self.ttl = ttl
+        self._deferred: Optional[ThreadPoolExecutor] = None
+        self._last_deferred: Optional[Future] = None
+        self._deferred_lock = threading.Lock()
+
+    def key(self, namespace: str, *parts) -> str:
+        return ":".join([self.prefix, namespace] + ["*" if part is None else str(part) for part in parts])
+
+    def versioned_key(self, namespace: str, versions: Mapping[str, int], *parts) -> str:
+        """key() of an entry built at versions (table change counters)."""
+        return self.key(namespace, ",".join(f"{name}={version}" for name, version in sorted(versions.items())), *parts)
+
+    def _backend_call(self, method: str, *args, default=None):
+        try:
+            return getattr(self.backend, method)(*args)
+        except CacheError as exc:
+            logger.warning("Cache %s failed: %s", method, exc)
+            return default
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._backend_call("get", key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        self._backend_call("set", key, value, self.ttl if ttl is None else ttl)
+
+    def delete(self, *keys: str):
+        self._backend_call("delete", *keys)
+
+    def incr(self, name: str) -> Optional[int]:
+        """Increment the counter name and return it (None if unreachable)."""
+        return self._backend_call("incr", self.key("counter", name))
+
+    def counter(self, name: str) -> int:
+        """Current value of the counter name (0 if never incremented or unreachable)."""
+        return int(self.get(self.key("counter", name)) or 0)
+
+    def publish(self, channel: str, message: bytes):
+        self._backend_call("publish", self.key("channel", channel), message)
+
+    def subscribe(self, channel: str, callback: Callable[[Optional[bytes]], None]):
+        self.backend.subscribe(self.key("channel", channel), callback)
+
+    def _lock(self, key: str) -> bool:
+        # An unreachable backend can't coordinate builders: build without waiting
+        return self._backend_call("add", key + ":lock", b"1", LOCK_TTL, default=True)
+
+    def _unlock(self, key: str):
+        self.delete(key + ":lock")
+
+    def _locked(self, key: str) -> bool:
+        return self.get(key + ":lock") is not None
+
+    def get_or_build(
+        self,
+        key: str,
+        build: Callable[[], bytes],
+        ttl: Optional[float] = None,
+        store_if: Optional[Callable[[], bool]] = None,
+    ) -> bytes:
+        """
+        The entry at key, or else build()'s result, stored (unless store_if()
+        is false by then) and returned. While one caller builds, the others
+        wait up to LOCK_WAIT seconds for its entry.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        locked = self._lock(key)
+        if not locked:
+            deadline = time.monotonic() + LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL)
+                value = self.get(key)
+                if value is not None:
+                    return value
+                if not self._locked(key):
+                    break
+        try:
+            value = build()
+            if store_if is None or store_if():
+                self.set(key, value, ttl)
+        finally:
+            if locked:
+                self._unlock(key)
+        return value
+
+    async def aget_or_build(
+        self,
+        key: str,
+        build: Callable[[], Awaitable[bytes]],
+        ttl: Optional[float] = None,
+        store_if: Optional[Callable[[], bool]] = None,
+    ) -> bytes:
+        """
+        Async variant of get_or_build() for a coroutine build; backend calls
+        go through run() and waiting callers yield to the event loop.
+        """
+        value = await self.aget(key)
+        if value is not None:
+            return value
+        locked = await self.run(self._lock, key)
+        if not locked:
+            deadline = time.monotonic() + LOCK_WAIT
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL)
+                value = await self.aget(key)
+                if value is not None:
+                    return value
+                if not await self.run(self._locked, key):
+                    break
+        try:
+            value = await build()
+            if store_if is None or store_if():
+                await self.run(self.set, key, value, ttl)
+        finally:
+            if locked:
+                await self.run(self._unlock, key)
+        return value
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        """get() from a coroutine."""
+        return await self.run(self.get, key)
+
+    async def run(self, function: Callable, *args):
+        """
+        function(*args) from a coroutine: on a worker thread when the backend
+        blocks (redis://), so the event loop never waits on the cache server.
+        """
+        if not self.backend.blocking:
+            return function(*args)
+        return await asyncio.to_thread(function, *args)
+
+    def defer(self, function: Callable, *args):
+        """
+        function(*args) without waiting for it when called on an event loop
+        with a blocking backend (on one background thread, in call order),
+        and right away otherwise. For writes made from synchronous hooks.
+        """
+        if self.backend.blocking:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                pass
+            else:
+                with self._deferred_lock:
+                    if self._deferred is None:
+                        self._deferred = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-deferred")
+                    self._last_deferred = self._deferred.submit(self._call_logged, function, *args)
+                return
+        function(*args)
+
+    async def settle(self):
+        """Wait for the calls deferred so far, so a worker reads its own writes."""
+        pending = self._last_deferred
+        if pending is not None and not pending.done():
+            await asyncio.wrap_future(pending)
+
+    @staticmethod
+    def _call_logged(function: Callable, *args):
+        try:
+            function(*args)
+        except Exception:
+            logger.exception("Deferred cache call %s failed", getattr(function, "__qualname__", function))
+
+    def close(self):
+        with self._deferred_lock:
+            if self._deferred is not None:
+                self._deferred.shutdown()
+                self._deferred = None
+        self.backend.close()
+
+shared_cache = SharedCache(create_backend())
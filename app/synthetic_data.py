@@ -0,0 +1,325 @@
+"""
+Synthetic catalog and itinerary data for load and capacity testing.
+
+Generates locations, hotels, activities and itineraries with realistic
+distributions (1-14 nights, weighted towards a week; several regions; a
+configurable share of recommended itineraries) and consistent day numbers:
+one accommodation per night, an arrival transfer on day 1, a transfer on
+every hotel change and a departure transfer the day after the last night,
+and activities near that night's hotel. Rows are written with multi-row
+Core inserts and pre-assigned ids, so ~10M rows take a few minutes.
+
+The database must already be migrated (python -m app.manage migrate):
+
+    python -m app.synthetic_data --itineraries 550000 [database-url]
+
+On average an itinerary is ~18 rows, so 550k itineraries is ~10M rows.
+"""
+import argparse
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import time as time_of_day
+from itertools import accumulate
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from . import crud, models
+from .database import create_db_engine
+
+DEFAULT_BATCH_SIZE = 20000
+
+REGIONS = [
+    "Phuket", "Krabi", "Koh Samui", "Bangkok", "Chiang Mai",
+    "Pattaya", "Hua Hin", "Koh Phangan", "Koh Lanta", "Chiang Rai",
+]
+# Approximate centers (latitude, longitude) of the named regions; extra
+# regions are placed at random inside THAILAND_BOUNDS
+REGION_CENTERS = {
+    "Phuket": (7.88, 98.39), "Krabi": (8.09, 98.91), "Koh Samui": (9.51, 100.01), "Bangkok": (13.76, 100.50),
+    "Chiang Mai": (18.79, 98.99), "Pattaya": (12.93, 100.88), "Hua Hin": (12.57, 99.96),
+    "Koh Phangan": (9.73, 100.01), "Koh Lanta": (7.62, 99.08), "Chiang Rai": (19.91, 99.84),
+}
+THAILAND_BOUNDS = ((6.0, 20.0), (98.0, 105.0))
+# Standard deviation, in degrees, of locations around their region's center
+# and of hotels and activities around their location
+LOCATION_SPREAD, VENUE_SPREAD = 0.1, 0.01
+LOCATION_KINDS = ["Beach", "Old Town", "Bay", "Pier", "Market", "Hills", "Village", "Island", "Harbour", "Riverside"]
+HOTEL_KINDS = ["Resort", "Hotel", "Boutique Hotel", "Villas", "Hostel", "Beach Club", "Lodge", "Suites"]
+HOTEL_BRANDS = ["Sea Breeze", "Coral", "Orchid", "Lotus", "Palm", "Sunset", "Andaman", "Golden", "Blue Lagoon", "Teak"]
+AMENITIES = ["Pool", "Spa", "Beach Access", "Free WiFi", "Restaurant", "Gym", "Bar", "Airport Shuttle", "Kids Club", "Parking"]
+ACTIVITY_NAMES = {
+    models.ActivityType.SIGHTSEEING: ["Viewpoint Tour", "Temple Visit", "Island Hopping", "City Tour"],
+    models.ActivityType.ADVENTURE: ["Snorkeling Trip", "Rock Climbing", "Kayaking", "Zipline"],
+    models.ActivityType.RELAXATION: ["Thai Massage", "Sunset Cruise", "Beach Day", "Yoga Class"],
+    models.ActivityType.CULTURAL: ["Cooking Class", "Muay Thai Show", "Heritage Walk", "Craft Workshop"],
+    models.ActivityType.DINING: ["Seafood Dinner", "Street Food Tour", "Night Market Dinner"],
+    models.ActivityType.SHOPPING: ["Walking Street Market", "Weekend Market", "Mall Visit"],
+    models.ActivityType.OTHER: ["Free Time", "Photo Session"],
+}
+ACTIVITY_TYPE_CUM_WEIGHTS = list(accumulate([25, 20, 15, 15, 12, 10, 3]))
+
+# Nights 1..14 (cumulative weights): most trips last 3 to 7 nights
+NIGHTS = list(range(1, 15))
+NIGHTS_CUM_WEIGHTS = list(accumulate([3, 6, 10, 12, 12, 9, 11, 6, 4, 4, 3, 2, 2, 3]))
+
+# Probability of moving to another hotel after a night
+HOTEL_CHANGE_PROBABILITY = 0.25
+ACTIVITIES_PER_DAY = [0, 1, 2, 3]
+ACTIVITIES_PER_DAY_CUM_WEIGHTS = list(accumulate([20, 40, 30, 10]))
+TRANSFER_TYPES = [models.TransferType.CAR, models.TransferType.FERRY, models.TransferType.BUS, models.TransferType.FLIGHT]
+TRANSFER_TYPE_CUM_WEIGHTS = list(accumulate([60, 25, 10, 5]))
+
+@dataclass
+class GeneratorConfig:
+    locations: int = 100
+    hotels: int = 2000
+    activities: int = 3000
+    itineraries: int = 10000
+    regions: int = 5
+    recommended_ratio: float = 0.2
+    seed: Optional[int] = None
+    batch_size: int = DEFAULT_BATCH_SIZE
+
+def region_names(count: int) -> List[str]:
+    return REGIONS[:count] + [f"Region {n}" for n in range(len(REGIONS) + 1, count + 1)]
+
+def _next_id(connection, model) -> int:
+    return (connection.scalar(select(func.max(model.id))) or 0) + 1
+
+def _insert(connection, model, rows: List[dict], batch_size: int):
+    for start in range(0, len(rows), batch_size):
+        connection.execute(model.__table__.insert(), rows[start:start + batch_size])
+
+def _near(rng: random.Random, latitude: float, longitude: float, spread: float) -> Dict[str, float]:
+    return {
+        "latitude": round(min(90.0, max(-90.0, rng.gauss(latitude, spread))), 6),
+        "longitude": round(min(180.0, max(-180.0, rng.gauss(longitude, spread))), 6),
+    }
+
+def generate_locations(rng: random.Random, config: GeneratorConfig, first_id: int) -> List[dict]:
+    regions = region_names(config.regions)
+    (south, north), (west, east) = THAILAND_BOUNDS
+    centers = {
+        region: REGION_CENTERS.get(region) or (rng.uniform(south, north), rng.uniform(west, east))
+        for region in regions
+    }
+    return [
+        {
+            "id": first_id + n,
+            "name": f"{regions[n % len(regions)]} {rng.choice(LOCATION_KINDS)} {first_id + n}",
+            "region": regions[n % len(regions)],
+            "description": "Synthetic location for load testing.",
+            **_near(rng, *centers[regions[n % len(regions)]], LOCATION_SPREAD),
+        }
+        for n in range(config.locations)
+    ]
+
+def generate_hotels(rng: random.Random, config: GeneratorConfig, locations: List[dict], first_id: int) -> List[dict]:
+    hotels = []
+    for n in range(config.hotels):
+        rating = round(min(5.0, max(2.5, rng.gauss(4.2, 0.45))), 1)
+        location = rng.choice(locations)
+        hotels.append({
+            "id": first_id + n,
+            "name": f"{rng.choice(HOTEL_BRANDS)} {rng.choice(HOTEL_KINDS)} {first_id + n}",
+            "location_id": location["id"],
+            "rating": rating,
+            # Nightly rates are long-tailed and grow with the rating
+            "price_per_night": round(rng.lognormvariate(3.6, 0.5) * rating * 10, 2),
+            "description": "Synthetic hotel for load testing.",
+            "amenities": ",".join(rng.sample(AMENITIES, rng.randint(2, 6))),
+            **_near(rng, location["latitude"], location["longitude"], VENUE_SPREAD),
+        })
+    return hotels
+
+def generate_activities(rng: random.Random, config: GeneratorConfig, locations: List[dict], first_id: int) -> List[dict]:
+    types = list(ACTIVITY_NAMES)
+    activities = []
+    for n in range(config.activities):
+        activity_type = rng.choices(types, cum_weights=ACTIVITY_TYPE_CUM_WEIGHTS)[0]
+        location = rng.choice(locations)
+        activities.append({
+            "id": first_id + n,
+            "name": f"{rng.choice(ACTIVITY_NAMES[activity_type])} {first_id + n}",
+            "location_id": location["id"],
+            "type": activity_type,
+            "duration_hours": rng.choice([1, 1.5, 2, 3, 4, 6, 8]),
+            "price": round(rng.lognormvariate(6.5, 0.7), 2),
+            "description": "Synthetic activity for load testing.",
+            **_near(rng, location["latitude"], location["longitude"], VENUE_SPREAD),
+        })
+    return activities
+
+def _catalog_by_region(locations, hotels, activities) -> Tuple[Dict[str, List[dict]], Dict[int, List[int]]]:
+    region_of = {location["id"]: location["region"] for location in locations}
+    hotels_by_region: Dict[str, List[dict]] = {}
+    for hotel in hotels:
+        hotels_by_region.setdefault(region_of[hotel["location_id"]], []).append(hotel)
+    activities_by_location: Dict[int, List[int]] = {}
+    for activity in activities:
+        activities_by_location.setdefault(activity["location_id"], []).append(activity["id"])
+    return hotels_by_region, activities_by_location
+
+def generate_itineraries(
+    rng: random.Random,
+    config: GeneratorConfig,
+    locations: List[dict],
+    hotels: List[dict],
+    activities: List[dict],
+    first_ids: Dict[str, int],
+) -> Iterator[Tuple[List[dict], List[dict], List[dict], List[dict]]]:
+    """
+    Yield (itineraries, accommodations, transfers, itinerary_activities) row
+    batches of up to batch_size itineraries each.
+    """
+    location_names = {location["id"]: location["name"] for location in locations}
+    hotels_by_region, activities_by_location = _catalog_by_region(locations, hotels, activities)
+    regions = sorted(hotels_by_region)
+    next_ids = dict(first_ids)
+
+    def take_id(table: str) -> int:
+        next_ids[table] += 1
+        return next_ids[table] - 1
+
+    for start in range(0, config.itineraries, config.batch_size):
+        itineraries, accommodations, transfers, itinerary_activities = [], [], [], []
+        for _ in range(min(config.batch_size, config.itineraries - start)):
+            itinerary_id = take_id("itineraries")
+            nights = rng.choices(NIGHTS, cum_weights=NIGHTS_CUM_WEIGHTS)[0]
+            region = rng.choice(regions)
+            itineraries.append({
+                "id": itinerary_id,
+                "name": f"{nights}-Night {region} Trip {itinerary_id}",
+                "duration_nights": nights,
+                "region": region,
+                "description": "Synthetic itinerary for load testing.",
+                "is_recommended": rng.random() < config.recommended_ratio,
+            })
+
+            previous_location = f"{region} Airport"
+            hotel = rng.choice(hotels_by_region[region])
+            for day in range(1, nights + 1):
+                if day > 1 and rng.random() < HOTEL_CHANGE_PROBABILITY:
+                    hotel = rng.choice(hotels_by_region[region])
+                location_name = location_names[hotel["location_id"]]
+                accommodations.append({
+                    "id": take_id("accommodations"),
+                    "itinerary_id": itinerary_id,
+                    "hotel_id": hotel["id"],
+                    "day_number": day,
+                    "check_in_date": None,
+                    "check_out_date": None,
+                })
+                if location_name != previous_location:
+                    transfers.append({
+                        "id": take_id("transfers"),
+                        "itinerary_id": itinerary_id,
+                        "day_number": day,
+                        "from_location": previous_location,
+                        "to_location": location_name,
+                        "transfer_type": rng.choices(TRANSFER_TYPES, cum_weights=TRANSFER_TYPE_CUM_WEIGHTS)[0],
+                        "duration_hours": rng.choice([0.5, 1, 1.5, 2, 3]),
+                        "departure_time": None,
+                    })
+                    previous_location = location_name
+
+                nearby = activities_by_location.get(hotel["location_id"])
+                if nearby:
+                    count = rng.choices(ACTIVITIES_PER_DAY, cum_weights=ACTIVITIES_PER_DAY_CUM_WEIGHTS)[0]
+                    for hour, activity_id in zip((9, 14, 19), rng.sample(nearby, min(count, len(nearby)))):
+                        itinerary_activities.append({
+                            "id": take_id("itinerary_activities"),
+                            "itinerary_id": itinerary_id,
+                            "activity_id": activity_id,
+                            "day_number": day,
+                            "start_time": time_of_day(hour),
+                        })
+
+            transfers.append({
+                "id": take_id("transfers"),
+                "itinerary_id": itinerary_id,
+                "day_number": nights + 1,
+                "from_location": previous_location,
+                "to_location": f"{region} Airport",
+                "transfer_type": models.TransferType.CAR,
+                "duration_hours": 1,
+                "departure_time": None,
+            })
+        yield itineraries, accommodations, transfers, itinerary_activities
+
+def generate(db_engine, config: GeneratorConfig) -> Dict[str, int]:
+    """
+    Append a synthetic data set to a migrated database in a single transaction.
+    Returns the number of rows written per table.
+    """
+    rng = random.Random(config.seed)
+    counts: Dict[str, int] = {}
+    itinerary_models = (models.Itinerary, models.Accommodation, models.Transfer, models.ItineraryActivity)
+
+    with db_engine.begin() as connection:
+        # Throwaway load data: skip the per-commit fsync
+        connection.exec_driver_sql("PRAGMA synchronous=OFF")
+
+        locations = generate_locations(rng, config, _next_id(connection, models.Location))
+        hotels = generate_hotels(rng, config, locations, _next_id(connection, models.Hotel))
+        activities = generate_activities(rng, config, locations, _next_id(connection, models.Activity))
+        for model, rows in ((models.Location, locations), (models.Hotel, hotels), (models.Activity, activities)):
+            _insert(connection, model, rows, config.batch_size)
+            counts[model.__tablename__] = len(rows)
+        crud.sync_hotel_amenities(connection, [hotel["id"] for hotel in hotels])
+
+        first_ids = {model.__tablename__: _next_id(connection, model) for model in itinerary_models}
+        for batch in generate_itineraries(rng, config, locations, hotels, activities, first_ids):
+            for model, rows in zip(itinerary_models, batch):
+                _insert(connection, model, rows, config.batch_size)
+                counts[model.__tablename__] = counts.get(model.__tablename__, 0) + len(rows)
+
+        connection.execute(crud.itinerary_summaries_refresh_stmt(models.Itinerary.id >= first_ids["itineraries"]))
+        connection.execute(crud.bump_table_versions_stmt("locations", "hotels", "activities", "itineraries"))
+    return counts
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Generate synthetic travel data for load testing.")
+    parser.add_argument("database_url", nargs="?", default=None)
+    parser.add_argument("--locations", type=int, default=GeneratorConfig.locations)
+    parser.add_argument("--hotels", type=int, default=GeneratorConfig.hotels)
+    parser.add_argument("--activities", type=int, default=GeneratorConfig.activities)
+    parser.add_argument("--itineraries", type=int, default=GeneratorConfig.itineraries)
+    parser.add_argument("--regions", type=int, default=GeneratorConfig.regions)
+    parser.add_argument("--recommended-ratio", type=float, default=GeneratorConfig.recommended_ratio)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv[1:])
+
+    if args.locations < 1 or args.hotels < 1 or args.regions < 1:
+        parser.error("--locations, --hotels and --regions must be at least 1")
+    config = GeneratorConfig(
+        locations=args.locations,
+        hotels=args.hotels,
+        activities=args.activities,
+        itineraries=args.itineraries,
+        regions=min(args.regions, args.locations),
+        recommended_ratio=args.recommended_ratio,
+        seed=args.seed,
+        batch_size=args.batch_size,
+    )
+
+    db_engine = create_db_engine(args.database_url)
+    started = time.perf_counter()
+    try:
+        counts = generate(db_engine, config)
+    finally:
+        db_engine.dispose()
+    elapsed = time.perf_counter() - started
+
+    total = sum(counts.values())
+    for table, count in counts.items():
+        print(f"{table}: {count}")
+    print(f"{total} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,255 @@
+"""
+Benchmark the API routes in-process through httpx against a seeded database.
+
+Every route is first called once on its own to count the SQL statements it
+issues, then driven by --concurrency clients for --requests requests. The
+script reports throughput and p50/p95/p99 latency per route, can write the
+results as JSON, and can compare them with a stored baseline: it exits 1 when
+a route's p95 latency or throughput regresses past --max-regression, or when
+it issues more statements than before.
+
+Each route runs warm (caches filled by the requests before) and cold, with
+every cache emptied before each request, reported as "<route> (cold)": the
+catalog snapshot and route graph are dropped, and the shared cache is read
+under a fresh key prefix, so a shared cache server isn't flushed.
+
+    python -m benchmarks.endpoints --requests 500 --concurrency 10 --output results.json
+    python -m benchmarks.endpoints --baseline results.json --max-regression 0.2
+
+The database is a temporary copy of --database (migrated and seeded if
+needed), so a synthetic data set (python -m app.synthetic_data) can be
+benchmarked without being modified.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy import event, select
+
+SCENARIOS = ("warm", "cold")
+
+_cold_prefixes = itertools.count()
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def _prepare_database(source: Optional[str], directory: str) -> str:
+    path = os.path.join(directory, "benchmark.db")
+    if source:
+        shutil.copyfile(source, path)
+    # The app modules read DATABASE_URL when they are first imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    from app.manage import migrate
+    from app.seed_data import seed_data
+
+    migrate()
+    seed_data()
+    return path
+
+def _route_requests(db) -> Dict[str, Callable[[random.Random], dict]]:
+    """Route name -> factory of httpx request arguments, using ids that exist."""
+    from app import models
+
+    itinerary_ids = db.scalars(select(models.Itinerary.id).limit(10000)).all()
+    nights = db.scalars(
+        select(models.Itinerary.duration_nights).where(models.Itinerary.is_recommended == True).distinct()
+    ).all() or [2]
+    hotel_id = db.scalar(select(models.Hotel.id).limit(1))
+    activity_id = db.scalar(select(models.Activity.id).limit(1))
+    new_itinerary = {
+        "name": "Benchmark Trip",
+        "duration_nights": 2,
+        "region": "Phuket",
+        "accommodations": [{"hotel_id": hotel_id, "day_number": 1}, {"hotel_id": hotel_id, "day_number": 2}],
+        "transfers": [{"day_number": 1, "from_location": "Phuket Airport", "to_location": "Patong", "transfer_type": "car", "duration_hours": 1}],
+        "itinerary_activities": [{"activity_id": activity_id, "day_number": 1}],
+    }
+
+    search_terms = ["beach", "phuket", "krabi", "island", "spa", "temple", "diving", "resort"]
+
+    return {
+        "GET /itineraries/": lambda rng: {"method": "GET", "url": "/itineraries/"},
+        "GET /itineraries/export": lambda rng: {"method": "GET", "url": "/itineraries/export"},
+        "GET /itineraries/{id}": lambda rng: {"method": "GET", "url": f"/itineraries/{rng.choice(itinerary_ids)}"},
+        "POST /mcp/recommended-itineraries/": lambda rng: {
+            "method": "POST", "url": "/mcp/recommended-itineraries/", "json": {"nights": rng.choice(nights)},
+        },
+        "GET /locations/": lambda rng: {"method": "GET", "url": "/locations/"},
+        "GET /hotels/": lambda rng: {"method": "GET", "url": "/hotels/"},
+        "GET /hotels/?amenities": lambda rng: {"method": "GET", "url": "/hotels/", "params": {"amenities": "pool,spa"}},
+        "GET /activities/": lambda rng: {"method": "GET", "url": "/activities/"},
+        "GET /nearby": lambda rng: {
+            "method": "GET", "url": "/nearby", "params": {"lat": 7.88, "lon": 98.39, "radius": 10},
+        },
+        "GET /routes": lambda rng: {
+            "method": "GET", "url": "/routes", "params": {"from": "Phuket Airport", "to": "Patong"},
+        },
+        "GET /search": lambda rng: {"method": "GET", "url": "/search", "params": {"q": rng.choice(search_terms)}},
+        # Writes last, so the reads above see the same data in every run
+        "POST /itineraries/": lambda rng: {"method": "POST", "url": "/itineraries/", "json": new_itinerary},
+        "POST /itineraries/bulk": lambda rng: {
+            "method": "POST", "url": "/itineraries/bulk", "json": [new_itinerary] * 10,
+        },
+    }
+
+def _drop_caches():
+    """Empty every cache a request could be answered from (see the module docstring)."""
+    from app.catalog_cache import catalog_cache
+    from app.route_graph import route_graph
+    from app.shared_cache import CACHE_PREFIX, shared_cache
+
+    catalog_cache.invalidate()
+    route_graph.invalidate()
+    shared_cache.prefix = f"{CACHE_PREFIX}:cold-{next(_cold_prefixes)}"
+
+def _restore_caches():
+    """Go back to the warm shared cache keys after a cold run."""
+    from app.shared_cache import CACHE_PREFIX, shared_cache
+
+    shared_cache.prefix = CACHE_PREFIX
+
+async def _count_statements(client: httpx.AsyncClient, counter: List[int], request: dict) -> int:
+    counter[0] = 0
+    response = await client.request(**request)
+    response.raise_for_status()
+    return counter[0]
+
+async def _drive(
+    client: httpx.AsyncClient,
+    make_request,
+    requests: int,
+    concurrency: int,
+    seed: int,
+    before_request: Optional[Callable[[], None]] = None,
+) -> dict:
+    rng = random.Random(seed)
+    pending = [make_request(rng) for _ in range(requests)]
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while pending:
+            request = pending.pop()
+            if before_request is not None:
+                before_request()
+            started = time.perf_counter()
+            response = await client.request(**request)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "requests_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+async def run(
+    requests: int, concurrency: int, routes: Optional[List[str]], seed: int, scenarios: List[str] = SCENARIOS
+) -> Dict[str, dict]:
+    from app.database import SessionLocal, async_engine
+    from app.main import app
+
+    counter = [0]
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def count_statement(*args):
+        counter[0] += 1
+
+    with SessionLocal() as db:
+        route_requests = _route_requests(db)
+    selected = routes or list(route_requests)
+
+    results = {}
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for name in selected:
+                make_request = route_requests[name]
+                for scenario in scenarios:
+                    before_request = _drop_caches if scenario == "cold" else None
+                    if before_request is not None:
+                        before_request()
+                    statements = await _count_statements(client, counter, make_request(random.Random(seed)))
+                    results[name if scenario == "warm" else f"{name} (cold)"] = {
+                        **await _drive(client, make_request, requests, concurrency, seed, before_request),
+                        "statements_per_request": statements,
+                    }
+                    if before_request is not None:
+                        _restore_caches()
+    finally:
+        await app.router.shutdown()
+    return results
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], max_regression: float) -> List[str]:
+    """Regressions of results against baseline, one message per failed check."""
+    failures = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+            failures.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["requests_per_second"] < previous["requests_per_second"] * (1 - max_regression):
+            failures.append(f"{name}: throughput {previous['requests_per_second']} -> {current['requests_per_second']} req/s")
+        if current["statements_per_request"] > previous["statements_per_request"]:
+            failures.append(
+                f"{name}: statements per request {previous['statements_per_request']} -> {current['statements_per_request']}"
+            )
+    return failures
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", help="SQLite file to benchmark a copy of (default: a freshly seeded database)")
+    parser.add_argument("--requests", type=int, default=500, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--routes", nargs="+", help="route names to run (default: all)")
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS), help="cache states (default: both)"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed fractional regression (default 0.2)")
+    args = parser.parse_args(argv[1:])
+
+    with tempfile.TemporaryDirectory() as directory:
+        _prepare_database(args.database, directory)
+        results = asyncio.run(run(args.requests, args.concurrency, args.routes, args.seed, args.scenarios))
+
+    for name, result in results.items():
+        print(json.dumps({"route": name, **result}))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            failures = compare(results, json.load(baseline_file), args.max_regression)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        return 1 if failures else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
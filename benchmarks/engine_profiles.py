@@ -0,0 +1,112 @@
+"""
+Compare read/write throughput of the SQLite engine profiles under concurrent load.
+
+Each profile gets a fresh copy of a seeded database. Reader threads fetch the
+full itinerary graph while writer threads create itineraries, for a fixed
+duration; the script reports operations per second and lock errors.
+
+    python -m benchmarks.engine_profiles --seconds 5 --readers 8 --writers 2
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, schemas
+from app.database import ENGINE_PROFILES, create_db_engine
+from app.seed_data import seed_data
+
+WRITE_PAYLOAD = schemas.ItineraryCreate(
+    name="Benchmark Trip",
+    duration_nights=2,
+    region="Phuket",
+    accommodations=[{"hotel_id": 1, "day_number": 1}, {"hotel_id": 1, "day_number": 2}],
+    transfers=[{"day_number": 1, "from_location": "Phuket Airport", "to_location": "Patong", "transfer_type": "car", "duration_hours": 1}],
+    itinerary_activities=[{"activity_id": 1, "day_number": 1}],
+)
+
+def _seeded_database(directory: str) -> str:
+    path = os.path.join(directory, "seed.db")
+    seed_engine = create_db_engine(f"sqlite:///{path}", profile="test")
+    models.Base.metadata.create_all(bind=seed_engine)
+    seed_data(sessionmaker(bind=seed_engine))
+    seed_engine.dispose()
+    return path
+
+def run_profile(profile: str, template: str, directory: str, seconds: float, readers: int, writers: int) -> dict:
+    path = os.path.join(directory, f"{profile}.db")
+    shutil.copyfile(template, path)
+    engine = create_db_engine(f"sqlite:///{path}", profile=profile)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def reader():
+        done = errors = 0
+        while time.perf_counter() < deadline:
+            try:
+                with Session() as db:
+                    crud.get_itinerary(db, random.randint(1, 8))
+                done += 1
+            except OperationalError:
+                errors += 1
+        with lock:
+            counts["reads"] += done
+            counts["errors"] += errors
+
+    def writer():
+        done = errors = 0
+        while time.perf_counter() < deadline:
+            try:
+                with Session() as db:
+                    crud.create_itinerary(db, WRITE_PAYLOAD)
+                done += 1
+            except OperationalError:
+                errors += 1
+        with lock:
+            counts["writes"] += done
+            counts["errors"] += errors
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {
+        "profile": profile,
+        "reads_per_second": round(counts["reads"] / seconds, 1),
+        "writes_per_second": round(counts["writes"] / seconds, 1),
+        "errors": counts["errors"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--profiles", nargs="+", default=list(ENGINE_PROFILES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        template = _seeded_database(directory)
+        results = [
+            run_profile(profile, template, directory, args.seconds, args.readers, args.writers)
+            for profile in args.profiles
+        ]
+
+    for result in results:
+        print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Compare the Pydantic (from_attributes) and app.serializers + orjson paths on
+large MCP responses.
+
+A synthetic database is generated in a temporary directory; the recommended
+itineraries for each --nights value are loaded once with their full graph and
+then serialized --repeat times by each path. Both paths must produce the same
+JSON document.
+
+    python -m benchmarks.serialization --itineraries 20000 --nights 3 7 14
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, schemas, serializers
+from app.database import create_db_engine
+from app.synthetic_data import GeneratorConfig, generate
+
+def pydantic_payload(itineraries) -> bytes:
+    return schemas.MCPResponse.model_validate(
+        {"recommended_itineraries": itineraries}, from_attributes=True
+    ).model_dump_json().encode()
+
+def fast_payload(itineraries) -> bytes:
+    return serializers.dumps(serializers.mcp_response(itineraries))
+
+def best_of(function, itineraries, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(itineraries)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--itineraries", type=int, default=20000)
+    parser.add_argument("--recommended-ratio", type=float, default=0.5)
+    parser.add_argument("--nights", type=int, nargs="+", default=[3, 7, 14])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_db_engine(f"sqlite:///{os.path.join(directory, 'serialization.db')}", profile="test")
+        models.Base.metadata.create_all(bind=engine)
+        generate(engine, GeneratorConfig(itineraries=args.itineraries, recommended_ratio=args.recommended_ratio, seed=1))
+        Session = sessionmaker(bind=engine)
+
+        for nights in args.nights:
+            with Session() as db:
+                itineraries = crud.get_recommended_itineraries(db, nights)
+                if json.loads(pydantic_payload(itineraries)) != json.loads(fast_payload(itineraries)):
+                    raise SystemExit(f"Serializers disagree for {nights} nights")
+                pydantic_seconds = best_of(pydantic_payload, itineraries, args.repeat)
+                fast_seconds = best_of(fast_payload, itineraries, args.repeat)
+                print(json.dumps({
+                    "nights": nights,
+                    "itineraries": len(itineraries),
+                    "payload_bytes": len(fast_payload(itineraries)),
+                    "pydantic_ms": round(pydantic_seconds * 1000, 1),
+                    "serializers_ms": round(fast_seconds * 1000, 1),
+                    "speedup": round(pydantic_seconds / fast_seconds, 1),
+                }))
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
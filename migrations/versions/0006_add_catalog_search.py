@@ -0,0 +1,54 @@
+"""add catalog search
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 07:42:10.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> (kind, rowid code, column indexed as `details`); the FTS rowid is
+# id * 4 + code so triggers can address a catalog row's entry directly
+INDEXED_TABLES = {
+    'locations': ('location', 1, 'region'),
+    'hotels': ('hotel', 2, 'amenities'),
+    'activities': ('activity', 3, 'type'),
+}
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE VIRTUAL TABLE catalog_search USING fts5("
+        "name, description, details, kind UNINDEXED, entity_id UNINDEXED, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    for table, (kind, code, details) in INDEXED_TABLES.items():
+        insert = (
+            "INSERT INTO catalog_search(rowid, name, description, details, kind, entity_id) "
+            f"VALUES (new.id * 4 + {code}, new.name, new.description, new.{details}, '{kind}', new.id);"
+        )
+        delete = f"DELETE FROM catalog_search WHERE rowid = old.id * 4 + {code};"
+        op.execute(f"CREATE TRIGGER {table}_search_insert AFTER INSERT ON {table} BEGIN {insert} END")
+        op.execute(f"CREATE TRIGGER {table}_search_update AFTER UPDATE ON {table} BEGIN {delete} {insert} END")
+        op.execute(f"CREATE TRIGGER {table}_search_delete AFTER DELETE ON {table} BEGIN {delete} END")
+        op.execute(
+            "INSERT INTO catalog_search(rowid, name, description, details, kind, entity_id) "
+            f"SELECT id * 4 + {code}, name, description, {details}, '{kind}', id FROM {table}"
+        )
+
+
+def downgrade() -> None:
+    for table in INDEXED_TABLES:
+        for event in ('insert', 'update', 'delete'):
+            op.execute(f"DROP TRIGGER {table}_search_{event}")
+    op.execute("DROP TABLE catalog_search")
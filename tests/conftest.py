@@ -0,0 +1,77 @@
+"""
+Shared fixtures: a seeded SQLite database built with `alembic upgrade head`,
+copied afresh for every test that uses it, and a client of the app on it.
+"""
+import shutil
+import uuid
+
+import pytest
+from alembic import command
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.catalog_cache import catalog_cache
+from app.database import create_async_db_engine, create_db_engine, get_async_db, get_db
+from app.main import app
+from app.manage import alembic_config
+from app.route_graph import route_graph
+from app.seed_data import seed_data
+from app.shared_cache import shared_cache
+
+@pytest.fixture(scope="session")
+def seeded_database(tmp_path_factory):
+    """Path of a database migrated to head and seeded, to copy from."""
+    path = tmp_path_factory.mktemp("database") / "seeded.db"
+    url = f"sqlite:///{path}"
+    config = alembic_config()
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "head")
+    engine = create_db_engine(url)
+    seed_data(sessionmaker(bind=engine))
+    engine.dispose()
+    return path
+
+@pytest.fixture
+def db_engine(seeded_database, tmp_path):
+    """Engine on a private copy of the seeded database."""
+    path = tmp_path / "test.db"
+    shutil.copyfile(seeded_database, path)
+    engine = create_db_engine(f"sqlite:///{path}", profile="test")
+    # Every copy starts at the same table versions: drop what the
+    # process-wide caches loaded from another copy
+    catalog_cache.invalidate()
+    route_graph.invalidate()
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def async_db_engine(db_engine):
+    """Async engine on db_engine's database."""
+    return create_async_db_engine(str(db_engine.url), profile="test")
+
+@pytest.fixture
+def client(db_engine, async_db_engine):
+    """
+    Client of the app with its sessions on db_engine's database (the worker
+    startup, which checks the configured database, is not run).
+    """
+    session_factory = sessionmaker(bind=db_engine, autoflush=False)
+    async_session_factory = async_sessionmaker(bind=async_db_engine, autoflush=False, expire_on_commit=False)
+
+    def get_test_db():
+        with session_factory() as db:
+            yield db
+
+    async def get_test_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_async_db] = get_test_async_db
+    # Shared cache entries are keyed by table versions, which every copy starts at
+    prefix = shared_cache.prefix
+    shared_cache.prefix = f"{prefix}:test-{uuid.uuid4().hex}"
+    yield TestClient(app)
+    shared_cache.prefix = prefix
+    app.dependency_overrides.clear()
@@ -0,0 +1,78 @@
+"""POST /itineraries/bulk: per-item errors, malformed bodies and the single transaction."""
+import json
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app import main, models
+
+def itinerary(name: str = "Bulk", hotel_id: int = 1, activity_id: int = 1) -> dict:
+    return {
+        "name": name,
+        "duration_nights": 2,
+        "region": "Phuket",
+        "accommodations": [{"hotel_id": hotel_id, "day_number": 1}],
+        "transfers": [
+            {
+                "day_number": 1,
+                "from_location": "Phuket Airport",
+                "to_location": "Patong",
+                "transfer_type": "car",
+                "duration_hours": 1,
+            }
+        ],
+        "itinerary_activities": [{"activity_id": activity_id, "day_number": 2}],
+    }
+
+def itinerary_count(engine) -> int:
+    with Session(engine) as db:
+        return db.scalar(select(func.count()).select_from(models.Itinerary))
+
+def test_invalid_items_are_reported_by_position_and_skipped(client, db_engine):
+    before = itinerary_count(db_engine)
+    missing_name = {key: value for key, value in itinerary().items() if key != "name"}
+    response = client.post(
+        "/itineraries/bulk", json=[itinerary("First"), missing_name, itinerary(hotel_id=99999), itinerary("Last")]
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 2 and len(result["ids"]) == 2
+    assert [error["index"] for error in result["errors"]] == [1, 2]
+    assert result["errors"][0]["errors"][0]["loc"] == ["name"]
+    assert result["errors"][1]["errors"][0]["type"] == "unknown_reference"
+    assert itinerary_count(db_engine) == before + 2
+
+def test_ndjson_items_are_created(client):
+    body = "\n".join(json.dumps(item) for item in (itinerary("One"), itinerary("Two"))) + "\n"
+    response = client.post("/itineraries/bulk", content=body, headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 200
+    ids = response.json()["ids"]
+    assert [client.get(f"/itineraries/{id}").json()["name"] for id in ids] == ["One", "Two"]
+
+def test_malformed_json_is_rejected_without_writing(client, db_engine):
+    before = itinerary_count(db_engine)
+    response = client.post("/itineraries/bulk", content=b"[{", headers={"content-type": "application/json"})
+    assert response.status_code == 400
+
+    # NDJSON: the items before the malformed line are rolled back too
+    body = json.dumps(itinerary()) + "\n{not json\n"
+    response = client.post("/itineraries/bulk", content=body, headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 400
+    assert "item 1" in response.json()["detail"]
+    assert itinerary_count(db_engine) == before
+
+def test_body_that_is_not_a_list_is_rejected(client):
+    response = client.post("/itineraries/bulk", json=itinerary())
+    assert response.status_code == 422
+
+def test_batches_are_committed_once(client, async_db_engine, db_engine, monkeypatch):
+    monkeypatch.setattr(main, "BULK_BATCH_SIZE", 2)
+    commits = []
+    event.listen(async_db_engine.sync_engine, "commit", lambda conn: commits.append(1))
+    before = itinerary_count(db_engine)
+
+    response = client.post("/itineraries/bulk", json=[itinerary(f"Item {number}") for number in range(5)])
+    assert response.status_code == 200
+    assert response.json()["created"] == 5
+    assert len(commits) == 1
+    assert itinerary_count(db_engine) == before + 5
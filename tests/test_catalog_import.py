@@ -0,0 +1,53 @@
+"""Catalog import: location references by name, counting of upserted rows and per-row errors."""
+import json
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.catalog_import import import_catalog
+
+HEADER = "name,location,location_region,rating,price_per_night\n"
+
+def test_duplicate_keys_count_once(db_engine):
+    lines = [HEADER, "Twice,Karon,,4,100\n", "Twice,Karon,,4.5,120\n", "Once,Karon,,3,50\n"]
+    with Session(db_engine) as db:
+        hotels = db.scalar(select(func.count(models.Hotel.id)))
+        result = import_catalog(db, "hotels", lines)
+        assert (result.processed, result.upserted, result.errors) == (3, 2, [])
+        assert db.scalar(select(func.count(models.Hotel.id))) == hotels + 2
+        # The last row of a repeated key wins
+        assert db.scalar(select(models.Hotel.price_per_night).filter_by(name="Twice")) == 120
+
+def test_location_names_in_several_regions_need_a_region(db_engine):
+    with Session(db_engine) as db:
+        import_catalog(db, "locations", ["name,region\n", "Patong,Krabi\n"])
+        patongs = dict(db.execute(select(models.Location.region, models.Location.id).filter_by(name="Patong")).all())
+        assert len(patongs) == 2
+
+        result = import_catalog(
+            db, "hotels", [HEADER, "Ambiguous,Patong,,4,100\n", "Resolved,Patong,Krabi,4,100\n", "Lost,Nowhere,,4,100\n"]
+        )
+        assert result.upserted == 1
+        assert [(error.index, error.errors[0]["type"], error.errors[0]["loc"]) for error in result.errors] == [
+            (0, "ambiguous_location", ["location_region"]),
+            (2, "unknown_location", ["location"]),
+        ]
+        assert db.scalar(select(models.Hotel.location_id).filter_by(name="Resolved")) == patongs["Krabi"]
+
+@pytest.mark.parametrize(
+    "kind, valid",
+    [
+        ("hotels", {"name": "Line", "location": "Karon", "rating": 4, "price_per_night": 90}),
+        ("locations", {"name": "Line", "region": "Phuket"}),
+    ],
+)
+def test_ndjson_lines_that_are_not_objects_are_row_errors(db_engine, kind, valid):
+    lines = ["42\n", "[1, 2]\n", '"Karon"\n', "null\n", json.dumps(valid) + "\n"]
+    with Session(db_engine) as db:
+        result = import_catalog(db, kind, lines, fmt="ndjson")
+    assert (result.processed, result.upserted) == (5, 1)
+    assert [(error.index, error.errors[0]["type"]) for error in result.errors] == [
+        (index, "model_type") for index in range(4)
+    ]
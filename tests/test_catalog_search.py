@@ -0,0 +1,74 @@
+"""Full-text catalog search: FTS5 query building and the catalog_search triggers (migration 0006)."""
+import pytest
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from app.search import fts_query
+
+@pytest.mark.parametrize(
+    "q, query",
+    [
+        ("beach", '"beach"*'),
+        ("phuket beach", '"phuket" "beach"*'),
+        ('spa" OR NEAR(x', '"spa" "OR" "NEAR" "x"*'),
+        ("old-town*", '"old" "town"*'),
+    ],
+)
+def test_words_are_quoted_and_the_last_is_a_prefix(q, query):
+    assert fts_query(q) == query
+
+@pytest.mark.parametrize("q", ["", "   ", '"*-()"', "^:"])
+def test_text_without_words_makes_no_query(q):
+    assert fts_query(q) is None
+
+def names(client, q: str, **params) -> list:
+    response = client.get("/search", params={"q": q, **params})
+    assert response.status_code == 200
+    return [(hit["kind"], hit["name"]) for hit in response.json()]
+
+def test_partial_words_match_by_prefix(client):
+    assert ("location", "Patong") in names(client, "Pato")
+    assert names(client, "Patongx") == []
+
+def test_fts_syntax_in_queries_is_searched_as_text(client):
+    for q in ['Patong"', "Patong AND", "NEAR(Patong", "Patong*", '"-"']:
+        assert client.get("/search", params={"q": q}).status_code == 200
+
+def test_hits_can_be_restricted_by_kind(client):
+    hits = names(client, "Phuket", kind=["hotel", "activity"])
+    assert hits and {kind for kind, _ in hits} <= {"hotel", "activity"}
+    assert client.get("/search", params={"q": "Phuket", "kind": "island"}).status_code == 422
+
+def test_names_rank_above_descriptions(client, db_engine):
+    with Session(db_engine) as db:
+        crud.create_location(db, schemas.LocationCreate(name="Quokkaland", region="Phuket"))
+        crud.create_location(db, schemas.LocationCreate(name="Elsewhere", region="Phuket", description="Near Quokkaland"))
+    assert [name for _, name in names(client, "quokkaland")] == ["Quokkaland", "Elsewhere"]
+
+CREATE = {
+    "location": lambda db, name: crud.create_location(db, schemas.LocationCreate(name=name, region="Phuket")),
+    "hotel": lambda db, name: crud.create_hotel(
+        db, schemas.HotelCreate(name=name, location_id=1, rating=4, price_per_night=100)
+    ),
+    "activity": lambda db, name: crud.create_activity(
+        db, schemas.ActivityCreate(name=name, location_id=1, type="adventure", duration_hours=2, price=10)
+    ),
+}
+
+@pytest.mark.parametrize("kind", sorted(CREATE))
+def test_index_follows_inserts_updates_and_deletes(client, db_engine, kind):
+    with Session(db_engine) as db:
+        row = CREATE[kind](db, "Wombatopia Grand")
+        assert (kind, "Wombatopia Grand") in names(client, "wombatopia")
+
+        row.name = "Platypus Grand"
+        row.description = "Formerly Wombatopia"
+        db.commit()
+        assert names(client, "platypus") == [(kind, "Platypus Grand")]
+        # The old name is only in the description now, not indexed twice
+        assert names(client, "wombatopia") == [(kind, "Platypus Grand")]
+
+        db.delete(row)
+        db.commit()
+        assert names(client, "platypus") == []
+        assert names(client, "wombatopia") == []
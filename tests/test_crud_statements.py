@@ -0,0 +1,109 @@
+"""
+The itinerary reads load every collection and catalog row in a fixed number
+of statements, however many itineraries and children they return.
+"""
+from typing import Callable, List
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import crud, models, serializers
+
+def statements_of(engine, read: Callable[[Session], object], with_catalog: bool = True) -> List[str]:
+    """
+    SQL statements emitted by read(db) and serializing its result, with the
+    catalog rows it loaded or else (with_catalog=False) the cached catalog.
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with Session(engine) as db:
+        # The cached catalog is loaded once per process, not per read
+        catalog = None if with_catalog else crud.get_catalog(db)
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            result = read(db)
+            serializers.itineraries(result if isinstance(result, list) else [result], catalog)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+    return statements
+
+def add_itineraries(engine, count: int, nights: int = 2, children: int = 5) -> List[int]:
+    """Add count recommended itineraries of nights with children of every kind."""
+    with Session(engine) as db:
+        itineraries = []
+        for number in range(count):
+            itinerary = models.Itinerary(
+                name=f"Extra {number}", duration_nights=nights, region="Phuket", is_recommended=True
+            )
+            for day in range(1, children + 1):
+                # Seeded hotel and activity ids
+                catalog_id = (day - 1) % 10 + 1
+                itinerary.accommodations.append(models.Accommodation(hotel_id=catalog_id, day_number=day))
+                itinerary.transfers.append(
+                    models.Transfer(
+                        day_number=day,
+                        from_location="Phuket Airport",
+                        to_location="Patong",
+                        transfer_type=models.TransferType.CAR,
+                        duration_hours=1,
+                    )
+                )
+                itinerary.itinerary_activities.append(models.ItineraryActivity(activity_id=catalog_id, day_number=day))
+            itineraries.append(itinerary)
+        db.add_all(itineraries)
+        db.flush()
+        crud.refresh_itinerary_summaries(db, [itinerary.id for itinerary in itineraries])
+        crud.bump_table_versions(db, "itineraries")
+        db.commit()
+        return [itinerary.id for itinerary in itineraries]
+
+@pytest.mark.parametrize("strategy", sorted(crud.ITINERARY_LOAD_STRATEGIES))
+def test_get_itinerary_statements_do_not_grow_with_children(db_engine, strategy):
+    small, large = add_itineraries(db_engine, 1, children=1) + add_itineraries(db_engine, 1, children=20)
+    small_statements = statements_of(db_engine, lambda db: crud.get_itinerary(db, small, strategy))
+    large_statements = statements_of(db_engine, lambda db: crud.get_itinerary(db, large, strategy))
+    assert len(large_statements) == len(small_statements)
+
+@pytest.mark.parametrize("strategy", sorted(crud.ITINERARY_LOAD_STRATEGIES))
+@pytest.mark.parametrize("with_catalog", [True, False])
+def test_get_recommended_itineraries_statements_do_not_grow_with_itineraries(db_engine, strategy, with_catalog):
+    def read(db):
+        return crud.get_recommended_itineraries(db, 2, strategy=strategy, with_catalog=with_catalog)
+
+    with Session(db_engine) as db:
+        before = len(read(db))
+    before_statements = statements_of(db_engine, read, with_catalog)
+    add_itineraries(db_engine, 10)
+    with Session(db_engine) as db:
+        assert len(read(db)) == before + 10
+    assert len(statements_of(db_engine, read, with_catalog)) == len(before_statements)
+
+def test_export_statements_are_constant_per_batch(db_engine):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    def export_statements(batch_size: int):
+        statements.clear()
+        with Session(db_engine) as db:
+            catalog = crud.get_catalog(db)
+            event.listen(db_engine, "before_cursor_execute", capture)
+            try:
+                batches = [len(batch) for batch in crud.iter_itinerary_export(db, catalog, batch_size)]
+            finally:
+                event.remove(db_engine, "before_cursor_execute", capture)
+        return batches, len(statements)
+
+    add_itineraries(db_engine, 6, children=1)
+    add_itineraries(db_engine, 6, children=20)
+    batches, count = export_statements(batch_size=4)
+    assert len(batches) >= 3
+    # The streamed itineraries, then one query per child table and batch
+    assert count == 1 + 3 * len(batches)
+    batches, count = export_statements(batch_size=1000)
+    assert (len(batches), count) == (1, 4)
@@ -0,0 +1,27 @@
+"""If-None-Match handling of app.etags.not_modified."""
+from typing import Optional
+
+import pytest
+from starlette.requests import Request
+
+from app.etags import not_modified
+
+ETAG = '"abc"'
+
+def request_with(if_none_match: Optional[str]) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": headers})
+
+@pytest.mark.parametrize("header", ['"abc"', 'W/"abc"', '"other", W/"abc"', " * "])
+def test_matching_tags_are_not_modified(header):
+    response = not_modified(request_with(header), ETAG)
+    assert response is not None and response.status_code == 304
+    assert response.headers["etag"] == ETAG
+
+@pytest.mark.parametrize("header", [None, '"other"', 'W/"other"', '"W/abc"'])
+def test_other_tags_are_modified(header):
+    assert not_modified(request_with(header), ETAG) is None
+
+def test_star_only_matches_existing_resources():
+    assert not_modified(request_with("*"), ETAG, exists=False) is None
+    assert not_modified(request_with('W/"abc"'), ETAG, exists=False).status_code == 304
@@ -0,0 +1,25 @@
+"""GET /itineraries/export: one NDJSON document per itinerary, as the detail reads serialize it."""
+import json
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import crud, main, models, serializers
+
+def test_export_streams_every_itinerary_in_full(client, db_engine, monkeypatch):
+    # Several batches, the last one partial
+    monkeypatch.setattr(main, "EXPORT_BATCH_SIZE", 3)
+    response = client.get("/itineraries/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text.endswith("\n")
+    documents = [json.loads(line) for line in response.text.splitlines()]
+
+    with Session(db_engine) as db:
+        ids = db.scalars(select(models.Itinerary.id).order_by(models.Itinerary.id)).all()
+        assert len(ids) > 3 and len(ids) % 3
+        assert [document["id"] for document in documents] == ids
+        for document in documents:
+            expected = serializers.itinerary(crud.get_itinerary(db, document["id"]))
+            assert document == json.loads(serializers.dumps(expected))
+    assert any(document["accommodations"] and document["itinerary_activities"] for document in documents)
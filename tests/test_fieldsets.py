@@ -0,0 +1,88 @@
+"""Sparse fieldsets: parsing fields/include paths, projections and unknown-field errors."""
+import pytest
+
+from app.fieldsets import InvalidSelectionError, RESOURCES, parse_selection, project
+
+def shape(selection) -> dict:
+    """The selection as nested {"fields": ..., relationship: shape} dicts."""
+    return {"fields": selection.fields, **{name: shape(child) for name, child in selection.include.items()}}
+
+def test_no_parameters_select_nothing():
+    assert parse_selection(None, None) is None
+
+def test_fields_keep_the_listed_attributes_and_the_id():
+    selection = parse_selection("name,accommodations.day_number,accommodations.hotel.name", None)
+    assert shape(selection) == {
+        "fields": ("id", "name"),
+        "accommodations": {"fields": ("id", "day_number"), "hotel": {"fields": ("id", "name")}},
+    }
+
+def test_include_embeds_every_attribute_of_the_path():
+    selection = parse_selection(None, "accommodations.hotel.location, transfers")
+    assert shape(selection) == {
+        "fields": RESOURCES["itinerary"][0],
+        "accommodations": {
+            "fields": RESOURCES["accommodation"][0],
+            "hotel": {"fields": RESOURCES["hotel"][0], "location": {"fields": RESOURCES["location"][0]}},
+        },
+        "transfers": {"fields": RESOURCES["transfer"][0]},
+    }
+
+def test_fields_narrow_included_relationships():
+    selection = parse_selection("name,transfers.duration_hours", "transfers,itinerary_activities")
+    assert shape(selection) == {
+        "fields": ("id", "name"),
+        "transfers": {"fields": ("id", "duration_hours")},
+        "itinerary_activities": {"fields": RESOURCES["itinerary_activity"][0]},
+    }
+
+def test_equal_selections_share_a_key():
+    first = parse_selection("name, region,accommodations.hotel.name", "transfers")
+    second = parse_selection("accommodations.hotel.name,region,name", " transfers ")
+    assert first.key() == second.key()
+    assert first.key() != parse_selection("name,region", "transfers").key()
+
+def test_unknown_names_are_all_reported():
+    with pytest.raises(InvalidSelectionError) as raised:
+        parse_selection("nope,accommodations.hotel.bogus,summary", "hotels,name")
+    assert [(error["type"], error["loc"], error["input"]) for error in raised.value.errors(loc=("query",))] == [
+        ("unknown_field", ("query", "include"), "hotels"),
+        ("unknown_field", ("query", "include"), "name"),
+        ("unknown_field", ("query", "fields"), "nope"),
+        ("unknown_field", ("query", "fields"), "accommodations.hotel.bogus"),
+        ("unknown_field", ("query", "fields"), "summary"),
+    ]
+    messages = [error["msg"] for error in raised.value.errors()]
+    assert messages[1] == "Unknown relationship 'name' of itinerary"
+    assert messages[3] == "Unknown field 'bogus' of hotel in 'accommodations.hotel.bogus'"
+    # The list rows have a summary
+    assert parse_selection("summary", None, "itinerary_list_item").fields == ("id", "summary")
+
+def test_selected_reads_match_the_projected_full_response(client):
+    full = client.get("/itineraries/1").json()
+    for fields, include in [
+        ("name,accommodations.hotel.name", None),
+        (None, "accommodations.hotel.location,itinerary_activities"),
+        ("duration_nights,transfers.from_location", "itinerary_activities.activity"),
+    ]:
+        params = {name: value for name, value in (("fields", fields), ("include", include)) if value is not None}
+        response = client.get("/itineraries/1", params=params)
+        assert response.status_code == 200
+        assert response.json() == project(full, parse_selection(fields, include))
+
+def test_list_rows_hold_exactly_the_selection(client):
+    rows = client.get("/itineraries/", params={"fields": "name,summary,accommodations.day_number", "limit": 5}).json()
+    assert rows
+    for row in rows:
+        assert set(row) == {"id", "name", "summary", "accommodations"}
+        assert all(set(accommodation) == {"id", "day_number"} for accommodation in row["accommodations"])
+
+def test_unknown_names_are_a_422(client):
+    response = client.get("/itineraries/1", params={"fields": "name,accommodations.price"})
+    assert response.status_code == 422
+    assert [(error["loc"], error["input"]) for error in response.json()["detail"]] == [
+        (["query", "fields"], "accommodations.price")
+    ]
+    response = client.post("/mcp/recommended-itineraries/", json={"nights": 3, "include": "hotels"})
+    assert response.status_code == 422
+    assert [error["loc"] for error in response.json()["detail"]] == [["body", "include"]]
@@ -0,0 +1,86 @@
+"""Amenity filters on /hotels/: name normalization and the hotel_amenities index kept by hotel writes."""
+import json
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from app.catalog_import import import_catalog
+
+@pytest.mark.parametrize(
+    "amenities, names",
+    [
+        ("Pool, Free  WiFi", ["pool", "free wifi"]),
+        (" SPA ,spa,,Pool ", ["spa", "pool"]),
+        ("", []),
+        (None, []),
+        (" , ", []),
+    ],
+)
+def test_amenity_names_are_normalized(amenities, names):
+    assert crud.amenity_names(amenities) == names
+
+def hotel_ids(client, amenities: str, **params) -> list:
+    response = client.get("/hotels/", params={"amenities": amenities, "limit": 1000, **params})
+    assert response.status_code == 200
+    return [hotel["id"] for hotel in response.json()]
+
+def offering(db_engine, amenities: str, region=None) -> list:
+    """Brute force: the hotels whose amenities text lists every one of amenities."""
+    wanted = set(crud.amenity_names(amenities))
+    with Session(db_engine) as db:
+        return [
+            hotel.id
+            for hotel in db.scalars(select(models.Hotel).order_by(models.Hotel.id))
+            if wanted <= set(crud.amenity_names(hotel.amenities))
+            and (region is None or hotel.location.region == region)
+        ]
+
+@pytest.mark.parametrize("amenities", ["pool", "Pool, Spa", " SPA ,  beach   ACCESS", "wifi,kids club,pool"])
+def test_hotels_offering_every_amenity_are_listed(client, db_engine, amenities):
+    expected = offering(db_engine, amenities)
+    assert expected
+    assert hotel_ids(client, amenities) == expected
+
+def test_amenities_combine_with_the_region(client, db_engine):
+    with Session(db_engine) as db:
+        region = db.scalar(select(models.Location.region).order_by(models.Location.id))
+    assert hotel_ids(client, "pool", region=region) == offering(db_engine, "pool", region)
+    assert hotel_ids(client, "pool", region="Nowhere") == []
+
+def test_an_unknown_amenity_matches_no_hotel(client):
+    assert hotel_ids(client, "pool,helipad") == []
+
+def test_hotel_writes_keep_the_amenity_index(client, db_engine):
+    with Session(db_engine) as db:
+        location = db.scalars(select(models.Location).order_by(models.Location.id)).first()
+        hotel = crud.create_hotel(
+            db,
+            schemas.HotelCreate(
+                name="Amenity Test Lodge",
+                location_id=location.id,
+                rating=4.0,
+                price_per_night=80,
+                amenities="Rooftop  Bar, POOL",
+            ),
+        )
+        hotel_id, location_id = hotel.id, location.id
+    # Insert: a new amenity name is indexed, and the existing one matches too
+    assert hotel_ids(client, "rooftop bar") == [hotel_id]
+    assert hotel_id in hotel_ids(client, "pool,Rooftop Bar")
+
+    # Update: a re-import replaces the hotel's amenities
+    record = {
+        "name": "Amenity Test Lodge",
+        "location_id": location_id,
+        "rating": 4.0,
+        "price_per_night": 80,
+        "amenities": "Sauna",
+    }
+    with Session(db_engine) as db:
+        result = import_catalog(db, "hotels", [json.dumps(record) + "\n"], fmt="ndjson")
+    assert (result.upserted, result.errors) == (1, [])
+    assert hotel_ids(client, "rooftop bar") == []
+    assert hotel_id not in hotel_ids(client, "pool")
+    assert hotel_ids(client, "sauna") == [hotel_id]
@@ -0,0 +1,65 @@
+"""Generated itineraries: the budget bounds that cut the planner's search short."""
+import math
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app import itinerary_generator
+from app.itinerary_generator import HotelOption, LocationOption, Planner
+
+REGION = "Phuket"
+
+@pytest.mark.parametrize(
+    "stays, nights, cost",
+    [
+        ([(100, 3), (50, 3)], 4, 3 * 50 + 100),
+        ([(100, 3), (50, 3)], 6, 3 * 50 + 3 * 100),
+        ([(100, 3), (50, 3)], 7, math.inf),
+        ([(100, 0), (50, 2)], 2, 100),
+        ([], 0, 0),
+    ],
+)
+def test_cheapest_stays_fill_the_cheapest_nights_first(stays, nights, cost):
+    assert itinerary_generator._cheapest_stays(stays, nights) == cost
+
+def locations(*prices) -> list:
+    return [
+        LocationOption(index, f"Spot {index}", None, None, hotels=[HotelOption(index, 4.0, price, 4.0)])
+        for index, price in enumerate(prices, start=1)
+    ]
+
+def test_a_budget_below_the_cheapest_nights_searches_nothing(monkeypatch):
+    def days(*args):
+        raise AssertionError("planned a day")
+
+    planner = Planner(locations(100, 120), 6, max_budget=3 * 100 + 3 * 120 - 1)
+    monkeypatch.setattr(planner, "days", days)
+    assert planner.plans(3) == []
+
+def test_plans_over_budget_are_pruned():
+    planner = Planner(locations(100, 120, 300), 6, max_budget=3 * 100 + 3 * 120)
+    plans = planner.plans(3)
+    # Only the two cheapest locations, three nights each, fit
+    assert plans and all(plan.price <= planner.max_budget for plan in plans)
+    assert all(sorted(hotel.price for _, hotel in plan.stays) == [100] * 3 + [120] * 3 for plan in plans)
+
+def test_an_impossible_budget_is_turned_down_before_loading_the_region(db_engine, monkeypatch):
+    def load_region(*args):
+        raise AssertionError("loaded the region")
+
+    with Session(db_engine) as db:
+        cheapest = itinerary_generator.cheapest_stay(db, REGION, 3)
+        assert 0 < cheapest < math.inf
+        assert itinerary_generator.cheapest_stay(db, REGION, 3, min_rating=6) == math.inf
+        monkeypatch.setattr(itinerary_generator, "load_region", load_region)
+        assert itinerary_generator.generate(db, 3, REGION, max_budget=cheapest - 1) == []
+        assert itinerary_generator.generate(db, 3, max_budget=1) == []
+
+def test_generated_plans_meet_the_budget(db_engine):
+    with Session(db_engine) as db:
+        best = itinerary_generator.generate(db, 3, REGION)
+        assert best
+        cheapest = itinerary_generator.cheapest_stay(db, REGION, 3)
+        budget = (cheapest + min(plan["summary"]["total_price"] for plan in best)) / 2
+        plans = itinerary_generator.generate(db, 3, REGION, max_budget=budget)
+    assert plans and all(plan["summary"]["total_price"] <= budget for plan in plans)
@@ -0,0 +1,75 @@
+"""Itinerary cost summaries: the max_budget / min_rating filters and refreshes on catalog price changes."""
+import json
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.catalog_import import import_catalog
+
+def create(client, name: str, accommodations=(), activities=()) -> int:
+    response = client.post(
+        "/itineraries/",
+        json={
+            "name": name,
+            "duration_nights": 2,
+            "region": "Phuket",
+            "accommodations": [{"hotel_id": hotel_id, "day_number": 1} for hotel_id in accommodations],
+            "transfers": [],
+            "itinerary_activities": [{"activity_id": activity_id, "day_number": 1} for activity_id in activities],
+        },
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+def summaries(client, **filters) -> dict:
+    rows = client.get("/itineraries/", params={"limit": 1000, **filters}).json()
+    return {row["id"]: row["summary"] for row in rows}
+
+def prices(db_engine, model, price_column, *ids) -> list:
+    with Session(db_engine) as db:
+        return [db.scalar(select(price_column).where(model.id == id)) for id in ids]
+
+def test_empty_itineraries_fit_no_budget(client, db_engine):
+    empty = create(client, "Empty")
+    activities_only = create(client, "Activities only", activities=[1])
+    [activity_price] = prices(db_engine, models.Activity, models.Activity.price, 1)
+
+    listed = summaries(client)
+    assert listed[empty] == {
+        "total_price": 0, "activity_count": 0, "transfer_hours": 0, "activity_types": [], "min_hotel_rating": None,
+    }
+    within_budget = summaries(client, max_budget=activity_price)
+    assert empty not in within_budget
+    assert activities_only in within_budget
+    assert empty not in summaries(client, min_rating=0)
+
+def test_filters_use_total_price_and_lowest_rating(client, db_engine):
+    itinerary = create(client, "Two hotels", accommodations=[1, 3], activities=[1])
+    hotel_prices = prices(db_engine, models.Hotel, models.Hotel.price_per_night, 1, 3)
+    ratings = prices(db_engine, models.Hotel, models.Hotel.rating, 1, 3)
+    total = sum(hotel_prices) + prices(db_engine, models.Activity, models.Activity.price, 1)[0]
+
+    assert summaries(client)[itinerary]["total_price"] == total
+    assert itinerary in summaries(client, max_budget=total)
+    assert itinerary not in summaries(client, max_budget=total - 1)
+    assert itinerary in summaries(client, min_rating=min(ratings))
+    assert itinerary not in summaries(client, min_rating=min(ratings) + 0.1)
+
+def test_catalog_price_changes_refresh_summaries(client, db_engine):
+    itinerary = create(client, "Repriced", accommodations=[1], activities=[1])
+    before = summaries(client)[itinerary]["total_price"]
+    with Session(db_engine) as db:
+        hotel, activity = db.get(models.Hotel, 1), db.get(models.Activity, 1)
+        repriced_hotel = {
+            "name": hotel.name, "location_id": hotel.location_id, "rating": hotel.rating,
+            "price_per_night": hotel.price_per_night + 100,
+        }
+        repriced_activity = {
+            "name": activity.name, "location_id": activity.location_id, "type": activity.type.value,
+            "duration_hours": activity.duration_hours, "price": activity.price + 10,
+        }
+        assert import_catalog(db, "hotels", [json.dumps(repriced_hotel)], fmt="ndjson").upserted == 1
+        assert import_catalog(db, "activities", [json.dumps(repriced_activity)], fmt="ndjson").upserted == 1
+    assert summaries(client)[itinerary]["total_price"] == before + 110
+    assert itinerary not in summaries(client, max_budget=before + 109)
@@ -0,0 +1,76 @@
+"""Itinerary payload validation: day numbers within the trip and references to known catalog rows."""
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+
+UNKNOWN_ID = 999999
+
+def payload(**changes) -> dict:
+    content = {
+        "name": "Validation test",
+        "duration_nights": 2,
+        "region": "Phuket",
+        "accommodations": [{"hotel_id": 1, "day_number": 1}, {"hotel_id": 1, "day_number": 2}],
+        "transfers": [
+            {
+                "day_number": 3,
+                "from_location": "Patong",
+                "to_location": "Phuket Airport",
+                "transfer_type": "car",
+                "duration_hours": 1,
+            },
+        ],
+        "itinerary_activities": [{"activity_id": 1, "day_number": 3}],
+    }
+    return {**content, **changes}
+
+INVALID = payload(
+    accommodations=[{"hotel_id": 1, "day_number": 3}, {"hotel_id": UNKNOWN_ID, "day_number": 2}],
+    itinerary_activities=[{"activity_id": UNKNOWN_ID, "day_number": 4}],
+)
+
+# Day numbers first, then references, each in payload order
+INVALID_ERRORS = [
+    ("day_out_of_range", ("accommodations", 0, "day_number")),
+    ("day_out_of_range", ("itinerary_activities", 0, "day_number")),
+    ("unknown_reference", ("accommodations", 1, "hotel_id")),
+    ("unknown_reference", ("itinerary_activities", 0, "activity_id")),
+]
+
+def test_nights_transfers_and_activities_may_use_their_days(db_engine):
+    with Session(db_engine) as db:
+        # Transfers and activities may fall on the departure day
+        assert crud.itinerary_errors(schemas.ItineraryCreate(**payload()), crud.get_catalog(db)) == []
+
+def test_every_error_is_listed(db_engine):
+    with Session(db_engine) as db:
+        errors = crud.itinerary_errors(schemas.ItineraryCreate(**INVALID), crud.get_catalog(db))
+    assert [(error["type"], error["loc"]) for error in errors] == INVALID_ERRORS
+    assert [error["input"] for error in errors] == [3, 4, UNKNOWN_ID, UNKNOWN_ID]
+    assert errors[0]["msg"] == "day_number must be at most 2 for a 2-night itinerary"
+    assert errors[1]["msg"] == "day_number must be at most 3 for a 2-night itinerary"
+
+def count_itineraries(db_engine) -> int:
+    with Session(db_engine) as db:
+        return db.scalar(select(func.count(models.Itinerary.id)))
+
+def test_invalid_itineraries_are_a_422_under_body(client, db_engine):
+    before = count_itineraries(db_engine)
+    response = client.post("/itineraries/", json=INVALID)
+    assert response.status_code == 422
+    assert [(error["type"], tuple(error["loc"])) for error in response.json()["detail"]] == [
+        (error_type, ("body", *loc)) for error_type, loc in INVALID_ERRORS
+    ]
+    assert count_itineraries(db_engine) == before
+
+def test_invalid_bulk_items_are_reported_by_position(client, db_engine):
+    before = count_itineraries(db_engine)
+    response = client.post("/itineraries/bulk", json=[payload(), INVALID])
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 1
+    [item] = result["errors"]
+    assert item["index"] == 1
+    assert [(error["type"], tuple(error["loc"])) for error in item["errors"]] == INVALID_ERRORS
+    assert count_itineraries(db_engine) == before + 1
@@ -0,0 +1,109 @@
+"""Nearby search: haversine distances, bounding boxes, /nearby and the catalog_geo triggers (migration 0008)."""
+import math
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app import crud, geo, schemas
+
+# Open ocean, far from the seeded catalog
+LATITUDE, LONGITUDE = -45.0, -120.0
+
+def test_haversine_distances():
+    assert geo.haversine_km(0, 0, 0, 0) == 0
+    # One degree along a meridian
+    assert geo.haversine_km(10, 20, 11, 20) == pytest.approx(math.radians(1) * geo.EARTH_RADIUS_KM)
+    assert geo.haversine_km(10, 20, 11, 20) == pytest.approx(111.19, abs=0.01)
+    # Half the circumference between antipodes, and across the antimeridian
+    assert geo.haversine_km(0, 0, 0, 180) == pytest.approx(math.pi * geo.EARTH_RADIUS_KM)
+    assert geo.haversine_km(0, 179.5, 0, -179.5) == pytest.approx(geo.haversine_km(0, 0, 0, 1))
+
+def test_bounding_box_encloses_the_circle():
+    south, north, west, east = geo.bounding_box(LATITUDE, LONGITUDE, 100)
+    assert south < LATITUDE < north and west < LONGITUDE < east
+    for bearing in range(0, 360, 15):
+        # Points just inside the circle, in every direction
+        angle = math.radians(bearing)
+        latitude = LATITUDE + math.degrees(99.9 / geo.EARTH_RADIUS_KM) * math.cos(angle)
+        longitude = LONGITUDE + math.degrees(99.9 / geo.EARTH_RADIUS_KM) * math.sin(angle) / math.cos(
+            math.radians(latitude)
+        )
+        if geo.haversine_km(LATITUDE, LONGITUDE, latitude, longitude) <= 100:
+            assert south <= latitude <= north and west <= longitude <= east
+
+def test_bounding_boxes_near_a_pole_or_the_antimeridian_span_every_longitude():
+    assert geo.bounding_box(89.9, 10, 50)[1:] == (90.0, -180.0, 180.0)
+    assert geo.bounding_box(0, 179.9, 50)[2:] == (-180.0, 180.0)
+
+def test_search_radii_grow_to_the_requested_radius():
+    assert list(geo.search_radii(0.5)) == [0.5]
+    assert list(geo.search_radii(20)) == [1.0, 4.0, 16.0, 20]
+
+def north_of(km: float) -> dict:
+    """Coordinates km due north of (LATITUDE, LONGITUDE)."""
+    return {"latitude": LATITUDE + math.degrees(km / geo.EARTH_RADIUS_KM), "longitude": LONGITUDE}
+
+def nearby(client, **params) -> list:
+    response = client.get("/nearby", params={"lat": LATITUDE, "lon": LONGITUDE, **params})
+    assert response.status_code == 200
+    return [(hit["kind"], hit["name"], round(hit["distance_km"], 3)) for hit in response.json()]
+
+@pytest.fixture
+def remote_catalog(db_engine):
+    """A location, hotel and activity at 0.5, 3 and 30 km from (LATITUDE, LONGITUDE)."""
+    with Session(db_engine) as db:
+        location = crud.create_location(db, schemas.LocationCreate(name="Far Reef", region="Remote", **north_of(0.5)))
+        crud.create_hotel(
+            db,
+            schemas.HotelCreate(name="Far Lodge", location_id=location.id, rating=4, price_per_night=100, **north_of(3)),
+        )
+        crud.create_activity(
+            db,
+            schemas.ActivityCreate(
+                name="Far Dive", location_id=location.id, type="adventure", duration_hours=2, price=10, **north_of(30)
+            ),
+        )
+
+def test_hits_are_the_nearest_inside_the_radius(client, remote_catalog):
+    assert nearby(client, radius=50) == [
+        ("location", "Far Reef", 0.5),
+        ("hotel", "Far Lodge", 3.0),
+        ("activity", "Far Dive", 30.0),
+    ]
+    assert nearby(client, radius=10) == [("location", "Far Reef", 0.5), ("hotel", "Far Lodge", 3.0)]
+    assert nearby(client, radius=0.4) == []
+
+def test_a_page_smaller_than_the_hits_holds_the_nearest(client, remote_catalog):
+    # The first pass (1 km) fills the page; wider radii would find more
+    assert nearby(client, radius=50, limit=1) == [("location", "Far Reef", 0.5)]
+    assert nearby(client, radius=50, limit=2) == [("location", "Far Reef", 0.5), ("hotel", "Far Lodge", 3.0)]
+
+def test_hits_can_be_restricted_by_kind(client, remote_catalog):
+    assert nearby(client, radius=50, kind=["hotel", "activity"]) == [
+        ("hotel", "Far Lodge", 3.0),
+        ("activity", "Far Dive", 30.0),
+    ]
+    response = client.get("/nearby", params={"lat": LATITUDE, "lon": LONGITUDE, "kind": "island"})
+    assert response.status_code == 422
+
+def test_index_follows_inserts_updates_and_deletes(client, db_engine):
+    with Session(db_engine) as db:
+        row = crud.create_location(db, schemas.LocationCreate(name="Drifter", region="Remote", **north_of(2)))
+        assert nearby(client, radius=10) == [("location", "Drifter", 2.0)]
+
+        row.latitude = north_of(5)["latitude"]
+        db.commit()
+        assert nearby(client, radius=10) == [("location", "Drifter", 5.0)]
+
+        # Without coordinates a row has no place in the index
+        row.latitude = None
+        db.commit()
+        assert nearby(client, radius=10) == []
+
+        row.latitude = north_of(1)["latitude"]
+        db.commit()
+        assert nearby(client, radius=10) == [("location", "Drifter", 1.0)]
+
+        db.delete(row)
+        db.commit()
+        assert nearby(client, radius=10) == []
@@ -0,0 +1,63 @@
+"""Keyset pagination: cursor encoding and following X-Next-Cursor through the list endpoints."""
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, set_next_cursor
+
+def raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+@pytest.mark.parametrize("last_id", [0, 1, 7, 10**12])
+def test_cursors_round_trip(last_id):
+    cursor = encode_cursor(last_id)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == last_id
+
+def test_no_cursor_starts_from_the_beginning():
+    assert decode_cursor(None) is None
+
+@pytest.mark.parametrize(
+    "cursor",
+    ["", "not a cursor!", raw_cursor([1]), raw_cursor({"other": 1}), raw_cursor({"id": "1"}), raw_cursor({"id": True})],
+)
+def test_tampered_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor(cursor)
+    assert raised.value.status_code == 400
+
+class Row:
+    def __init__(self, id: int):
+        self.id = id
+
+def test_next_cursor_is_set_only_for_full_pages():
+    response = Response()
+    set_next_cursor(response, [Row(1), Row(2)], limit=3)
+    assert NEXT_CURSOR_HEADER not in response.headers
+    set_next_cursor(response, [Row(1), Row(2), Row(3)], limit=3)
+    assert decode_cursor(response.headers[NEXT_CURSOR_HEADER]) == 3
+
+@pytest.mark.parametrize(
+    "url", ["/locations/", "/hotels/", "/hotels/?region=Phuket", "/hotels/?amenities=pool", "/activities/", "/itineraries/"]
+)
+def test_following_next_cursors_reads_every_row_once(client, url):
+    everything = [row["id"] for row in client.get(url, params={"limit": 1000}).json()]
+    assert everything == sorted(everything) and len(everything) > 3
+
+    ids, params = [], {"limit": 3}
+    while True:
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        ids += [row["id"] for row in response.json()]
+        if NEXT_CURSOR_HEADER not in response.headers:
+            break
+        params["cursor"] = response.headers[NEXT_CURSOR_HEADER]
+    assert ids == everything
+
+@pytest.mark.parametrize("url", ["/locations/", "/hotels/", "/hotels/?amenities=pool", "/activities/", "/itineraries/"])
+def test_tampered_cursor_is_a_bad_request(client, url):
+    response = client.get(url, params={"cursor": raw_cursor({"id": "1"})})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,74 @@
+"""
+Query-plan regression checks for the crud read paths.
+
+Runs each crud query against the seeded test database, captures every
+statement it emits (including selectin/joined child loads) and fails on a
+full table scan in its `EXPLAIN QUERY PLAN`.
+"""
+from typing import Callable, List, Tuple
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app import crud, geo, itinerary_generator, models, search
+
+# (label, callable exercising the query) for every indexed read path
+CHECKED_QUERIES: List[Tuple[str, Callable[[Session], object]]] = [
+    ("get_itinerary", lambda db: crud.get_itinerary(db, 1)),
+    ("get_recommended_itineraries", lambda db: crud.get_recommended_itineraries(db, 2)),
+    ("get_recommended_itineraries(region)", lambda db: crud.get_recommended_itineraries(db, 2, "Phuket")),
+    ("get_itineraries", lambda db: crud.get_itineraries(db, after_id=0)),
+    ("get_itineraries(max_budget)", lambda db: crud.get_itineraries(db, after_id=0, max_budget=20000)),
+    ("get_itineraries(min_rating)", lambda db: crud.get_itineraries(db, after_id=0, min_rating=4.5)),
+    ("get_recommended_itineraries(max_budget, min_rating)", lambda db: crud.get_recommended_itineraries(db, 2, max_budget=20000, min_rating=4)),
+    ("summaries for hotels", lambda db: crud.refresh_catalog_summaries(db, hotel_ids=[1])),
+    ("summaries for activities", lambda db: crud.refresh_catalog_summaries(db, activity_ids=[1])),
+    ("get_locations", lambda db: crud.get_locations(db, after_id=0)),
+    ("get_hotels", lambda db: crud.get_hotels(db, after_id=0)),
+    ("get_hotels(amenities, region)", lambda db: crud.get_hotels(db, after_id=0, amenities="pool,spa", region="Krabi")),
+    ("get_hotels(amenity)", lambda db: crud.get_hotels(db, after_id=0, amenities="pool")),
+    ("hotel ids(amenities, region)", lambda db: db.scalars(crud.hotels_stmt(after_id=0, amenity_ids=[1, 2], region="Krabi", ids_only=True)).all()),
+    ("hotel amenities sync", lambda db: crud.sync_hotel_amenities(db, [1])),
+    ("get_activities", lambda db: crud.get_activities(db, after_id=0)),
+    ("hotels by location", lambda db: db.scalars(select(models.Hotel).filter_by(location_id=1)).all()),
+    ("activities by location", lambda db: db.scalars(select(models.Activity).filter_by(location_id=1)).all()),
+    ("search", lambda db: db.execute(search.search_stmt(), {"query": search.fts_query("beach"), "limit": 20}).all()),
+    ("nearby", lambda db: db.execute(geo.nearby_stmt(), geo.nearby_params(7.9, 98.3, 10, 50)).all()),
+    ("generate itineraries(region)", lambda db: itinerary_generator.generate(db, 3, "Krabi")),
+    ("generate itineraries(region, filters)", lambda db: itinerary_generator.generate(db, 3, "Krabi", max_budget=2000, min_rating=4)),
+]
+
+def table_scans(engine, run: Callable[[Session], object]) -> List[Tuple[str, str]]:
+    """(statement, plan detail) of every full scan in the statements run(db) emits."""
+    scans = []
+    with engine.connect() as connection:
+        # The catalog cache is loaded in one full pass over the catalog tables
+        # by design; load it first so the check only sees the query's own statements
+        with Session(bind=connection) as db:
+            crud.get_catalog(db)
+
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(connection, "before_cursor_execute", capture)
+        try:
+            with Session(bind=connection) as db:
+                run(db)
+        finally:
+            event.remove(connection, "before_cursor_execute", capture)
+
+        for statement, parameters in statements:
+            for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters):
+                detail = row[-1]
+                # FTS5 MATCH and R*Tree range queries are reported as a scan
+                # of the virtual table's own index
+                if detail.startswith("SCAN ") and detail != "SCAN CONSTANT ROW" and "VIRTUAL TABLE" not in detail:
+                    scans.append((" ".join(statement.split()), detail))
+    return scans
+
+@pytest.mark.parametrize("run", [run for _, run in CHECKED_QUERIES], ids=[label for label, _ in CHECKED_QUERIES])
+def test_query_uses_indexes(db_engine, run):
+    assert table_scans(db_engine, run) == []
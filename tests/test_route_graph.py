@@ -0,0 +1,111 @@
+"""Route graph: refreshes keyed on the itineraries table version, and durations filled from known routes."""
+import pytest
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from app.route_graph import UnknownRouteError, route_graph
+
+CAR = models.TransferType.CAR
+
+def write(db_engine, stmt, bump: bool = True):
+    """Execute a Core statement outside any Session, as another process would."""
+    with db_engine.begin() as connection:
+        connection.execute(stmt)
+        if bump:
+            connection.execute(crud.bump_table_versions_stmt("itineraries"))
+
+def add_transfer(db_engine, origin: str, destination: str, hours: float, bump: bool = True):
+    with db_engine.begin() as connection:
+        itinerary_id = connection.scalar(
+            insert(models.Itinerary)
+            .values(name="Route test", duration_nights=1, region="Phuket")
+            .returning(models.Itinerary.id)
+        )
+    write(
+        db_engine,
+        insert(models.Transfer).values(
+            itinerary_id=itinerary_id,
+            day_number=1,
+            from_location=origin,
+            to_location=destination,
+            transfer_type=CAR,
+            duration_hours=hours,
+        ),
+        bump,
+    )
+
+def duration(db_engine, origin: str, destination: str):
+    with Session(db_engine) as db:
+        route_graph.refresh(db)
+    return route_graph.duration(origin, destination, CAR)
+
+def test_writes_outside_the_session_are_seen_by_version(db_engine):
+    assert duration(db_engine, "Alpha Pier", "Gamma Cove") is None
+    add_transfer(db_engine, "Alpha Pier", "Beta Bay", 1.0)
+    add_transfer(db_engine, "Beta Bay", "Gamma Cove", 2.0)
+    assert duration(db_engine, "Gamma Cove", "Alpha Pier") == 3.0
+
+    # Until the version moves the graph is not read again
+    add_transfer(db_engine, "Alpha Pier", "Gamma Cove", 0.5, bump=False)
+    assert duration(db_engine, "Alpha Pier", "Gamma Cove") == 3.0
+    write(db_engine, crud.bump_table_versions_stmt("itineraries"), bump=False)
+    assert duration(db_engine, "Alpha Pier", "Gamma Cove") == 0.5
+
+def test_updated_and_deleted_transfers_rebuild_the_graph(db_engine):
+    add_transfer(db_engine, "Alpha Pier", "Beta Bay", 1.0)
+    assert duration(db_engine, "Alpha Pier", "Beta Bay") == 1.0
+
+    # A slower link can't be relaxed into the graph: it must be rebuilt
+    link = models.Transfer.from_location == "Alpha Pier"
+    write(db_engine, update(models.Transfer).where(link).values(duration_hours=4.0))
+    assert duration(db_engine, "Alpha Pier", "Beta Bay") == 4.0
+
+    write(db_engine, delete(models.Transfer).where(link))
+    assert duration(db_engine, "Alpha Pier", "Beta Bay") is None
+
+def transfer(origin: str, destination: str, **fields) -> dict:
+    return {"day_number": 1, "from_location": origin, "to_location": destination, "transfer_type": "car", **fields}
+
+def test_every_transfer_without_a_route_is_reported(db_engine):
+    add_transfer(db_engine, "Alpha Pier", "Beta Bay", 1.5)
+    transfers = [
+        schemas.TransferCreate(**transfer("Nowhere", "Beta Bay")),
+        schemas.TransferCreate(**transfer("Beta Bay", "Alpha Pier")),
+        schemas.TransferCreate(**transfer("Alpha Pier", "Elsewhere")),
+    ]
+    with Session(db_engine) as db, pytest.raises(UnknownRouteError) as raised:
+        route_graph.fill_transfer_durations(db, transfers)
+    assert [(error["type"], error["loc"]) for error in raised.value.errors(loc=("body",))] == [
+        ("unknown_route", ("body", "transfers", 0, "duration_hours")),
+        ("unknown_route", ("body", "transfers", 2, "duration_hours")),
+    ]
+    # Nothing is filled in when any route is unknown
+    assert [item.duration_hours for item in transfers] == [None, None, None]
+
+def test_itineraries_get_durations_or_a_422_per_unknown_route(client, db_engine):
+    add_transfer(db_engine, "Alpha Pier", "Beta Bay", 1.5)
+    itinerary = {"name": "Routes", "duration_nights": 1, "region": "Phuket", "accommodations": [], "itinerary_activities": []}
+
+    response = client.post("/itineraries/", json={**itinerary, "transfers": [transfer("Beta Bay", "Alpha Pier")]})
+    assert response.status_code == 201
+    assert [item["duration_hours"] for item in response.json()["transfers"]] == [1.5]
+
+    unknown = [transfer("Nowhere", "Beta Bay"), transfer("Alpha Pier", "Beta Bay"), transfer("Beta Bay", "Elsewhere")]
+    response = client.post("/itineraries/", json={**itinerary, "transfers": unknown})
+    assert response.status_code == 422
+    assert [error["loc"] for error in response.json()["detail"]] == [
+        ["body", "transfers", 0, "duration_hours"],
+        ["body", "transfers", 2, "duration_hours"],
+    ]
+
+    response = client.post("/itineraries/bulk", json=[{**itinerary, "transfers": unknown}])
+    assert response.status_code == 200
+    assert response.json()["created"] == 0
+    [item] = response.json()["errors"]
+    assert [error["loc"] for error in item["errors"]] == [
+        ["transfers", 0, "duration_hours"],
+        ["transfers", 2, "duration_hours"],
+    ]
+    with Session(db_engine) as db:
+        assert db.scalar(select(func.count()).select_from(models.Itinerary).filter_by(name="Routes")) == 1
@@ -0,0 +1,336 @@
+"""
+Tests of app.shared_cache: both backends (the Redis one against a minimal
+RESP server run in-process) and invalidation of the recommendation index
+over pub/sub.
+"""
+import asyncio
+import socket
+import socketserver
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app import schemas
+from app.mcp_server import MAX_GENERATED_FILTERS, RecommendationIndex, generated_request_key
+from app.shared_cache import MemoryBackend, RedisBackend, SharedCache
+
+CATALOG = {"locations": 1, "hotels": 1, "activities": 1}
+NEW_CATALOG = {"locations": 1, "hotels": 2, "activities": 1}
+
+def _encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_encode(item) for item in value)
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+class RespServer(socketserver.ThreadingTCPServer):
+    """The commands of a Redis-protocol server that RedisBackend sends."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RespHandler)
+        self.lock = threading.Lock()
+        self.entries = {}  # key -> (value, expiry or None)
+        self.subscribers = {}  # channel -> set of handlers
+        self.handlers = set()
+
+    @property
+    def url(self) -> str:
+        return "redis://%s:%d" % self.server_address
+
+    def live(self, key):
+        value, expiry = self.entries.get(key, (None, None))
+        if expiry is not None and expiry <= time.monotonic():
+            del self.entries[key]
+            return None
+        return value
+
+    def drop_connections(self):
+        for handler in list(self.handlers):
+            handler.request.shutdown(socket.SHUT_RDWR)
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        server.handlers.add(self)
+        try:
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                args = []
+                for _ in range(int(line[1:])):
+                    length = int(self.rfile.readline()[1:])
+                    args.append(self.rfile.read(length + 2)[:-2])
+                self.command(args[0].upper().decode(), args[1:])
+        except OSError:
+            pass
+        finally:
+            server.handlers.discard(self)
+            with server.lock:
+                for handlers in server.subscribers.values():
+                    handlers.discard(self)
+
+    def reply(self, value):
+        self.wfile.write(_encode(value))
+        self.wfile.flush()
+
+    def command(self, name, args):
+        server = self.server
+        with server.lock:
+            if name == "GET":
+                return self.reply(server.live(args[0]))
+            if name == "SET":
+                options = [arg.upper() for arg in args[2:]]
+                if b"NX" in options and server.live(args[0]) is not None:
+                    return self.reply(None)
+                expiry = None
+                if b"PX" in options:
+                    expiry = time.monotonic() + int(options[options.index(b"PX") + 1]) / 1000
+                server.entries[args[0]] = (args[1], expiry)
+                return self.reply("OK")
+            if name == "DEL":
+                return self.reply(sum(server.entries.pop(key, None) is not None for key in args))
+            if name == "INCR":
+                value = int(server.live(args[0]) or 0) + 1
+                server.entries[args[0]] = (str(value).encode(), None)
+                return self.reply(value)
+            if name == "SUBSCRIBE":
+                for channel in args:
+                    server.subscribers.setdefault(channel, set()).add(self)
+                    self.reply([b"subscribe", channel, len(args)])
+                return
+            if name == "PUBLISH":
+                handlers = list(server.subscribers.get(args[0], ()))
+                self.reply(len(handlers))
+        for handler in handlers:
+            handler.reply([b"message", args[0], args[1]])
+
+@pytest.fixture
+def resp_server():
+    server = RespServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.drop_connections()
+    server.server_close()
+
+@pytest.fixture(params=["memory", "redis"])
+def make_backend(request):
+    """Backends sharing one store, like the workers of a deployment."""
+    backends = []
+    memory = MemoryBackend(max_bytes=1024)
+    url = request.getfixturevalue("resp_server").url if request.param == "redis" else None
+
+    def make():
+        backend = memory if url is None else RedisBackend(url)
+        backends.append(backend)
+        return backend
+
+    yield make
+    for backend in backends:
+        backend.close()
+
+def _eventually(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def test_entries_expire_after_their_ttl(make_backend):
+    backend = make_backend()
+    backend.set("short", b"1", 0.05)
+    backend.set("long", b"2", 60)
+    assert backend.get("short") == b"1"
+    time.sleep(0.1)
+    assert backend.get("short") is None
+    assert backend.get("long") == b"2"
+
+def test_add_sets_only_missing_keys(make_backend):
+    backend = make_backend()
+    assert backend.add("lock", b"a", 60)
+    assert not backend.add("lock", b"b", 60)
+    assert backend.get("lock") == b"a"
+    backend.delete("lock", "missing")
+    assert backend.get("lock") is None
+    assert backend.add("lock", b"c", 60)
+
+def test_add_replaces_expired_keys(make_backend):
+    backend = make_backend()
+    assert backend.add("lock", b"a", 0.05)
+    time.sleep(0.1)
+    assert backend.add("lock", b"b", 60)
+
+def test_counters_start_from_zero(make_backend):
+    backend = make_backend()
+    assert [backend.incr("counter"), backend.incr("counter")] == [1, 2]
+    assert backend.get("counter") == b"2"
+
+def test_memory_backend_evicts_least_recently_set_entries():
+    backend = MemoryBackend(max_bytes=10)
+    backend.set("a", b"1234", 60)
+    backend.set("b", b"1234", 60)
+    backend.set("a", b"1234", 60)  # set again: now the most recent
+    backend.set("c", b"1234", 60)
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1234"
+    assert backend.get("c") == b"1234"
+
+def test_memory_backend_keeps_an_entry_larger_than_its_bound():
+    backend = MemoryBackend(max_bytes=4)
+    backend.set("a", b"12", 60)
+    backend.set("big", b"123456", 60)
+    assert backend.get("a") is None
+    assert backend.get("big") == b"123456"
+
+def test_published_messages_reach_every_subscriber(make_backend):
+    publisher, subscriber = make_backend(), make_backend()
+    received = []
+    subscriber.subscribe("channel", received.append)
+    subscriber.subscribe("other", lambda message: received.append(("other", message)))
+    # Subscriptions are made by the listener thread
+    assert _eventually(lambda: publisher.publish("channel", b"ping") or received)
+    publisher.publish("other", b"pong")
+    assert _eventually(lambda: ("other", b"pong") in received)
+    assert b"ping" in received
+
+def test_redis_subscriber_resubscribes_on_one_connection(resp_server):
+    backend = RedisBackend(resp_server.url)
+    received = []
+    try:
+        backend.subscribe("a", received.append)
+        backend.subscribe("b", received.append)
+        assert _eventually(lambda: len(resp_server.subscribers.get(b"b", ())) == 1)
+        for _ in range(3):
+            resp_server.drop_connections()
+            assert _eventually(lambda: received.count(None) >= 2 and resp_server.handlers)
+            received.clear()
+        assert _eventually(
+            lambda: all(len(resp_server.subscribers.get(channel, ())) == 1 for channel in (b"a", b"b"))
+        )
+        assert len(resp_server.handlers) == 1
+        backend.publish("b", b"after")
+        assert _eventually(lambda: b"after" in received)
+    finally:
+        backend.close()
+
+def test_unreachable_server_reads_as_a_miss():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        url = "redis://127.0.0.1:%d" % sock.getsockname()[1]
+    cache = SharedCache(RedisBackend(url))
+    assert cache.get(cache.key("entry")) is None
+    started = time.monotonic()
+    # Skipped without connecting until the retry delay is over
+    assert cache.get_or_build(cache.key("entry"), lambda: b"built") == b"built"
+    assert time.monotonic() - started < 0.1
+    cache.close()
+
+def test_get_or_build_builds_once_under_contention(make_backend):
+    caches = [SharedCache(make_backend(), prefix="test") for _ in range(4)]
+    builds = []
+
+    def build():
+        builds.append(1)
+        time.sleep(0.1)
+        return b"value"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda cache=cache: results.append(cache.get_or_build(cache.key("entry"), build)))
+        for cache in caches
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [b"value"] * 4
+    assert len(builds) == 1
+
+def test_aget_or_build_builds_once_under_contention(make_backend):
+    cache = SharedCache(make_backend(), prefix="test")
+    builds = []
+
+    async def build():
+        builds.append(1)
+        await asyncio.sleep(0.1)
+        return b"value"
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_build(cache.key("entry"), build) for _ in range(4)))
+
+    assert asyncio.run(main()) == [b"value"] * 4
+    assert len(builds) == 1
+    assert cache.get(cache.key("entry")) == b"value"
+
+def test_recommendation_index_invalidates_other_workers(make_backend):
+    writer = RecommendationIndex(SharedCache(make_backend(), prefix="test"))
+    reader = RecommendationIndex(SharedCache(make_backend(), prefix="test"))
+    writer.stats(), reader.stats()  # subscribe
+    # The reader built the (5, "Krabi") entry, which embeds itinerary 7, at
+    # two catalog versions (requests on an old and a new snapshot)
+    keys = [reader._entry_key((5, "Krabi"), versions) for versions in (CATALOG, NEW_CATALOG)]
+    for key, versions in zip(keys, (CATALOG, NEW_CATALOG)):
+        reader.cache.set(key, b"payload")
+        reader._track((5, "Krabi"), [7], versions)
+    other = reader._entry_key((3, "Phuket"), NEW_CATALOG)
+    reader.cache.set(other, b"payload")
+
+    writer.invalidate(itinerary_ids={7})
+    assert _eventually(lambda: all(reader.cache.get(key) is None for key in keys))
+    assert reader.cache.get(other) == b"payload"
+
+def test_recommendation_index_clear_moves_every_worker_to_new_keys(make_backend):
+    writer = RecommendationIndex(SharedCache(make_backend(), prefix="test"))
+    reader = RecommendationIndex(SharedCache(make_backend(), prefix="test"))
+    reader.cache.set(reader._entry_key((5, "Krabi"), CATALOG), b"payload")
+
+    writer.clear()
+    assert _eventually(lambda: reader.stats()["epoch"] == 1)
+    assert reader.cache.get(reader._entry_key((5, "Krabi"), CATALOG)) is None
+
+def test_recommendation_index_keys_use_each_requests_catalog():
+    index = RecommendationIndex(SharedCache(MemoryBackend(), prefix="test"))
+    old = SimpleNamespace(versions=CATALOG, regions=frozenset({"Krabi"}))
+    new = SimpleNamespace(versions=NEW_CATALOG, regions=frozenset({"Krabi"}))
+    old_key = index._index_key((5, "Krabi"), None, old)
+    new_key = index._index_key((5, "Krabi"), None, new)
+    assert old_key != new_key
+    # Interleaved requests don't pick up each other's versions
+    assert index._index_key((5, "Krabi"), None, old) == old_key
+    assert index._index_key((5, "Phuket"), None, old) is None
+
+@pytest.mark.parametrize(
+    "max_budget, min_rating, filters",
+    [
+        (3047.89, 3.14, (3000.0, 3.2)),
+        (3000, 4, (3000.0, 4.0)),
+        (99.999, 4.99, (99.0, 5.0)),
+        (0, None, (0.0, None)),
+        (None, 0.05, (None, 0.1)),
+    ],
+)
+def test_generated_responses_are_keyed_by_stricter_rounded_filters(max_budget, min_rating, filters):
+    request = schemas.MCPRequest(nights=5, region="Krabi", max_budget=max_budget, min_rating=min_rating)
+    assert generated_request_key(request) == (5, "Krabi", *filters)
+
+def test_generated_response_filters_are_capped_per_worker():
+    index = RecommendationIndex(SharedCache(MemoryBackend(), prefix="test"))
+    catalog = SimpleNamespace(versions=CATALOG, regions=frozenset({"Krabi"}))
+    keys = [index._generated_key((5, "Krabi", float(budget), None), catalog) for budget in range(1, 200)]
+    assert all(keys[:MAX_GENERATED_FILTERS]) and not any(keys[MAX_GENERATED_FILTERS:])
+    # Filters already kept stay kept
+    assert index._generated_key((5, "Krabi", 1.0, None), catalog) == keys[0]
+    assert index._generated_key((5, "Krabi", None, None), catalog) is not None